@@ -65,6 +65,20 @@ hiddenimports = [
     'utils.uac',
     'utils.dirSearch',
     'utils.fileDownloader',
+    'utils.mirrorStats',
+    'utils.httpClient',
+    'utils.artifactCache',
+    'utils.zipExtractor',
+    'utils.fileOps',
+    'utils.upgradePlanner',
+    'utils.remoteZip',
+    'utils.asarIndex',
+    'utils.asarExtractor',
+    'utils.patchEngine',
+    'utils.asarRepacker',
+    'utils.stepScheduler',
+    'utils.installJournal',
+    'utils.tracer',
     'utils.killer',
     'config.config',
     'installer',
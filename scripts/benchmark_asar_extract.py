@@ -0,0 +1,145 @@
+"""
+ASAR 解包性能测试脚本
+生成指定大小的 ASAR 文件, 对比原先的解包方式 (按头部顺序逐个文件 seek 后 copyfileobj,
+与此前基于 asar 库的解包流程相同) 与 extract_asar 的耗时
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from utils.asarExtractor import extract_asar  # noqa: E402
+from utils.asarIndex import AsarIndex  # noqa: E402
+from utils.asarRepacker import encode_asar_header  # noqa: E402
+
+
+def build_archive(asar_path: Path, total_mb: int, seed: int = 0) -> int:
+    """
+    生成测试用 ASAR 文件, 文件大小分布接近 Electron 应用: 大量小文件加少量大文件
+
+    Args:
+        asar_path: 输出路径
+        total_mb: 文件数据总大小 (MB)
+        seed: 随机数种子
+
+    Returns:
+        文件数量
+    """
+    rng = random.Random(seed)
+    total_size = total_mb * 1024 * 1024
+    sizes = []
+    while sum(sizes) < total_size:
+        if rng.random() < 0.01:
+            sizes.append(rng.randint(1, 16) * 1024 * 1024)
+        else:
+            sizes.append(rng.randint(256, 64 * 1024))
+
+    header = {"files": {}}
+    offset = 0
+    for i, size in enumerate(sizes):
+        directory = header["files"].setdefault(f"dir_{i % 128:03d}", {"files": {}})
+        directory["files"][f"file_{i}.js"] = {"size": size, "offset": str(offset)}
+        offset += size
+
+    block = rng.randbytes(1024 * 1024)
+    with open(asar_path, "wb") as f:
+        f.write(encode_asar_header(header))
+        for size in sizes:
+            while size:
+                chunk = block[: min(size, len(block))]
+                f.write(chunk)
+                size -= len(chunk)
+    return len(sizes)
+
+
+class _LimitedReader:
+    """从 ASAR 的指定区间读取数据, 与原先 asar 库的 LimitedReader 行为相同"""
+
+    def __init__(self, f, offset: int, size: int):
+        self._f = f
+        self._offset = offset
+        self._remaining = size
+
+    def read(self, n: int = -1) -> bytes:
+        if self._remaining <= 0:
+            return b""
+        if n < 0 or n > self._remaining:
+            n = self._remaining
+        self._f.seek(self._offset)
+        data = self._f.read(n)
+        self._offset += len(data)
+        self._remaining -= len(data)
+        return data
+
+
+def extract_baseline(asar_path: Path, extract_to: Path):
+    """原先的解包方式: 按头部顺序逐个条目创建目录或 seek 后以 copyfileobj 写出文件"""
+    index = AsarIndex.open(asar_path)
+    extract_to.mkdir(parents=True, exist_ok=True)
+    with open(asar_path, "rb") as f:
+        for entry in index:
+            target = extract_to / entry.path
+            if entry.is_dir:
+                target.mkdir(parents=True, exist_ok=True)
+            elif entry.offset >= 0:
+                with target.open("wb") as writer:
+                    shutil.copyfileobj(
+                        _LimitedReader(f, index.data_offset + entry.offset, entry.size),
+                        writer,
+                    )
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="对比原先的解包方式与 extract_asar 的解包耗时")
+    parser.add_argument("--size", type=int, default=300, help="文件数据总大小 (MB)")
+    parser.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1), help="并行写出线程数")
+    parser.add_argument("--rounds", type=int, default=3, help="每种方式的测试轮数")
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="aura_asar_bench_"))
+    try:
+        asar_path = work_dir / "bench.asar"
+        print(f"📦 正在生成 {args.size} MB 的测试 ASAR...")
+        file_count = build_archive(asar_path, args.size)
+        print(f"  - 文件数量: {file_count}")
+
+        candidates = [
+            ("原先的解包方式", lambda target: extract_baseline(asar_path, target)),
+            ("extract_asar (1 线程)", lambda target: extract_asar(asar_path, target)),
+        ]
+        if args.workers > 1:
+            candidates.append(
+                (
+                    f"extract_asar ({args.workers} 线程)",
+                    lambda target: extract_asar(asar_path, target, args.workers),
+                )
+            )
+        results = {}
+        for name, func in candidates:
+            timings = []
+            for round_index in range(args.rounds):
+                target = work_dir / f"out_{round_index}"
+                start = time.perf_counter()
+                func(target)
+                timings.append(time.perf_counter() - start)
+                shutil.rmtree(target)
+            results[name] = min(timings)
+            print(f"⏱️ {name}: 最快 {results[name]:.3f}s | 各轮: {', '.join(f'{t:.3f}s' for t in timings)}")
+
+        baseline = next(iter(results.values()))
+        for name, elapsed in list(results.items())[1:]:
+            print(f"🚀 {name} 加速比: {baseline / elapsed:.2f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
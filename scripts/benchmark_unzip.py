@@ -0,0 +1,91 @@
+"""
+解压性能测试脚本
+生成包含大量小文件的 ZIP 文件, 对比 ZipFile.extractall 与 extract_parallel 的耗时
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from utils.zipExtractor import extract_parallel  # noqa: E402
+
+
+def build_archive(zip_path: Path, file_count: int, seed: int = 0) -> int:
+    """
+    生成测试用 ZIP 文件, 文件内容为部分随机、部分重复的字节, 压缩率接近前端资源文件
+
+    Args:
+        zip_path: 输出路径
+        file_count: 文件数量
+        seed: 随机数种子
+
+    Returns:
+        解压后的总字节数
+    """
+    rng = random.Random(seed)
+    total_size = 0
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(file_count):
+            size = rng.randint(512, 16 * 1024)
+            random_part = rng.randbytes(size // 4)
+            data = (random_part * 4)[:size]
+            zf.writestr(f"assets/{i % 64:02d}/file_{i}.js", data)
+            total_size += size
+    return total_size
+
+
+def time_it(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="对比 extractall 与并行解压的耗时")
+    parser.add_argument("--files", type=int, default=10000, help="文件数量")
+    parser.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1), help="并行解压线程数")
+    parser.add_argument("--rounds", type=int, default=3, help="每种方式的测试轮数")
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="aura_unzip_bench_"))
+    try:
+        zip_path = work_dir / "bench.zip"
+        print(f"📦 正在生成包含 {args.files} 个文件的测试 ZIP...")
+        total_size = build_archive(zip_path, args.files)
+        print(f"  - 压缩后: {zip_path.stat().st_size / 1024 / 1024:.2f} MB")
+        print(f"  - 解压后: {total_size / 1024 / 1024:.2f} MB")
+
+        def extractall(target: Path):
+            with zipfile.ZipFile(zip_path, "r") as zf:
+                zf.extractall(target)
+
+        def parallel(target: Path):
+            extract_parallel(zip_path, target, max_workers=args.workers)
+
+        results = {}
+        for name, func in [("extractall", extractall), (f"extract_parallel ({args.workers} 线程)", parallel)]:
+            timings = []
+            for round_index in range(args.rounds):
+                target = work_dir / f"out_{round_index}"
+                timings.append(time_it(func, target))
+                shutil.rmtree(target)
+            results[name] = min(timings)
+            print(f"⏱️ {name}: 最快 {results[name]:.3f}s | 各轮: {', '.join(f'{t:.3f}s' for t in timings)}")
+
+        baseline, candidate = results.values()
+        print(f"🚀 加速比: {baseline / candidate:.2f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -62,7 +62,8 @@ def process_releases(releases_data: List[Dict]) -> Dict:
             "name": f"[{'Pre' if release['prerelease'] else 'Rel'}] {release['name'] or release['tag_name']}",
             "type": "prerelease" if release["prerelease"] else "release",
             "published_at": release.get("published_at"),
-            "download_url": get_download_url(release)
+            "download_url": get_download_url(release),
+            "assets": get_asset_digests(release)
         }
         
         if release["prerelease"]:
@@ -111,6 +112,29 @@ def get_download_url(release: Dict) -> str:
     return ""
 
 
+def get_asset_digests(release: Dict) -> List[Dict]:
+    """
+    从release信息中提取各资源文件的大小与SHA-256, 供安装器校验下载结果
+    
+    Args:
+        release: GitHub release信息
+        
+    Returns:
+        资源文件列表, 缺少 digest 字段的文件不包含在内
+    """
+    assets = []
+    for asset in release.get("assets", []):
+        digest = asset.get("digest") or ""
+        if not digest.startswith("sha256:"):
+            continue
+        assets.append({
+            "name": asset["name"],
+            "size": asset["size"],
+            "sha256": digest.split(":", 1)[1]
+        })
+    return assets
+
+
 def update_versions_file(versions_data: Dict, file_path: Path) -> bool:
     """
     更新 versions.json 文件
@@ -138,13 +138,13 @@ class InstallerModel:
             args.status_callback = self.update_status
 
             # 开始安装进度更新
-            self.update_progress(0, "[0 / 10] 准备安装...", "info")
+            self.update_progress(0, "准备安装...", "info")
 
             # 执行实际安装
             result = run_installation(args, self)
 
             if result["success"]:
-                # self.update_progress(100, "[10 / 10] 安装完成")
+                # self.update_progress(100, "安装完成")
                 self.update_status("安装完成")
                 if self.completed_callback:
                     self.completed_callback(True, "HugoAura 安装成功！")
@@ -16,6 +16,17 @@ CORE_FILENAME = "core.zip"
 AURA_FILENAME = "aura.zip"
 TARGET_ASAR_NAME = "app.asar"
 EXTRACTED_FOLDER_NAME = "aura"
+# 与 aura 文件夹位于同一目录 (同一卷) 的暂存目录与旧版本目录, 替换时仅需重命名
+AURA_STAGING_DIR_NAME = ".aura.staging"
+AURA_OLD_DIR_NAME = ".aura.old"
+# 安装清单, 记录已安装文件与 ASAR 的状态, 用于增量升级
+AURA_MANIFEST_FILENAME = ".aura-install.json"
+# 安装日志, 记录未完成安装的各步骤结果, 用于中断后继续安装或回滚
+AURA_JOURNAL_FILENAME = ".aura-install.journal"
+# 替换 app.asar 时原文件的暂存名称, 安装完成后删除, 回滚时恢复
+ASAR_OLD_NAME = "app.asar.old"
+# Patch 后的 ASAR 缓存目录, 位于希沃管家安装目录下 (仅管理员可写), 缓存内容会被直接安装
+PATCHED_ASAR_CACHE_DIR_NAME = ".aura-asar-cache"
 
 # 下载 URL 列表
 BASE_DOWNLOAD_URLS = [
@@ -30,6 +41,55 @@ BASE_DOWNLOAD_URLS = [
     f"https://github.com/{GITHUB_OWNER}/{GITHUB_DL_REPO}/releases/download",
 ]
 
+# HTTP 连接池配置 (按主机数量 / 单个主机的最大连接数)
+HTTP_POOL_CONNECTIONS = 16
+HTTP_POOL_MAXSIZE = 16
+
+# 分段下载配置
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_SEGMENT_COUNT = 4
+DOWNLOAD_SEGMENT_MIN_SIZE = 1 * 1024 * 1024
+DOWNLOAD_TIMEOUT_SECONDS = 60
+DOWNLOAD_PART_SUFFIX = ".part"
+
+# 下载停滞检测: 最近 WINDOW 秒内平均速率低于 MIN_RATE (字节 / 秒) 时切换到下一个下载源
+DOWNLOAD_STALL_MIN_RATE = 16 * 1024
+DOWNLOAD_STALL_WINDOW_SECONDS = 15
+
+# 跨下载源聚合下载: 将同一文件的不同字节区间分配给排名前 N 的下载源同时下载, 为 1 时关闭
+DOWNLOAD_AGGREGATE_MIRRORS = 3
+DOWNLOAD_AGGREGATE_CONNECTIONS_PER_MIRROR = 2
+# 剩余字节不少于该值两倍的分段才会被空闲的下载源窃取
+DOWNLOAD_AGGREGATE_MIN_STEAL_SIZE = 256 * 1024
+
+# 下载源竞速配置
+# 同时向排名前 N 的下载源发起真实下载请求, 最先收到指定字节数的下载源胜出, 为 1 时关闭竞速
+DOWNLOAD_RACE_MIRRORS = 3
+DOWNLOAD_RACE_BYTES = 256 * 1024
+DOWNLOAD_RACE_TIMEOUT_SECONDS = 15
+
+# 增量下载配置: 已安装过 HugoAura 且下载源支持 Range 时, 仅下载 aura.zip 中有变化的条目
+# 间隔不超过 MERGE_GAP 字节的相邻区间合并为一个请求
+DELTA_DOWNLOAD_MERGE_GAP = 64 * 1024
+# 需下载的字节数超过整个文件的该比例时改为完整下载 (完整下载可缓存并校验 SHA-256)
+DELTA_DOWNLOAD_MAX_RATIO = 0.5
+
+# 下载源测速配置
+# latency: 仅测量 HEAD 响应时间; throughput: 使用 Range 请求下载资源开头部分, 综合首字节延迟与吞吐量评分
+MIRROR_RANKING_MODE = "throughput"
+MIRROR_PROBE_BYTES = 256 * 1024
+# 评分 = 首字节延迟 + 按实测吞吐量下载该大小所需的时间 (秒), 越低越好
+MIRROR_SCORE_REFERENCE_SIZE = 8 * 1024 * 1024
+MIRROR_PROBE_TIMEOUT_SECONDS = 10
+
+# 下载源评分缓存配置
+MIRROR_STATS_FILENAME = "mirror_stats.json"
+MIRROR_STATS_TTL_SECONDS = 6 * 60 * 60
+MIRROR_STATS_EWMA_ALPHA = 0.3
+
+# main.js 补丁校验结果缓存
+PATCH_VERDICTS_FILENAME = "patch_verdicts.json"
+
 # GitHub API URL
 GITHUB_API_URL = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases"
 
@@ -40,6 +100,24 @@ SWASS_PATH_PATTERN = r"C:\\Program Files (x86)\\Seewo\\SeewoService\\SeewoServic
 TEMP_DIR_NAME = "Aura-Install-Temp"
 TEMP_INSTALL_DIR = os.path.join(tempfile.gettempdir(), TEMP_DIR_NAME)
 
+# 持久缓存目录 (下载源评分等)
+CACHE_DIR = os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache"),
+    APP_NAME,
+    "Installer",
+)
+
+# 并行解压的最大线程数
+UNZIP_MAX_WORKERS = min(8, os.cpu_count() or 1)
+
+# 发行版资源文件缓存 (按 Tag + 文件名索引, SHA-256 校验)
+ARTIFACT_CACHE_DIR = os.path.join(CACHE_DIR, "artifacts")
+ARTIFACT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# 内容会随构建更新的 Tag, 不使用缓存
+MUTABLE_RELEASE_TAGS = ["vAutoBuild"]
+# Patch 后的 ASAR 缓存 (按原始 ASAR、core.zip 的 SHA-256 与补丁规则的 fingerprint 索引)
+PATCHED_ASAR_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
 # HugoAura 数据路径
 HUGOAURA_USER_DATA_DIR = os.path.join(os.path.expanduser("~"), "Documents", "HugoAura")
 HUGOAURA_REGISTRY_KEY = r"SOFTWARE\\HugoAura"
@@ -47,6 +125,11 @@ HUGOAURA_REGISTRY_KEY = r"SOFTWARE\\HugoAura"
 # 进程杀死间隔
 PROCESS_KILL_INTERVAL_SECONDS = 0.5
 
+# 等待文件解除占用: 重试间隔从 INITIAL_DELAY 开始按倍数增长, 不超过 MAX_DELAY, 超过 TIMEOUT 后报错
+FILE_UNLOCK_TIMEOUT_SECONDS = 30
+FILE_UNLOCK_INITIAL_DELAY_SECONDS = 0.05
+FILE_UNLOCK_MAX_DELAY_SECONDS = 1.0
+
 # 退出代码释义
 EXIT_CODES = {
     0: "安装成功",
@@ -5,19 +5,54 @@ import subprocess
 import time
 import sys
 import winreg
-import requests
 from pathlib import Path
 from loguru import logger as log
-from utils import dirSearch, fileDownloader, killer, asarPatcher
+from utils import dirSearch, fileDownloader, killer, asarPatcher, fileOps, upgradePlanner
+from utils.artifactCache import sha256_of_file
+from utils.httpClient import http_session
+from utils.stepScheduler import Step, StepScheduler
+from utils.installJournal import InstallJournal
+from utils.tracer import tracer
 from config import config
 import lifecycle as lifecycleMgr
 import typeDefs.lifecycle as lifecycleTypes
 
 
+def _run_fltmc(action: str) -> bool:
+    """
+    加载或卸载希沃管家的文件系统过滤驱动
+
+    参数:
+        action: "load" 或 "unload"
+
+    返回:
+        bool: fltmc 是否执行成功
+    """
+    try:
+        result = subprocess.run(
+            ["fltmc", action, "SeewoKeLiteLady"],
+            capture_output=True,
+            text=True,
+            check=False,
+            creationflags=subprocess.CREATE_NO_WINDOW,
+        )
+        log.info(f"fltmc {action} 命令执行成功, 返回值: {result.returncode}")
+        if result.stdout:
+            log.debug(f"fltmc stdout: {result.stdout.strip()}")
+        if result.stderr:
+            log.warning(f"fltmc stderr: {result.stderr.strip()}")
+        return result.returncode == 0
+    except FileNotFoundError:
+        log.error('未能找到 "fltmc" 命令, 请确保您的系统环境完整。')
+    except Exception as e:
+        log.error(f"调用 fltmc 时发生未知错误: {e}")
+    return False
+
+
 def fetch_github_releases():
     url = config.GITHUB_API_URL
     try:
-        resp = requests.get(url, timeout=30)
+        resp = http_session.get(url, timeout=30)
         resp.raise_for_status()
         return resp.json()
     except Exception as e:
@@ -134,6 +169,88 @@ def select_release_source(args=None):
         print("输入无效, 请重新输入。")
 
 
+def _rollback_journal(install_dir_path: Path, journal: InstallJournal):
+    """
+    根据安装日志撤销未完成的安装, 恢复原有的 app.asar 与 aura 文件夹
+
+    参数:
+        install_dir_path: 希沃管家安装目录
+        journal: 未完成安装的日志
+    """
+    log.info(f"正在回滚未完成的安装 ({journal.version}), 最后完成的步骤: {journal.last_step}")
+    replace_started = journal.get("replace_started")
+    if replace_started:
+        original_asar_path = install_dir_path / config.TARGET_ASAR_NAME
+        old_asar_path = install_dir_path / config.ASAR_OLD_NAME
+        if old_asar_path.exists():
+            killer.start_killing_process()
+            try:
+                fileOps.replace_file_when_unlocked(old_asar_path, original_asar_path)
+            finally:
+                killer.stop_killing_process()
+            log.success(f"已恢复原有的 {config.TARGET_ASAR_NAME}")
+        if replace_started.get("backup_created"):
+            backup_asar_path = install_dir_path / "app.asar.bak"
+            if backup_asar_path.exists():
+                os.remove(backup_asar_path)
+
+    move_started = journal.get("move_started")
+    if move_started:
+        target_aura_path = install_dir_path / config.EXTRACTED_FOLDER_NAME
+        old_aura_path = install_dir_path / config.AURA_OLD_DIR_NAME
+        if move_started["had_previous"] and not old_aura_path.exists():
+            log.warning(f"未找到原有的 aura 文件夹 {old_aura_path}, 保留当前的 aura 文件夹")
+        else:
+            if target_aura_path.exists():
+                stale_path = install_dir_path / f"{config.AURA_OLD_DIR_NAME}-{time.time_ns()}"
+                os.rename(target_aura_path, stale_path)
+                fileOps.remove_tree_in_background(stale_path)
+            if old_aura_path.exists():
+                os.rename(old_aura_path, target_aura_path)
+                log.success("已恢复原有的 aura 文件夹")
+        # 安装清单可能已描述新文件, 删除后下次安装将完整比对文件
+        manifest_path = install_dir_path / config.AURA_MANIFEST_FILENAME
+        if manifest_path.exists():
+            os.remove(manifest_path)
+
+    staging_path = install_dir_path / config.AURA_STAGING_DIR_NAME
+    if staging_path.exists():
+        fileOps.remove_tree_in_background(staging_path)
+    journal.discard()
+    log.success("回滚完成")
+
+
+def rollback_installation(args=None):
+    """
+    根据安装日志撤销未完成的安装
+
+    参数:
+        args: 命令行参数对象, 可通过 args.dir 指定希沃管家安装目录
+
+    返回:
+        bool: 回滚是否成功
+    """
+    install_dir_path_str = (args and args.dir) or dirSearch.find_seewo_resources_dir()
+    if not install_dir_path_str or not os.path.isdir(install_dir_path_str):
+        log.critical("未能找到 SeewoServiceAssistant 安装目录, 请使用 --dir 指定")
+        return False
+    install_dir_path = Path(install_dir_path_str)
+
+    journal = InstallJournal.load(install_dir_path / config.AURA_JOURNAL_FILENAME)
+    if not journal:
+        log.info("未找到未完成的安装记录, 无需回滚")
+        return True
+    if args and args.dry_run:
+        log.info(f"Dry Run: 将回滚未完成的安装 ({journal.version}), 最后完成的步骤: {journal.last_step}")
+        return True
+    try:
+        _rollback_journal(install_dir_path, journal)
+        return True
+    except Exception as e:
+        log.exception(f"回滚失败, 安装日志已保留, 可重试: {e}")
+        return False
+
+
 def run_installation(args=None, installerClassIns=None):
     """
     运行安装流程
@@ -147,11 +264,10 @@ def run_installation(args=None, installerClassIns=None):
     """
     install_success = False
     install_dir_path = None
-    downloaded_zip_path = None
-    downloaded_core_path = None
-    download_source = None
-    ssa_asar = config.TARGET_ASAR_NAME
-    if_patch = True
+    # 安装日志, Dry Run 时为 None
+    journal = None
+    # 本次安装是否卸载了文件系统过滤驱动, 安装失败时需重新加载
+    driver_unloaded = False
 
     error_detail = ""
 
@@ -172,21 +288,42 @@ def run_installation(args=None, installerClassIns=None):
             progress_callback(progress, step, status)
         log.info(step)
 
+    # 安装步骤调度器, 下载与解压的进度按步骤权重换算为总进度
+    scheduler = None
+
+    def report_step_progress(step_name, fraction, step):
+        if scheduler:
+            scheduler.report_progress(step_name, fraction, step)
+        else:
+            update_progress(round(fraction * 100, 2), step)
+
     def rep_dl_progress(curDownloadSize, fullSize, fileName):
         progress = round(curDownloadSize / fullSize * 100, 2)
-        update_progress(progress, f"[3 / 10] {fileName} 文件下载中, 进度: {progress} %")
+        report_step_progress(
+            "download",
+            curDownloadSize / fullSize,
+            f"{fileName} 文件下载中, 进度: {progress} %",
+        )
 
-    try:
-        update_progress(0, "[0 / 10] 准备")
-        log.info(f"即将开始运行 {config.APP_NAME} 管理工具")
+    def rep_extract_progress(extractedCount, totalCount, entryName):
+        # 每解压一个文件回调一次, 仅在百分比变化时更新进度
+        progress = extractedCount * 100 // totalCount
+        if progress != (extractedCount - 1) * 100 // totalCount:
+            report_step_progress(
+                "extract",
+                extractedCount / totalCount,
+                f"资源文件解压中, 进度: {progress} %",
+            )
 
-        update_progress(10, "[1 / 10] 查找希沃管家安装目录")
+    def step_find_dir(ctx):
+        nonlocal install_dir_path
         # 如果指定了安装目录
         if args and args.dir:
             install_dir_path_str = args.dir
             if not os.path.isdir(install_dir_path_str):
-                log.critical(f"指定的安装目录不存在: {install_dir_path_str}")
-                return False
+                error_detail = f"指定的安装目录不存在: {install_dir_path_str}"
+                log.critical(error_detail)
+                raise Exception(error_detail)
             log.info(f"使用指定的安装目录: {install_dir_path_str}")
         else:
             install_dir_path_str = dirSearch.find_seewo_resources_dir()
@@ -198,52 +335,231 @@ def run_installation(args=None, installerClassIns=None):
                 log.info("您可以尝试手动输入安装目录:")
                 install_dir_path_str = input()
                 if not os.path.isdir(install_dir_path_str):
-                    log.critical(f"指定的目录不存在: {install_dir_path_str}")
-                    return False
+                    error_detail = f"指定的目录不存在: {install_dir_path_str}"
+                    log.critical(error_detail)
+                    raise Exception(error_detail)
 
         install_dir_path = Path(install_dir_path_str)
+        return {"install_dir_path": install_dir_path}
 
-        update_progress(20, "[2 / 10] 选择 HugoAura 版本")
+    def step_select_version(ctx):
         download_source = select_release_source(args)
         if os.path.exists(download_source):
             log.info(f"已选择本地文件: {download_source}")
         else:
             log.info(f"已选择版本 Tag: {download_source}")
+        return {"download_source": download_source}
 
-        update_progress(30, "[3 / 10] 获取资源文件")
+    def step_unload_driver(ctx):
+        nonlocal driver_unloaded
+        if not args.dry_run:
+            driver_unloaded = _run_fltmc("unload")
+        return {"driver_unloaded": True}
+
+    def step_open_journal(ctx):
+        nonlocal journal
+        if args.dry_run:
+            return {"journal": None}
+        install_dir_path = ctx["install_dir_path"]
+        download_source = ctx["download_source"]
+        journal_path = install_dir_path / config.AURA_JOURNAL_FILENAME
+        previous = InstallJournal.load(journal_path)
+        if previous and previous.version == download_source:
+            log.info(
+                f"发现未完成的安装 ({previous.version}), 将从步骤 {previous.last_step} 之后继续"
+            )
+            journal = previous
+        else:
+            if previous:
+                log.warning(
+                    f"发现未完成的 {previous.version} 安装, 与本次选择的版本不同, 即将回滚后重新安装"
+                )
+                _rollback_journal(install_dir_path, previous)
+            journal = InstallJournal.create(journal_path, download_source)
+        return {"journal": journal}
+
+    def step_inspect_asar(ctx):
+        install_dir_path = ctx["install_dir_path"]
+        journal = ctx["journal"]
+        target_aura_path = install_dir_path / config.EXTRACTED_FOLDER_NAME
+        ssa_asar = config.TARGET_ASAR_NAME
+        if_patch = True
+        # 继续安装时 aura 文件夹可能已被替换, 沿用上次的判断
+        recorded = journal and journal.get("inspect")
+        if recorded:
+            ssa_asar, if_patch = recorded["ssa_asar"], recorded["if_patch"]
+        elif target_aura_path.exists():
+            log.warning(
+                f"发现旧版本 HugoAura 目录: {target_aura_path}, 即将替换..."
+            )
+            ssa_asar = "app.asar.bak"
+            if os.path.exists(install_dir_path / ssa_asar):
+                log.warning(
+                    "Patch ASAR 将使用备份的ASAR，请确保其完整并未更改..."
+                )
+            else:
+                log.warning(
+                    "app.asar.bak未找到，将不进行Patch操作..."
+                )
+                log.warning(
+                    "若现有的app.asar为未patch过的，请将其复制到app.asar.bak。"
+                )
+                if_patch = False
+        if journal and not recorded:
+            journal.record("inspect", ssa_asar=ssa_asar, if_patch=if_patch)
+        # 在下载的同时预先计算原始 ASAR 的 SHA-256, 用于查找已 Patch 的 ASAR 缓存
+        source_asar_sha256 = None
+        if if_patch and (install_dir_path / ssa_asar).exists():
+            source_asar_sha256 = sha256_of_file(install_dir_path / ssa_asar)
+        return {
+            "ssa_asar": ssa_asar,
+            "if_patch": if_patch,
+            "source_asar_sha256": source_asar_sha256,
+        }
+
+    def step_download(ctx):
+        install_dir_path = ctx["install_dir_path"]
+        download_source = ctx["download_source"]
+        journal = ctx["journal"]
+        target_aura_path = install_dir_path / config.EXTRACTED_FOLDER_NAME
+        # 已安装过 HugoAura 时仅解压有变化的文件, 此时 aura.zip 需在下载完成后按计划解压
+        incremental_upgrade = not args.dry_run and target_aura_path.is_dir()
+        install_manifest = upgradePlanner.load_install_manifest(install_dir_path)
+        # aura 直接解压到目标卷上的暂存目录, 移动 Aura 文件夹时仅需重命名; Dry Run 时不写入安装目录
+        if args.dry_run:
+            temp_extract_path = Path(config.TEMP_INSTALL_DIR + "\\aura")
+        else:
+            temp_extract_path = install_dir_path / config.AURA_STAGING_DIR_NAME
+            if temp_extract_path.exists():
+                shutil.rmtree(temp_extract_path)
+        temp_extract_path_core  = Path(config.TEMP_INSTALL_DIR + "\\core")
         dlCallbackFuncName = (
             lifecycleTypes.GLOBAL_CALLBACKS.REPORT_DOWNLOAD_PROGRESS.value
         )
-        if not str.startswith(download_source, "v"):
+        resumed_zip_path = journal and journal.artifact("download", "aura_zip")
+        resumed_core_path = journal and journal.artifact("download", "core_zip")
+        if resumed_zip_path and resumed_core_path:
+            log.info("复用上次安装已下载的资源文件, 跳过下载")
+            downloaded_zip_path = resumed_zip_path
+            downloaded_core_path = resumed_core_path
+        elif not str.startswith(download_source, "v"):
             if os.path.exists(download_source):
                 downloaded_zip_path = Path(str(download_source))
                 downloaded_core_path = Path(
                     str(download_source).replace("aura.zip", "core.zip")
                 )
             else:
-                log.critical("请输入合法的路径，并确保本地路径存在 aura.zip 文件")
-                return False
+                error_detail = "请输入合法的路径，并确保本地路径存在 aura.zip 文件"
+                log.critical(error_detail)
+                raise Exception(error_detail)
         else:
             lifecycleMgr.callbacks[dlCallbackFuncName] = rep_dl_progress
+            # 边下载边解压, 下载完成后解压步骤会直接跳过已解压的文件
+            extract_dirs = {config.CORE_FILENAME: temp_extract_path_core}
+            if not incremental_upgrade:
+                extract_dirs[config.AURA_FILENAME] = temp_extract_path
+            # 下载源支持 Range 时, 仅下载 aura.zip 中与已安装文件不同的条目
             downloaded_core_path, downloaded_zip_path = (
-                fileDownloader.download_release_files(download_source)
+                fileDownloader.download_release_files(
+                    download_source,
+                    extract_dirs,
+                    target_aura_path if incremental_upgrade else None,
+                    (install_manifest or {}).get("files"),
+                )
             )
         if not downloaded_core_path or not downloaded_zip_path:
-            log.critical("资源文件下载失败, 即将结束安装")
-            return False
+            error_detail = "资源文件下载失败, 即将结束安装"
+            log.critical(error_detail)
+            raise Exception(error_detail)
 
         lifecycleMgr.callbacks[dlCallbackFuncName] = None
-
-        update_progress(40, "[4 / 10] 解压资源文件")
-        temp_extract_path = Path(config.TEMP_INSTALL_DIR + "\\aura")
-        temp_extract_path_core  = Path(config.TEMP_INSTALL_DIR + "\\core")
-        if not fileDownloader.unzip_file(downloaded_zip_path, temp_extract_path) or not fileDownloader.unzip_file(downloaded_core_path, temp_extract_path_core):
+        # 增量下载的 aura.zip 仅包含有变化的条目, 不记录
+        if (
+            journal
+            and not (resumed_zip_path and resumed_core_path)
+            and not fileDownloader.is_delta_download(downloaded_zip_path)
+        ):
+            journal.record(
+                "download",
+                artifacts={
+                    "aura_zip": downloaded_zip_path,
+                    "core_zip": downloaded_core_path,
+                },
+            )
+        return {
+            "target_aura_path": target_aura_path,
+            "incremental_upgrade": incremental_upgrade,
+            "install_manifest": install_manifest,
+            "temp_extract_path": temp_extract_path,
+            "temp_extract_path_core": temp_extract_path_core,
+            "downloaded_zip_path": downloaded_zip_path,
+            "downloaded_core_path": downloaded_core_path,
+        }
+
+    def step_extract(ctx):
+        target_aura_path = ctx["target_aura_path"]
+        install_manifest = ctx["install_manifest"]
+        temp_extract_path = ctx["temp_extract_path"]
+        temp_extract_path_core = ctx["temp_extract_path_core"]
+        downloaded_zip_path = ctx["downloaded_zip_path"]
+        downloaded_core_path = ctx["downloaded_core_path"]
+        journal = ctx["journal"]
+        # 上次安装已将新的 aura 文件夹移入目标位置, 仅需解压 core
+        aura_moved = bool(journal and journal.get("move"))
+        extractCallbackFuncName = (
+            lifecycleTypes.GLOBAL_CALLBACKS.REPORT_EXTRACT_PROGRESS.value
+        )
+        lifecycleMgr.callbacks[extractCallbackFuncName] = rep_extract_progress
+        aura_extracted = aura_moved
+        if ctx["incremental_upgrade"] and not aura_moved:
+            try:
+                upgrade_plan = upgradePlanner.plan_upgrade(
+                    downloaded_zip_path,
+                    target_aura_path,
+                    (install_manifest or {}).get("files"),
+                )
+                log.info(
+                    f"增量升级计划: 新增 {len(upgrade_plan.add)} | 替换 {len(upgrade_plan.replace)} | "
+                    f"删除 {len(upgrade_plan.delete)} | 不变 {len(upgrade_plan.untouched)}, "
+                    f"需解压 {upgrade_plan.changed_bytes / 1024 / 1024:.2f} / {upgrade_plan.total_bytes / 1024 / 1024:.2f} MB"
+                )
+                upgradePlanner.apply_upgrade_plan(
+                    upgrade_plan, downloaded_zip_path, target_aura_path, temp_extract_path
+                )
+                aura_extracted = True
+            except Exception as e:
+                if "INSTALLATION_CANCELLED" in str(e):
+                    raise
+                log.warning(f"增量升级失败, 改为完整解压: {e}")
+                if temp_extract_path.exists():
+                    shutil.rmtree(temp_extract_path)
+                if fileDownloader.is_delta_download(downloaded_zip_path):
+                    log.info(f"{config.AURA_FILENAME} 为增量下载, 正在重新完整下载...")
+                    # 复用下载步骤的测速结果, 并边下载边解压到暂存目录
+                    downloaded_zip_path = fileDownloader.download_file_multi_sources(
+                        config.AURA_FILENAME,
+                        config.TEMP_INSTALL_DIR,
+                        download_urls=fileDownloader.rankedDownloadUrls,
+                        extract_to=temp_extract_path,
+                    )
+                    if not downloaded_zip_path:
+                        error_detail = "资源文件下载失败"
+                        log.critical(error_detail)
+                        raise Exception(error_detail)
+        if not aura_extracted and not fileDownloader.unzip_file(downloaded_zip_path, temp_extract_path):
             error_detail = "资源文件解压失败"
             log.critical(error_detail)
             raise Exception(error_detail)
+        if not fileDownloader.unzip_file(downloaded_core_path, temp_extract_path_core):
+            error_detail = "资源文件解压失败"
+            log.critical(error_detail)
+            raise Exception(error_detail)
+        lifecycleMgr.callbacks[extractCallbackFuncName] = None
 
         expected_aura_source_path = temp_extract_path
-        if not expected_aura_source_path.is_dir():
+        if aura_moved:
+            log.info(f"'{config.EXTRACTED_FOLDER_NAME}' 已在上次安装中移动, 跳过解压")
+        elif not expected_aura_source_path.is_dir():
             log.error(
                 f"ZIP 解压后目录结构校验异常 {config.EXTRACTED_FOLDER_NAME} {temp_extract_path}, 尝试自动修复..."
             )
@@ -259,140 +575,204 @@ def run_installation(args=None, installerClassIns=None):
                 error_detail = "Aura.zip 结构解析失败, 文件结构不正确"
                 log.critical(error_detail)
                 raise Exception(error_detail)
-
-        update_progress(50, "[5 / 10] 卸载文件系统过滤驱动")
-        try:
-            if not args.dry_run:
-                creationflags = subprocess.CREATE_NO_WINDOW
-                command = ["fltmc", "unload", "SeewoKeLiteLady"]
-                result = subprocess.run(
-                    command,
-                    capture_output=True,
-                    text=True,
-                    check=False,
-                    creationflags=creationflags,
-                )
-                log.info(f"卸载命令执行成功, 返回值: {result.returncode}")
-                if result.stdout:
-                    log.debug(f"fltmc stdout: {result.stdout.strip()}")
-                if result.stderr:
-                    log.warning(f"fltmc stderr: {result.stderr.strip()}")
-        except FileNotFoundError:
-            log.error('未能找到 "fltmc" 命令, 请确保您的系统环境完整。')
-        except Exception as e:
-            log.error(f"调用 fltmc 时发生未知错误: {e}")
-
-        update_progress(60, "[6 / 10] 移动 Aura 文件夹")
-        target_aura_path = install_dir_path / config.EXTRACTED_FOLDER_NAME
+        return {
+            "aura_zip_path": downloaded_zip_path,
+            "aura_source_path": expected_aura_source_path,
+            "core_extracted": True,
+        }
+
+    def step_move_aura(ctx):
+        install_dir_path = ctx["install_dir_path"]
+        target_aura_path = ctx["target_aura_path"]
+        expected_aura_source_path = ctx["aura_source_path"]
+        journal = ctx["journal"]
+        if journal and journal.get("move"):
+            return {"aura_moved": True}
         log.info(
             f"即将将 '{config.EXTRACTED_FOLDER_NAME}' 移动至 {target_aura_path}..."
         )
         try:
-            if target_aura_path.exists():
-                log.warning(
-                    f"发现旧版本 HugoAura 目录: {target_aura_path}, 即将清理..."
-                )
-                if not args.dry_run:
-                    shutil.rmtree(target_aura_path)
-                    time.sleep(0.1)
-                ssa_asar = "app.asar.bak"
-                if os.path.exists(install_dir_path / ssa_asar):
-                    log.warning(
-                        "Patch ASAR 将使用备份的ASAR，请确保其完整并未更改..."
-                    )
-                else:
-                    log.warning(
-                        "app.asar.bak未找到，将不进行Patch操作..."
-                    )
-                    log.warning(
-                        "若现有的app.asar为未patch过的，请将其复制到app.asar.bak。"
-                    )
-                    if_patch = False
             if not args.dry_run:
-                shutil.move(str(expected_aura_source_path), str(target_aura_path))
+                # 原有的 aura 文件夹保留至安装完成, 以便回滚
+                old_aura_path = install_dir_path / config.AURA_OLD_DIR_NAME
+                if journal.get("move_started") and old_aura_path.exists():
+                    # 上次安装在移动过程中中断, 原有的文件夹已位于 old_aura_path, 不能再次交换
+                    if target_aura_path.exists():
+                        shutil.rmtree(target_aura_path)
+                    os.rename(expected_aura_source_path, target_aura_path)
+                else:
+                    journal.record("move_started", had_previous=target_aura_path.exists())
+                    try:
+                        fileOps.swap_directory(
+                            expected_aura_source_path, target_aura_path, old_aura_path
+                        )
+                    except OSError as e:
+                        log.warning(f"无法通过重命名替换 Aura 文件夹, 改为删除后移动: {e}")
+                        if target_aura_path.exists():
+                            shutil.rmtree(target_aura_path)
+                            time.sleep(0.1)
+                        shutil.move(str(expected_aura_source_path), str(target_aura_path))
+                journal.record("move")
             log.success(f"成功移动文件夹 '{config.EXTRACTED_FOLDER_NAME}'")
         except Exception as e:
             error_detail = f"移动文件夹 '{config.EXTRACTED_FOLDER_NAME}' 时发生错误: {e}"
             log.critical(error_detail)
             raise Exception(error_detail)
-            
-        if if_patch:
-            update_progress(65, "[6.5 / 10] Patch ASAR")
+        return {"aura_moved": True}
+
+    def step_patch_asar(ctx):
+        install_dir_path = ctx["install_dir_path"]
+        if_patch = ctx["if_patch"]
+        journal = ctx["journal"]
+        core_sha256 = sha256_of_file(ctx["downloaded_core_path"])
+        # 记录现有的 app.asar 是否为当前 core.zip 与补丁规则的 Patch 结果
+        asar_current = False
+        if journal and journal.get("replace"):
+            # 上次安装已替换 ASAR
+            if_patch = False
+        elif if_patch and not upgradePlanner.asar_patch_required(
+            ctx["install_manifest"],
+            install_dir_path,
+            core_sha256,
+            asarPatcher.mainjs_patch_engine.fingerprint,
+        ):
+            log.info("core.zip、原始 ASAR 与补丁规则均未变化, 无需重新 Patch ASAR")
+            if_patch = False
+            asar_current = True
+
+        patched_asar_path = None
+        # 补丁规则在中断后发生变化 (例如更新了安装程序) 时, 上次 Patch 的 ASAR 不再可用
+        resumed_asar_path = (
+            if_patch
+            and journal
+            and (journal.get("patch") or {}).get("patch_fingerprint")
+            == asarPatcher.mainjs_patch_engine.fingerprint
+            and journal.artifact("patch", "patched_asar")
+        )
+        if resumed_asar_path:
+            log.info(f"复用上次安装 Patch 后的 ASAR: {resumed_asar_path}")
+            patched_asar_path = str(resumed_asar_path)
+        elif if_patch:
             PatchResult = asarPatcher.patch_asar_file(
-                input_asar_path=str(install_dir_path / ssa_asar),
-                temp_extract_dir=str(Path(config.TEMP_INSTALL_DIR) / "asar_temp"),
+                input_asar_path=str(install_dir_path / ctx["ssa_asar"]),
                 output_asar_path=str(Path(config.TEMP_INSTALL_DIR) / config.ASAR_FILENAME),
-                core_dir=str(temp_extract_path_core)
+                core_dir=str(ctx["temp_extract_path_core"]),
+                core_sha256=core_sha256,
+                source_sha256=ctx["source_asar_sha256"],
+                # Dry Run 时不写入安装目录
+                cache_dir=(
+                    None
+                    if args.dry_run
+                    else str(install_dir_path / config.PATCHED_ASAR_CACHE_DIR_NAME)
+                ),
             )
             if not PatchResult[0]:
                 error_detail = f"ASAR 文件修改失败: {PatchResult[1]}"
                 log.critical(error_detail)
                 raise Exception(error_detail)
             log.info(f"ASAR 文件修改成功, 输出路径: {PatchResult[1]}")
+            patched_asar_path = PatchResult[1]
+            if journal:
+                journal.record(
+                    "patch",
+                    artifacts={"patched_asar": Path(patched_asar_path)},
+                    patch_fingerprint=asarPatcher.mainjs_patch_engine.fingerprint,
+                )
+        return {
+            "core_sha256": core_sha256,
+            "patched_asar_path": patched_asar_path,
+            "asar_current": asar_current,
+        }
 
-        update_progress(70, "[7 / 10] 启动结束进程后台任务")
+    def step_start_killer(ctx):
         if not args.dry_run:
             killer.start_killing_process()
-            time.sleep(2.0)
-
-        if if_patch:
-            update_progress(80, "[8 / 10] 替换 ASAR 包")
-            original_asar_path = install_dir_path / config.TARGET_ASAR_NAME
-            temp_asar_path = PatchResult[1]
-
-            log.info(f"正在将 {original_asar_path} 替换为新的 {temp_asar_path}...")
-
-            # 创建原始ASAR文件的备份
-            backup_asar_path = install_dir_path / "app.asar.bak"
-            if original_asar_path.exists() and not backup_asar_path.exists():
-                try:
-                    log.info(f"创建原始ASAR备份: {backup_asar_path}")
-                    if not args.dry_run:
-                        shutil.copy2(str(original_asar_path), str(backup_asar_path))
-                    log.success("原始ASAR备份创建成功")
-                except Exception as e:
-                    log.warning(f"创建ASAR备份失败: {e}")
-
-            def del_original_asar():
-                if original_asar_path.exists():
-                    log.info(f"尝试删除旧的 {original_asar_path}...")
-                    try:
-                        if not args.dry_run:
-                            os.remove(original_asar_path)
-                        log.success(f"旧的 {config.TARGET_ASAR_NAME} 删除成功。")
-                        time.sleep(0.2)
-                    except OSError as e:
-                        log.error(
-                            f"未能删除 {original_asar_path}: {e} | 旧的 ASAR 可能仍被占用中..."
-                        )
-                        log.info("准备重试删除...")
-                        time.sleep(0.5)
-                        del_original_asar()
-                else:
-                    log.info(f"未找到旧的 {config.TARGET_ASAR_NAME}, 跳过删除...")
-
-            del_original_asar()
-
+            # 希沃管家退出后 app.asar 即解除占用, 无需固定等待
+            asar_path = ctx["install_dir_path"] / config.TARGET_ASAR_NAME
+            try:
+                waited = fileOps.wait_until_unlocked(asar_path)
+                log.info(f"{config.TARGET_ASAR_NAME} 已解除占用 (等待 {waited:.2f} 秒)")
+            except fileOps.FileLockTimeout as e:
+                # 替换步骤删除旧文件时会再次等待, 并在超时后报错
+                log.warning(str(e))
+        return {"killer_started": True}
+
+    def step_replace_asar(ctx):
+        install_dir_path = ctx["install_dir_path"]
+        journal = ctx["journal"]
+        if journal and journal.get("replace"):
+            log.info(f"{config.TARGET_ASAR_NAME} 已在上次安装中替换, 跳过")
+            return {"asar_patched": True}
+        temp_asar_path = ctx["patched_asar_path"]
+        if not temp_asar_path:
+            return {"asar_patched": ctx["asar_current"]}
+
+        original_asar_path = install_dir_path / config.TARGET_ASAR_NAME
+        old_asar_path = install_dir_path / config.ASAR_OLD_NAME
+        log.info(f"正在将 {original_asar_path} 替换为新的 {temp_asar_path}...")
+
+        # 创建原始ASAR文件的备份
+        backup_asar_path = install_dir_path / "app.asar.bak"
+        backup_created = False
+        if original_asar_path.exists() and not backup_asar_path.exists():
             try:
-                log.info(f"正在将 {temp_asar_path} 移到 {original_asar_path}...")
+                log.info(f"创建原始ASAR备份: {backup_asar_path}")
                 if not args.dry_run:
-                    shutil.move(str(temp_asar_path), str(original_asar_path))
-                if original_asar_path.exists() or args.dry_run:
-                    log.success(f"替换 {config.TARGET_ASAR_NAME} 成功。")
-                    install_success = True
-                else:
-                    error_detail = f"移动到 {original_asar_path} 失败, ASAR文件替换未成功"
-                    log.critical(error_detail)
-                    raise Exception(error_detail)
+                    shutil.copy2(str(original_asar_path), str(backup_asar_path))
+                    backup_created = True
+                log.success("原始ASAR备份创建成功")
             except Exception as e:
-                error_detail = f"替换ASAR文件时发生错误: {e}。请检查文件系统过滤驱动已被卸载, 并确认对希沃管家目录有写入权限。"
+                log.warning(f"创建ASAR备份失败: {e}")
+
+        # 旧的 app.asar 暂存为 app.asar.old, 安装完成后删除, 回滚时恢复
+        replace_started = journal and journal.get("replace_started")
+        if journal:
+            journal.record(
+                "replace_started",
+                backup_created=backup_created
+                or bool(replace_started and replace_started["backup_created"]),
+            )
+        try:
+            if replace_started and old_asar_path.exists():
+                # 上次替换中断, 旧文件已暂存, 当前的 app.asar 可能不完整
+                log.info(f"旧的 {config.TARGET_ASAR_NAME} 已暂存为 {old_asar_path}")
+                if not args.dry_run:
+                    fileOps.remove_file_when_unlocked(original_asar_path)
+            elif original_asar_path.exists():
+                log.info(f"正在将旧的 {original_asar_path} 暂存为 {old_asar_path}...")
+                if not args.dry_run:
+                    fileOps.replace_file_when_unlocked(original_asar_path, old_asar_path)
+                log.success(f"旧的 {config.TARGET_ASAR_NAME} 已移除。")
+            else:
+                log.info(f"未找到旧的 {config.TARGET_ASAR_NAME}, 跳过移除...")
+        except fileOps.FileLockTimeout as e:
+            error_detail = f"未能移除旧的 {config.TARGET_ASAR_NAME}: {e}"
+            log.critical(error_detail)
+            raise Exception(error_detail)
+
+        try:
+            log.info(f"正在将 {temp_asar_path} 移到 {original_asar_path}...")
+            if not args.dry_run:
+                shutil.move(str(temp_asar_path), str(original_asar_path))
+            if original_asar_path.exists() or args.dry_run:
+                log.success(f"替换 {config.TARGET_ASAR_NAME} 成功。")
+            else:
+                error_detail = f"移动到 {original_asar_path} 失败, ASAR文件替换未成功"
                 log.critical(error_detail)
                 raise Exception(error_detail)
-        else:
-            install_success = True
-
-
-        update_progress(90, "[9 / 10] 写入版本信息和安装时间到注册表")
+        except Exception as e:
+            error_detail = f"替换ASAR文件时发生错误: {e}。请检查文件系统过滤驱动已被卸载, 并确认对希沃管家目录有写入权限。"
+            log.critical(error_detail)
+            raise Exception(error_detail)
+        if journal:
+            journal.record("replace")
+        return {"asar_patched": True}
+
+    def step_write_registry(ctx):
+        nonlocal install_success
+        install_success = True
+        install_dir_path = ctx["install_dir_path"]
+        download_source = ctx["download_source"]
         # 写入版本信息和安装时间到注册表
         try:
             if not args.dry_run:
@@ -417,6 +797,112 @@ def run_installation(args=None, installerClassIns=None):
         except Exception as e:
             log.warning(f"写入注册表失败: {e}")
 
+        # 记录本次安装的文件与 ASAR 状态, 供下次增量升级使用
+        if not args.dry_run:
+            try:
+                original_asar_path = install_dir_path / config.TARGET_ASAR_NAME
+                backup_asar_path = install_dir_path / "app.asar.bak"
+                upgradePlanner.save_install_manifest(
+                    install_dir_path,
+                    {
+                        "version": download_source,
+                        "core_sha256": ctx["core_sha256"],
+                        "patch_fingerprint": (
+                            asarPatcher.mainjs_patch_engine.fingerprint
+                            if ctx["asar_patched"]
+                            else None
+                        ),
+                        "patched_asar": (
+                            upgradePlanner.file_stamp(original_asar_path)
+                            if original_asar_path.exists()
+                            else None
+                        ),
+                        "source_asar": (
+                            upgradePlanner.file_stamp(backup_asar_path)
+                            if backup_asar_path.exists()
+                            else None
+                        ),
+                        "files": upgradePlanner.snapshot_aura_files(
+                            ctx["target_aura_path"], ctx["aura_zip_path"]
+                        ),
+                    },
+                )
+            except Exception as e:
+                log.warning(f"写入安装清单失败, 下次安装将完整比对文件: {e}")
+
+        # 安装完成, 删除安装日志与为回滚保留的旧文件
+        if journal:
+            journal.discard()
+            old_aura_path = install_dir_path / config.AURA_OLD_DIR_NAME
+            if old_aura_path.exists():
+                fileOps.remove_tree_in_background(old_aura_path)
+            try:
+                fileOps.remove_file_when_unlocked(install_dir_path / config.ASAR_OLD_NAME)
+            except (fileOps.FileLockTimeout, OSError) as e:
+                log.warning(f"删除旧的 {config.TARGET_ASAR_NAME} 失败, 请手动删除: {e}")
+        return None
+
+    # 可能等待用户输入的步骤
+    dir_interactive = not (args and (args.dir or args.yes))
+    version_interactive = not (
+        args
+        and (args.path or args.version or args.latest or args.pre or args.ci or args.yes)
+    )
+    # 查找目录与选择版本互不依赖, 读取原始 ASAR 与卸载驱动、下载并发执行;
+    # 卸载驱动需在用户确认安装目录与版本之后、向希沃管家目录写入 (暂存解压) 之前完成,
+    # 安装失败时在收尾阶段重新加载。
+    # 步骤的开始顺序随并发执行而变化, 标题不带序号, 总进度由调度器按权重报告
+    steps = [
+        Step("find_dir", "查找希沃管家安装目录", step_find_dir,
+             outputs=("install_dir_path",), interactive=dir_interactive),
+        Step("select_version", "选择 HugoAura 版本", step_select_version,
+             outputs=("download_source",), interactive=version_interactive),
+        Step("unload_driver", "卸载文件系统过滤驱动", step_unload_driver,
+             inputs=("install_dir_path", "download_source", "journal"),
+             outputs=("driver_unloaded",)),
+        Step("open_journal", "读取安装日志", step_open_journal,
+             inputs=("install_dir_path", "download_source"), outputs=("journal",), weight=0),
+        Step("inspect_asar", "读取原始 ASAR", step_inspect_asar,
+             inputs=("install_dir_path", "journal"),
+             outputs=("ssa_asar", "if_patch", "source_asar_sha256"), weight=5),
+        Step("download", "获取资源文件", step_download,
+             inputs=("install_dir_path", "download_source", "driver_unloaded", "journal"),
+             outputs=("target_aura_path", "incremental_upgrade", "install_manifest",
+                      "temp_extract_path", "temp_extract_path_core",
+                      "downloaded_zip_path", "downloaded_core_path")),
+        Step("extract", "解压资源文件", step_extract,
+             inputs=("target_aura_path", "incremental_upgrade", "install_manifest",
+                     "temp_extract_path", "temp_extract_path_core",
+                     "downloaded_zip_path", "downloaded_core_path", "journal"),
+             outputs=("aura_zip_path", "aura_source_path", "core_extracted")),
+        # 依赖 if_patch 以保证在替换前检查旧版本的 aura 文件夹
+        Step("move_aura", "移动 Aura 文件夹", step_move_aura,
+             inputs=("install_dir_path", "target_aura_path", "aura_source_path", "if_patch",
+                     "journal"),
+             outputs=("aura_moved",)),
+        Step("patch_asar", "Patch ASAR", step_patch_asar,
+             inputs=("install_dir_path", "install_manifest", "downloaded_core_path",
+                     "temp_extract_path_core", "core_extracted",
+                     "if_patch", "ssa_asar", "source_asar_sha256", "journal"),
+             outputs=("core_sha256", "patched_asar_path", "asar_current"), weight=5),
+        Step("start_killer", "启动结束进程后台任务", step_start_killer,
+             inputs=("install_dir_path", "aura_moved"), outputs=("killer_started",)),
+        Step("replace_asar", "替换 ASAR 包", step_replace_asar,
+             inputs=("install_dir_path", "patched_asar_path", "asar_current", "killer_started",
+                     "journal"),
+             outputs=("asar_patched",)),
+        Step("write_registry", "写入版本信息和安装时间到注册表", step_write_registry,
+             inputs=("install_dir_path", "download_source", "target_aura_path",
+                     "aura_zip_path", "core_sha256", "asar_patched", "journal")),
+    ]
+
+    try:
+        update_progress(0, "准备")
+        log.info(f"即将开始运行 {config.APP_NAME} 管理工具")
+        with tracer.span("install", dry_run=args.dry_run):
+            scheduler = StepScheduler(steps, update_progress)
+            scheduler.run()
+
     except Exception as e:
         error_detail = e
         if installerClassIns and not installerClassIns.is_installing:
@@ -427,18 +913,35 @@ def run_installation(args=None, installerClassIns=None):
     finally:
         update_progress(
             100,
-            f"[10 / 10] 安装{"完成" if install_success else f"出错: {error_detail}"}",
+            f"安装{"完成" if install_success else f"出错: {error_detail}"}",
             "success" if install_success else "error",
         )
 
         if not args.dry_run:
             killer.stop_killing_process()
 
+        # 安装失败 (包括用户取消) 时恢复希沃管家的文件保护
+        if driver_unloaded and not install_success:
+            log.info("安装未完成, 重新加载文件系统过滤驱动")
+            _run_fltmc("load")
+
+        # 安装失败或 aura.zip 中存在嵌套目录时, 暂存目录会有残留
+        if not args.dry_run and install_dir_path:
+            staging_path = install_dir_path / config.AURA_STAGING_DIR_NAME
+            if staging_path.exists():
+                fileOps.remove_tree_in_background(staging_path)
+
         temp_dir = Path(config.TEMP_INSTALL_DIR)
         if temp_dir.exists():
             try:
                 if not args.dry_run:
-                    shutil.rmtree(temp_dir)
+                    # 安装失败时保留未完成的下载, 以便下次运行时续传
+                    # 安装未完成时同时保留安装日志记录的资源文件与 Patch 后的 ASAR, 以便继续安装
+                    fileDownloader.clean_temp_dir(
+                        temp_dir,
+                        keep_partial=not install_success,
+                        keep=journal.artifact_paths() if journal and not install_success else (),
+                    )
                 else:
                     log.info(f"临时文件夹目录: {temp_dir}")
                     log.info("可前往该目录检查 Dry Run 下载 / 解压产物")
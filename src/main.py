@@ -2,10 +2,12 @@ import sys
 import os
 import time
 import argparse
+from pathlib import Path
 from loguru import logger as log
 from utils import uac
 from version import __appVer__
 import installer
+from utils.tracer import tracer
 from config import config
 
 
@@ -43,6 +45,15 @@ def parse_arguments():
     parser.add_argument(
         "--dry-run", help="不进行实际安装操作, 仅执行下载流程", action="store_true"
     )
+    parser.add_argument(
+        "--rollback", help="根据安装日志撤销未完成的安装", action="store_true"
+    )
+    parser.add_argument(
+        "--trace",
+        help="将各步骤的耗时以 Chrome trace_event 格式写入指定的 JSON 文件 (可在 Perfetto 中查看)",
+        metavar="OUT",
+        type=str,
+    )
     parser.add_argument(
         "--list-exit-codes", help="显示所有退出代码及其释义", action="store_true"
     )
@@ -93,13 +104,23 @@ def main():
             sys.exit(2)  # 权限不足
     else:
         log.info("管理工具正以管理员权限运行, 即将启动安装流程...")
+        if args.trace:
+            tracer.enable()
         success = False
         try:
-            success = installer.run_installation(args)
+            if args.rollback:
+                success = installer.rollback_installation(args)
+            else:
+                success = installer.run_installation(args)
         except Exception as e:
             log.exception(f"执行安装流程时发生意外错误: {e}")
             success = False
         finally:
+            if args.trace:
+                try:
+                    tracer.export_chrome_trace(Path(args.trace))
+                except OSError as e:
+                    log.warning(f"写入耗时追踪文件失败: {e}")
             time.sleep(1.0)
             if not args.yes:
                 print("\n按回车键退出...")
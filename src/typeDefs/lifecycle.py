@@ -3,3 +3,4 @@ from enum import Enum
 
 class GLOBAL_CALLBACKS(Enum):
     REPORT_DOWNLOAD_PROGRESS = "reportDlProgress"
+    REPORT_EXTRACT_PROGRESS = "reportExtractProgress"
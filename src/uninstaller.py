@@ -5,11 +5,12 @@ HugoAura 卸载器
 import os
 import shutil
 import subprocess
-import time
 import winreg
+from contextlib import ExitStack
 from pathlib import Path
 from loguru import logger as log
-from utils import dirSearch, killer
+from utils import dirSearch, fileOps, killer
+from utils.tracer import tracer
 from config import config
 
 
@@ -116,8 +117,11 @@ def run_uninstallation(args=None, installerClassIns=None):
     # 获取进度回调函数
     progress_callback = getattr(args, "progress_callback", None)
     status_callback = getattr(args, "status_callback", None)
+    # 每个阶段记录为一个 span, 进入下一阶段时结束上一阶段
+    stage_span = ExitStack()
 
     def update_progress(progress, step, status=None):
+        stage_span.close()
         if installerClassIns:
             if not installerClassIns.is_uninstalling:
                 update_status("卸载已取消")
@@ -125,6 +129,7 @@ def run_uninstallation(args=None, installerClassIns=None):
         if progress_callback:
             progress_callback(progress, step, status)
         log.info(step)
+        stage_span.enter_context(tracer.span(step, progress=progress))
 
     def update_status(status):
         if status_callback:
@@ -155,7 +160,13 @@ def run_uninstallation(args=None, installerClassIns=None):
         # 启动进程终止任务
         if not (args and args.dry_run):
             killer.start_killing_process()
-            time.sleep(2.0)
+            if install_info["install_path"]:
+                try:
+                    fileOps.wait_until_unlocked(
+                        Path(install_info["install_path"]) / config.TARGET_ASAR_NAME
+                    )
+                except fileOps.FileLockTimeout as e:
+                    log.warning(str(e))
 
         update_progress(30, "[3 / 8] 卸载文件系统过滤驱动")
         try:
@@ -186,8 +197,7 @@ def run_uninstallation(args=None, installerClassIns=None):
 
                     log.info(f"恢复原始ASAR文件: {backup_path} -> {current_asar}")
                     if not (args and args.dry_run):
-                        if current_asar.exists():
-                            os.remove(current_asar)
+                        fileOps.remove_file_when_unlocked(current_asar)
                         shutil.copy2(backup_file, current_asar)
                         # 删除备份文件
                         os.remove(backup_file)
@@ -213,11 +223,47 @@ def run_uninstallation(args=None, installerClassIns=None):
                     log.success("Aura文件夹删除成功")
                 else:
                     log.info("Aura文件夹不存在, 跳过")
+                # 安装过程中被中断时可能残留暂存目录与旧版本目录
+                for leftover_name in (
+                    config.AURA_STAGING_DIR_NAME,
+                    config.AURA_OLD_DIR_NAME,
+                ):
+                    leftover_folder = aura_folder.parent / leftover_name
+                    if leftover_folder.exists():
+                        log.info(f"删除残留的文件夹: {leftover_folder}")
+                        if not (args and args.dry_run):
+                            shutil.rmtree(leftover_folder)
+                manifest_path = aura_folder.parent / config.AURA_MANIFEST_FILENAME
+                if manifest_path.exists() and not (args and args.dry_run):
+                    os.remove(manifest_path)
             except Exception as e:
                 error_detail = f"删除Aura文件夹失败: {e}, 可能文件被占用"
                 log.error(error_detail)
                 # Aura文件夹删除失败不是致命错误, 记录警告但继续执行
                 log.warning("Aura文件夹删除失败, 但不影响主要卸载流程")
+        if install_info["install_path"]:
+            # 安装过程中被中断时可能残留安装日志与被替换下来的旧ASAR
+            install_dir = Path(install_info["install_path"])
+            journal_path = install_dir / config.AURA_JOURNAL_FILENAME
+            for leftover_file in (
+                journal_path,
+                journal_path.with_name(journal_path.name + ".tmp"),
+                install_dir / config.ASAR_OLD_NAME,
+            ):
+                if not leftover_file.exists():
+                    continue
+                log.info(f"删除残留的文件: {leftover_file}")
+                if args and args.dry_run:
+                    continue
+                try:
+                    os.remove(leftover_file)
+                except Exception as e:
+                    log.warning(f"删除残留的文件 {leftover_file} 失败: {e}")
+            cache_dir = install_dir / config.PATCHED_ASAR_CACHE_DIR_NAME
+            if cache_dir.exists():
+                log.info(f"删除 Patch 后的 ASAR 缓存: {cache_dir}")
+                if not (args and args.dry_run):
+                    shutil.rmtree(cache_dir, ignore_errors=True)
 
         update_progress(60, "[6 / 8] 清理注册表")
         try:
@@ -256,6 +302,7 @@ def run_uninstallation(args=None, installerClassIns=None):
             killer.stop_killing_process()
 
         update_progress(100, "卸载完成" if uninstall_success else f"出现错误: {error_detail}", "success" if uninstall_success else "error")
+        stage_span.close()
 
         if uninstall_success:
             log.success("=========================================")
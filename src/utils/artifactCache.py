@@ -0,0 +1,237 @@
+"""
+本地产物缓存
+文件按 SHA-256 内容寻址存放, 通过 key (例如 "<tag>/<文件名>") 索引,
+读取时重新校验 SHA-256, 总大小超出上限时按最近使用时间淘汰
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from loguru import logger as log
+from config.config import ARTIFACT_CACHE_DIR, ARTIFACT_CACHE_MAX_BYTES
+
+
+def sha256_of_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """内容寻址的本地文件缓存"""
+
+    def __init__(self, root: Path, max_bytes: int):
+        """
+        Args:
+            root: 缓存目录
+            max_bytes: 缓存总大小上限 (字节)
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index_file = root / "index.json"
+        self.blob_dir = root / "blobs"
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Dict]] = None
+
+    def _load_index(self) -> Dict[str, Dict]:
+        if self._index is None:
+            try:
+                with open(self.index_file, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except FileNotFoundError:
+                self._index = {}
+            except (OSError, ValueError) as e:
+                log.warning(f"缓存索引读取失败, 将重建缓存索引: {e}")
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_file.with_name(self.index_file.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._index, f, indent=2)
+            os.replace(tmp_path, self.index_file)
+        except OSError as e:
+            log.warning(f"缓存索引写入失败: {e}")
+
+    def _blob_path(self, sha256: str) -> Path:
+        return self.blob_dir / sha256
+
+    def _drop(self, key: str):
+        index = self._load_index()
+        entry = index.pop(key, None)
+        if entry and not any(e["sha256"] == entry["sha256"] for e in index.values()):
+            blob_path = self._blob_path(entry["sha256"])
+            if blob_path.exists():
+                os.remove(blob_path)
+
+    def contains(self, key: str, sha256: str | None = None) -> bool:
+        """是否存在 key 对应的缓存 (不校验文件内容)"""
+        with self._lock:
+            entry = self._load_index().get(key)
+            if not entry or (sha256 and entry["sha256"] != sha256):
+                return False
+            return self._blob_path(entry["sha256"]).exists()
+
+    def get(self, key: str, sha256: str | None = None) -> Optional[Path]:
+        """
+        获取缓存文件路径, 内容校验失败时删除该缓存
+
+        Args:
+            key: 缓存 key
+            sha256: 预期的 SHA-256, 提供时与缓存记录不一致视为未命中
+
+        Returns:
+            缓存文件路径, 未命中时返回 None
+        """
+        with self._lock:
+            entry = self._load_index().get(key)
+            if not entry:
+                return None
+            if sha256 and entry["sha256"] != sha256:
+                log.info(f"缓存 {key} 已过期, 已丢弃")
+                self._drop(key)
+                self._save_index()
+                return None
+
+            blob_path = self._blob_path(entry["sha256"])
+            try:
+                if (
+                    blob_path.stat().st_size != entry["size"]
+                    or sha256_of_file(blob_path) != entry["sha256"]
+                ):
+                    log.warning(f"缓存 {key} 校验失败, 已丢弃")
+                    self._drop(key)
+                    self._save_index()
+                    return None
+            except OSError:
+                self._drop(key)
+                self._save_index()
+                return None
+
+            entry["last_used"] = time.time()
+            self._save_index()
+            return blob_path
+
+    def put(self, key: str, src_path: Path, sha256: str | None = None) -> Optional[str]:
+        """
+        将文件存入缓存
+
+        Args:
+            key: 缓存 key
+            src_path: 源文件
+            sha256: 源文件的 SHA-256, 未提供时自动计算
+
+        Returns:
+            文件的 SHA-256, 写入失败时返回 None
+        """
+        try:
+            sha256 = sha256 or sha256_of_file(src_path)
+            size = src_path.stat().st_size
+            if size > self.max_bytes:
+                return sha256
+
+            with self._lock:
+                blob_path = self._blob_path(sha256)
+                if not blob_path.exists():
+                    self.blob_dir.mkdir(parents=True, exist_ok=True)
+                    tmp_path = blob_path.with_name(blob_path.name + ".tmp")
+                    shutil.copyfile(src_path, tmp_path)
+                    os.replace(tmp_path, blob_path)
+
+                self._load_index()[key] = {
+                    "sha256": sha256,
+                    "size": size,
+                    "last_used": time.time(),
+                }
+                self._evict()
+                self._save_index()
+            return sha256
+        except OSError as e:
+            log.warning(f"写入缓存 {key} 失败: {e}")
+            return None
+
+    def materialize(
+        self, key: str, dest_path: Path, sha256: str | None = None, link: bool = True
+    ) -> Optional[Path]:
+        """
+        将缓存文件放置到 dest_path, 同一卷上使用硬链接, 否则复制
+
+        Args:
+            key: 缓存 key
+            dest_path: 目标路径
+            sha256: 预期的 SHA-256, 提供时仅在缓存内容一致时命中
+            link: 是否允许使用硬链接; 硬链接与缓存文件共享数据与权限,
+                目标文件之后会被安装到其他位置 (而非只读使用) 时应传入 False,
+                此时复制后校验副本的 SHA-256
+
+        Returns:
+            dest_path, 未命中时返回 None
+        """
+        if not link:
+            return self._materialize_copy(key, dest_path, sha256)
+        blob_path = self.get(key, sha256)
+        if not blob_path:
+            return None
+        try:
+            dest_path.parent.mkdir(parents=True, exist_ok=True)
+            if dest_path.exists():
+                os.remove(dest_path)
+            try:
+                os.link(blob_path, dest_path)
+            except OSError:
+                shutil.copyfile(blob_path, dest_path)
+            return dest_path
+        except OSError as e:
+            log.warning(f"从缓存复制 {key} 失败: {e}")
+            return None
+
+    def _materialize_copy(
+        self, key: str, dest_path: Path, sha256: str | None
+    ) -> Optional[Path]:
+        """复制缓存文件后校验副本, 校验结果不受缓存文件在校验之后被修改的影响"""
+        with self._lock:
+            entry = self._load_index().get(key)
+            if not entry or (sha256 and entry["sha256"] != sha256):
+                return None
+            try:
+                dest_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(self._blob_path(entry["sha256"]), dest_path)
+                if sha256_of_file(dest_path) != entry["sha256"]:
+                    os.remove(dest_path)
+                    log.warning(f"缓存 {key} 校验失败, 已丢弃")
+                    self._drop(key)
+                    self._save_index()
+                    return None
+            except OSError as e:
+                log.warning(f"从缓存复制 {key} 失败: {e}")
+                return None
+            entry["last_used"] = time.time()
+            self._save_index()
+        return dest_path
+
+    def _evict(self):
+        """按最近使用时间淘汰缓存, 直到去重后的总大小不超过上限"""
+        index = self._load_index()
+        sizes = {entry["sha256"]: entry["size"] for entry in index.values()}
+        total_size = sum(sizes.values())
+        for key in sorted(index, key=lambda k: index[k]["last_used"]):
+            if total_size <= self.max_bytes:
+                break
+            sha256 = index[key]["sha256"]
+            self._drop(key)
+            if sha256 not in {entry["sha256"] for entry in index.values()}:
+                total_size -= sizes[sha256]
+            log.info(f"缓存 {key} 已被淘汰")
+
+
+# 发行版资源文件缓存
+release_cache = ArtifactCache(Path(ARTIFACT_CACHE_DIR) / "releases", ARTIFACT_CACHE_MAX_BYTES)
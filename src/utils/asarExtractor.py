@@ -0,0 +1,155 @@
+"""
+ASAR 解包
+按数据偏移顺序读取 ASAR 并写出文件, 可选多线程
+"""
+
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
+from pathlib import Path
+from typing import List, Optional, Tuple
+from loguru import logger as log
+from utils.asarIndex import AsarEntry, AsarFormatError, AsarIndex
+from utils.zipExtractor import member_path
+
+# 读取 ASAR 数据的缓冲区大小
+EXTRACT_BUFFER_SIZE = 1024 * 1024
+
+
+def _link_target(extract_to: Path, link: str) -> Optional[Path]:
+    """
+    计算符号链接指向的路径, link 为相对于 ASAR 根目录的路径
+
+    link 为绝对路径、包含 ".." 或解析 (含已存在的符号链接) 后不在解包目录内时返回 None;
+    由于每个链接都不含 "..", 链接之间互相指向也无法逃逸出解包目录
+    """
+    link = link.replace("\\", "/")
+    if os.path.splitdrive(link)[0] or link.startswith("/") or ".." in link.split("/"):
+        return None
+    target = member_path(extract_to, link)
+    if target is None:
+        return None
+    root = os.path.realpath(extract_to)
+    if os.path.commonpath([root, os.path.realpath(target)]) != root:
+        return None
+    return target
+
+
+def _split_contiguous(
+    entries: List[Tuple[AsarEntry, Path]], bucket_count: int
+) -> List[List[Tuple[AsarEntry, Path]]]:
+    """将按偏移排序的文件切分为总大小相近的连续区段, 每个线程内仍为顺序读取"""
+    total = sum(entry.size for entry, _ in entries)
+    target = total / bucket_count
+    buckets: List[List[Tuple[AsarEntry, Path]]] = [[]]
+    load = 0
+    for item in entries:
+        if load >= target and len(buckets) < bucket_count:
+            buckets.append([])
+            load = 0
+        buckets[-1].append(item)
+        # 文件本身的开销 (创建文件等) 按 1 KB 计入
+        load += item[0].size + 1024
+    return [bucket for bucket in buckets if bucket]
+
+
+def extract_asar(asar_path: Path, extract_to: Path, max_workers: int = 1) -> int:
+    """
+    解包 ASAR 文件
+
+    先创建全部目录, 再按数据偏移顺序经由复用的缓冲区写出各文件;
+    解包后存放在 <ASAR 文件名>.unpacked 中的文件从该目录复制
+
+    Args:
+        asar_path: ASAR 文件路径
+        extract_to: 解包目录
+        max_workers: 最大线程数, 为 1 时在当前线程中顺序写出
+
+    Returns:
+        写出的文件数量 (不含目录与符号链接)
+    """
+    index = AsarIndex.open(asar_path)
+    unpacked_root = asar_path.with_name(asar_path.name + ".unpacked")
+    entries = []
+    directories = {extract_to}
+    copied = 0
+    for entry in index:
+        target = member_path(extract_to, entry.path)
+        if target is None:
+            log.warning(f"跳过路径异常的 ASAR 条目: {entry.path}")
+            continue
+        if entry.is_dir:
+            directories.add(target)
+        else:
+            directories.add(target.parent)
+            if entry.offset >= 0:
+                entries.append((entry, target))
+    for directory in sorted(directories):
+        directory.mkdir(parents=True, exist_ok=True)
+
+    for entry in index:
+        target = member_path(extract_to, entry.path)
+        if target is None:
+            continue
+        if entry.is_link:
+            link_target = _link_target(extract_to, entry.link)
+            if link_target is None:
+                log.warning(f"跳过目标路径异常 (可能指向解包目录之外) 的符号链接: {entry.path} -> {entry.link}")
+                continue
+            # link 为相对于 ASAR 根目录的路径, 需换算为相对于链接所在目录的路径
+            try:
+                os.symlink(os.path.relpath(link_target, target.parent), target)
+            except OSError as e:
+                log.warning(f"无法创建符号链接 {entry.path}: {e}")
+        elif entry.unpacked and not entry.is_dir:
+            source = unpacked_root / entry.path
+            if source.is_file():
+                shutil.copy2(source, target)
+                copied += 1
+            else:
+                log.warning(f"未找到解包存放的文件 {source}")
+
+    entries.sort(key=lambda item: item[0].offset)
+    stop_event = threading.Event()
+
+    def write_bucket(bucket: List[Tuple[AsarEntry, Path]]):
+        # 每个线程使用独立的无缓冲文件句柄与可复用的缓冲区, 相邻文件之间无需 seek
+        buffer = memoryview(bytearray(EXTRACT_BUFFER_SIZE))
+        position = -1
+        with open(asar_path, "rb", buffering=0) as src:
+            for entry, target in bucket:
+                if stop_event.is_set():
+                    return
+                start = index.data_offset + entry.offset
+                if start != position:
+                    src.seek(start)
+                remaining = entry.size
+                with open(target, "wb", buffering=0) as dest:
+                    while remaining:
+                        read = src.readinto(buffer[: min(remaining, len(buffer))])
+                        if not read:
+                            raise AsarFormatError(f"{entry.path} 的数据超出 ASAR 文件末尾")
+                        dest.write(buffer[:read])
+                        remaining -= read
+                position = start + entry.size
+
+    worker_count = max(1, min(max_workers, len(entries)))
+    if worker_count == 1:
+        write_bucket(entries)
+    else:
+        pool = ThreadPoolExecutor(
+            max_workers=worker_count, thread_name_prefix="AuraAsarExtract"
+        )
+        futures = [
+            pool.submit(write_bucket, bucket)
+            for bucket in _split_contiguous(entries, worker_count)
+        ]
+        try:
+            wait(futures, return_when=FIRST_EXCEPTION)
+        finally:
+            stop_event.set()
+            pool.shutdown(wait=True)
+        for future in futures:
+            future.result()
+    return len(entries) + copied
@@ -0,0 +1,187 @@
+"""
+ASAR 文件头索引
+将 ASAR 文件头展开为按列存储的紧凑节点表, 每个节点只占用几个数组元素,
+并通过路径字典在 O(1) 时间内查找节点
+"""
+
+import json
+import struct
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# 节点标志位
+FLAG_DIRECTORY = 1
+FLAG_LINK = 2
+FLAG_UNPACKED = 4
+FLAG_EXECUTABLE = 8
+
+
+class AsarFormatError(Exception):
+    """ASAR 文件头格式异常"""
+
+
+def read_asar_header(asar_path: Path) -> Tuple[Dict, int]:
+    """
+    读取 ASAR 文件头
+
+    ASAR 以两个 Chromium Pickle 开头: 第一个仅包含文件头 Pickle 的长度,
+    第二个包含 JSON 格式的文件头, 文件数据紧随其后
+
+    Args:
+        asar_path: ASAR 文件路径
+
+    Returns:
+        (文件头, 文件数据的起始位置)
+    """
+    with open(asar_path, "rb") as f:
+        size_pickle = f.read(8)
+        if len(size_pickle) != 8:
+            raise AsarFormatError(f"{asar_path} 不是有效的 ASAR 文件")
+        _, header_pickle_size = struct.unpack("<II", size_pickle)
+        header_pickle = f.read(header_pickle_size)
+    if len(header_pickle) != header_pickle_size or header_pickle_size < 8:
+        raise AsarFormatError(f"{asar_path} 的文件头不完整")
+    _, json_size = struct.unpack("<II", header_pickle[:8])
+    try:
+        header = json.loads(header_pickle[8 : 8 + json_size].decode("utf-8"))
+    except ValueError as e:
+        raise AsarFormatError(f"{asar_path} 的文件头无法解析: {e}")
+    return header, 8 + header_pickle_size
+
+
+class AsarEntry(NamedTuple):
+    """节点表中一行的只读视图, 仅在查询时创建"""
+
+    path: str
+    offset: int
+    size: int
+    flags: int
+    link: Optional[str]
+
+    @property
+    def is_dir(self) -> bool:
+        return bool(self.flags & FLAG_DIRECTORY)
+
+    @property
+    def is_link(self) -> bool:
+        return bool(self.flags & FLAG_LINK)
+
+    @property
+    def unpacked(self) -> bool:
+        return bool(self.flags & FLAG_UNPACKED)
+
+    @property
+    def is_file(self) -> bool:
+        return not self.flags & (FLAG_DIRECTORY | FLAG_LINK)
+
+
+class AsarIndex:
+    """
+    ASAR 文件头的紧凑索引
+
+    节点按列存储: 路径列表、数据偏移 (相对于文件数据起始位置, 无数据时为 -1)、
+    文件大小与标志位各占一个数组, 路径字典将路径映射到行号;
+    路径以 "/" 分隔, 不含开头的 "/"
+    """
+
+    __slots__ = (
+        "asar_path",
+        "data_offset",
+        "_paths",
+        "_offsets",
+        "_sizes",
+        "_flags",
+        "_links",
+        "_index",
+    )
+
+    def __init__(self, asar_path: Path, header: Dict, data_offset: int):
+        self.asar_path = Path(asar_path)
+        self.data_offset = data_offset
+        self._paths: List[str] = []
+        self._offsets = array("q")
+        self._sizes = array("q")
+        self._flags = array("B")
+        # 符号链接很少, 单独以行号为键存储目标路径
+        self._links: Dict[int, str] = {}
+        self._index: Dict[str, int] = {}
+
+        stack = [("", header)]
+        while stack:
+            prefix, node = stack.pop()
+            for name, child in node.get("files", {}).items():
+                path = f"{prefix}{name}"
+                row = len(self._paths)
+                flags = FLAG_UNPACKED if child.get("unpacked") else 0
+                offset = -1
+                size = 0
+                if "files" in child:
+                    flags |= FLAG_DIRECTORY
+                    stack.append((f"{path}/", child))
+                elif "link" in child:
+                    flags |= FLAG_LINK
+                    self._links[row] = child["link"]
+                else:
+                    size = int(child.get("size", 0))
+                    if "offset" in child:
+                        offset = int(child["offset"])
+                    if child.get("executable"):
+                        flags |= FLAG_EXECUTABLE
+                self._paths.append(path)
+                self._offsets.append(offset)
+                self._sizes.append(size)
+                self._flags.append(flags)
+                self._index[path] = row
+
+    @classmethod
+    def open(cls, asar_path: Path) -> "AsarIndex":
+        """读取 ASAR 文件头并建立索引"""
+        header, data_offset = read_asar_header(asar_path)
+        return cls(asar_path, header, data_offset)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._index
+
+    def _entry(self, row: int) -> AsarEntry:
+        return AsarEntry(
+            self._paths[row],
+            self._offsets[row],
+            self._sizes[row],
+            self._flags[row],
+            self._links.get(row),
+        )
+
+    def lookup(self, path: str) -> Optional[AsarEntry]:
+        """按路径查找节点, 不存在时返回 None"""
+        row = self._index.get(path.strip("/"))
+        return None if row is None else self._entry(row)
+
+    def __iter__(self) -> Iterator[AsarEntry]:
+        return (self._entry(row) for row in range(len(self._paths)))
+
+    def packed_files(self) -> List[AsarEntry]:
+        """返回数据存储在 ASAR 内的文件, 按数据偏移排序, 便于顺序读取"""
+        rows = [row for row in range(len(self._paths)) if self._offsets[row] >= 0]
+        rows.sort(key=self._offsets.__getitem__)
+        return [self._entry(row) for row in rows]
+
+    def read(self, path: str) -> bytes:
+        """
+        读取 ASAR 中单个文件的内容
+
+        Args:
+            path: 文件在 ASAR 中的路径, 以 "/" 分隔
+
+        Returns:
+            文件内容
+        """
+        entry = self.lookup(path)
+        if entry is None or entry.offset < 0:
+            raise FileNotFoundError(f"{self.asar_path} 中不存在 {path}")
+        with open(self.asar_path, "rb") as f:
+            f.seek(self.data_offset + entry.offset)
+            return f.read(entry.size)
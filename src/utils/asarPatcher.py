@@ -1,99 +1,60 @@
 import os
-import shutil
-from asar import extract_archive, create_archive, AsarArchive
 from pathlib import Path
 from loguru import logger as log
-
-"""
-这些全是笨蛋希沃和笨蛋asar库的造的孽
-也不知道这段代码咋样反正它就是跑起来了就这样吧
-"""
-def _new_parse_metadata(self, info, path_in):
-    for name, child in info["files"].items():
-        cur_path = path_in / name
-        node = self._search_node_from_path(cur_path, create=True)
-
-        if "files" in child:
-            node.unpacked = child.get("unpacked", False)
-            setattr(node, 'type', 'DIRECTORY')
-            node.files = {}
-            _new_parse_metadata(self, child, cur_path)
-        elif "link" in child:
-            setattr(node, 'type', 'LINK')
-            node.link = Path(child["link"])
-        else:
-            node.unpacked = child.get("unpacked", False)
-            setattr(node, 'type', 'FILE')
-            node.size = child["size"]
-            node.integrity = child.get("integrity", {})
-
-            if node.unpacked:
-                node.file_path = self.asar_unpacked / node.path
-            else:
-                node.offset = int(child["offset"])
-                if hasattr(self, '_asar_io') and self._asar_io is not None:
-                    from asar.limited_reader import LimitedReader
-                    node.file_reader = LimitedReader(self._asar_io, self._offset + node.offset, node.size)
-                else:
-                    node.file_reader = None
-                    log.debug(f"文件 {cur_path} 的 _asar_io 无效，跳过 LimitedReader 创建")
-
-def _new_extract(self, dst: Path = None):
-    dst = dst if dst else Path.cwd()
-    dst.mkdir(parents=True, exist_ok=True)
-
-    for meta in self.metas:
-        cur_dst = dst / meta.path
-
-        try:
-            if getattr(meta, 'type', None) == 'DIRECTORY' or (hasattr(meta, 'files') and meta.files):
-                cur_dst.mkdir(parents=True, exist_ok=True)
-            elif getattr(meta, 'type', None) == 'LINK':
-                src_link = dst / meta.link
-                try:
-                    cur_dst.symlink_to(src_link)
-                except (FileExistsError, OSError):
-                    if cur_dst.exists():
-                        cur_dst.unlink()
-                    cur_dst.symlink_to(src_link)
-            elif getattr(meta, 'unpacked', False):
-                if hasattr(meta, 'file_path') and meta.file_path and meta.file_path.exists():
-                    shutil.copy2(meta.file_path, cur_dst)
-            else:
-                if hasattr(meta, 'file_reader') and meta.file_reader is not None:
-                    try:
-                        with cur_dst.open("wb") as writer:
-                            meta.file_reader.seek(0)
-                            shutil.copyfileobj(meta.file_reader, writer)
-                    except AttributeError as e:
-                        if "'NoneType' object has no attribute 'seek'" in str(e):
-                            log.warning(f"文件 {meta.path} 的 file_reader 无效，跳过")
-                        else:
-                            raise
-                else:
-                    log.warning(f"文件 {meta.path} 没有有效的 file_reader，无法提取")
-
-        except Exception as e:
-            log.error(f"提取文件 {meta.path} 时出错: {e}")
-
-_original_parse_metadata = AsarArchive._parse_metadata
-_original_extract = AsarArchive.extract
-AsarArchive._parse_metadata = _new_parse_metadata
-AsarArchive.extract = _new_extract
-
-"""
-下面才是真正的修改ASAR文件的代码
-上面的啥也不是（雾
-"""
-def patch_asar_file(input_asar_path, temp_extract_dir, output_asar_path, core_dir):
+from config.config import PATCHED_ASAR_CACHE_MAX_BYTES
+from utils.artifactCache import ArtifactCache, sha256_of_file
+from utils.asarIndex import AsarIndex
+from utils.asarRepacker import repack_asar
+from utils.patchEngine import PatchEngine, PatchRule, patch_with_verdict
+from utils.tracer import tracer, traced
+
+# main.js 补丁规则
+MAINJS_PATCH_PREFIX = 'const hook = require("./hook.js");\n'
+MAINJS_PATCH_RULES = [
+    PatchRule(
+        "zeron",
+        "n.m=e",
+        before=';const zeron = require("./zeron.js");n = zeron(n);',
+    ),
+    PatchRule(
+        "hook",
+        "let f=new s(Object.assign({},{transparent:!0,",
+        before=";hook({ central: n, windowName: this.wname, config: c });",
+    ),
+    # 出现次数随希沃管家版本变化, 不限制命中次数
+    PatchRule(
+        "preload",
+        "c.canOpenDevTool",
+        after=',preload: __dirname + "\\\\preload.js"',
+        expected_hits=None,
+    ),
+]
+mainjs_patch_engine = PatchEngine(MAINJS_PATCH_RULES, MAINJS_PATCH_PREFIX)
+
+@traced("patch_asar")
+def patch_asar_file(
+    input_asar_path,
+    output_asar_path,
+    core_dir,
+    core_sha256=None,
+    source_sha256=None,
+    cache_dir=None,
+):
     """
-    解包、修改并重新打包 ASAR 文件
+    修改并重新打包 ASAR 文件, 不解包到临时目录
+
+    修改后的 main.js 与 core 目录中的文件写入新的 ASAR, 其余文件的数据直接从原 ASAR 复制;
+    提供 core_sha256 与 cache_dir 时, 以 (原始 ASAR 的 SHA-256, core_sha256, 补丁规则的 fingerprint)
+    为键缓存输出, 命中时直接从缓存复制输出文件; 输出文件会被安装到希沃管家目录,
+    因此 cache_dir 应位于仅管理员可写的位置
 
     Args:
         input_asar_path (str): 输入的 ASAR 文件完整路径
-        temp_extract_dir (str): 解包临时目录位置
         output_asar_path (str): 修改后打包的 ASAR 文件完整路径
         core_dir (str): HugoAura 本体的 core 目录位置
+        core_sha256 (str): core.zip 的 SHA-256
+        source_sha256 (str): 原始 ASAR 的 SHA-256, 未提供时在此计算
+        cache_dir (str): Patch 后的 ASAR 缓存目录, 未提供时不使用缓存
 
     Returns:
         str: 修改后的 ASAR 文件输出路径
@@ -102,46 +63,44 @@ def patch_asar_file(input_asar_path, temp_extract_dir, output_asar_path, core_di
         # 目录检查准备
         if not os.path.exists(core_dir):
             raise FileNotFoundError(f"Core 未找到: {core_dir}")
-        if os.path.exists(temp_extract_dir):
-            shutil.rmtree(temp_extract_dir)
-        os.makedirs(temp_extract_dir)
-        os.makedirs(os.path.dirname(output_asar_path), exist_ok=True)
 
-        # 解包 ASAR 文件
-        extract_archive(Path(input_asar_path), Path(temp_extract_dir))
-
-        # 修改 ASRR 文件
-        mainjs_patch(temp_extract_dir)
-        for item in os.listdir(core_dir):
-            src = os.path.join(core_dir, item)
-            dst = os.path.join(temp_extract_dir, item)
-            if os.path.isdir(src):
-                shutil.copytree(src, dst, dirs_exist_ok=True)
-            else:
-                shutil.copy2(src, dst)
+        cache = cache_key = None
+        if core_sha256 and cache_dir:
+            cache = ArtifactCache(Path(cache_dir), PATCHED_ASAR_CACHE_MAX_BYTES)
+            source_sha256 = source_sha256 or sha256_of_file(Path(input_asar_path))
+            cache_key = f"{source_sha256}/{core_sha256}/{mainjs_patch_engine.fingerprint}"
+            # 复制并校验副本, 不与缓存文件共享数据
+            if cache.materialize(cache_key, Path(output_asar_path), link=False):
+                log.success("已从本地缓存获取 Patch 后的 ASAR, 跳过 Patch")
+                tracer.annotate(cache_hit=True)
+                return (True, output_asar_path)
+
+        # 修改 ASAR 文件
+        with tracer.span("patch_main_js"):
+            main_js = AsarIndex.open(Path(input_asar_path)).read("main.js")
+            files = {"main.js": mainjs_patch(main_js.decode("utf-8")).encode("utf-8")}
+        core_path = Path(core_dir)
+        for src in core_path.rglob("*"):
+            if src.is_file():
+                files[src.relative_to(core_path).as_posix()] = src
 
         # 打包 ASAR 文件
-        create_archive(Path(temp_extract_dir), Path(output_asar_path))
+        with tracer.span("repack_asar", files=len(files)):
+            repack_asar(Path(input_asar_path), Path(output_asar_path), files)
+            tracer.annotate(bytes=os.path.getsize(output_asar_path))
+        tracer.annotate(cache_hit=False)
+        if cache and cache.put(cache_key, Path(output_asar_path)):
+            log.info("Patch 后的 ASAR 已存入本地缓存")
         return (True, output_asar_path)
 
     except Exception as e:
         return (False, e)
 
-def mainjs_patch(extracted_dir):
-    main_js_path = os.path.join(extracted_dir, "main.js")
-
-    if not os.path.exists(main_js_path):
-        raise FileNotFoundError(f"{main_js_path} not found.")
-
-    with open(main_js_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    content = 'const hook = require("./hook.js");\n' + content
-    content = content.replace('n.m=e', ';const zeron = require("./zeron.js");n = zeron(n);n.m=e')
-    content = content.replace('let f=new s(Object.assign({},{transparent:!0,',
-                             ';hook({ central: n, windowName: this.wname, config: c });let f=new s(Object.assign({},{transparent:!0,')
-    content = content.replace('c.canOpenDevTool',
-                             'c.canOpenDevTool,preload: __dirname + "\\\\preload.js"')
+def mainjs_patch(content):
+    """
+    按 MAINJS_PATCH_RULES 修改 main.js
 
-    with open(main_js_path, 'w', encoding='utf-8') as f:
-        f.write(content)
\ No newline at end of file
+    Raises:
+        PatchRuleError: 锚点的命中次数与预期不符 (希沃管家版本不受支持)
+    """
+    return patch_with_verdict(mainjs_patch_engine, content, "main.js")
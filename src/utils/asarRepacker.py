@@ -0,0 +1,200 @@
+"""
+ASAR 流式重打包
+直接读取原 ASAR 的文件头, 生成包含新增与替换文件的新文件头,
+未修改文件的数据从原 ASAR 中按区间复制到输出文件, 无需解包到临时目录
+"""
+
+import hashlib
+import json
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Tuple, Union
+from utils.asarIndex import AsarFormatError, read_asar_header
+
+# Electron 计算文件完整性时使用的分块大小
+INTEGRITY_BLOCK_SIZE = 4 * 1024 * 1024
+_COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def encode_asar_header(header: Dict) -> bytes:
+    """将文件头编码为 ASAR 开头的两个 Pickle, 返回值长度即为文件数据的起始位置"""
+    data = json.dumps(header, separators=(",", ":"), ensure_ascii=False).encode(
+        "utf-8"
+    )
+    header_payload = struct.pack("<I", len(data)) + data + b"\0" * (-len(data) % 4)
+    header_pickle = struct.pack("<I", len(header_payload)) + header_payload
+    return struct.pack("<II", 4, len(header_pickle)) + header_pickle
+
+
+def _walk_packed_files(node: Dict, prefix: str = ""):
+    for name, child in node.get("files", {}).items():
+        path = f"{prefix}{name}"
+        if "files" in child:
+            yield from _walk_packed_files(child, f"{path}/")
+        elif "offset" in child and not child.get("unpacked"):
+            yield path, child
+
+
+def _find_node(header: Dict, path: str, create: bool = False) -> Dict | None:
+    node = header
+    parts = path.split("/")
+    for part in parts[:-1]:
+        files = node.setdefault("files", {}) if create else node.get("files", {})
+        if part not in files:
+            if not create:
+                return None
+            files[part] = {"files": {}}
+        node = files[part]
+        if "files" not in node:
+            raise AsarFormatError(f"{path} 的上级路径 {part} 不是目录")
+    files = node.setdefault("files", {}) if create else node.get("files", {})
+    if parts[-1] not in files and create:
+        files[parts[-1]] = {}
+    return files.get(parts[-1])
+
+
+def _integrity(chunks) -> Dict:
+    file_hash = hashlib.sha256()
+    blocks = []
+    block_hash = hashlib.sha256()
+    block_fill = 0
+    for chunk in chunks:
+        file_hash.update(chunk)
+        view = memoryview(chunk)
+        while view:
+            take = view[: INTEGRITY_BLOCK_SIZE - block_fill]
+            block_hash.update(take)
+            block_fill += len(take)
+            view = view[len(take) :]
+            if block_fill == INTEGRITY_BLOCK_SIZE:
+                blocks.append(block_hash.hexdigest())
+                block_hash = hashlib.sha256()
+                block_fill = 0
+    if block_fill or not blocks:
+        blocks.append(block_hash.hexdigest())
+    return {
+        "algorithm": "SHA256",
+        "hash": file_hash.hexdigest(),
+        "blockSize": INTEGRITY_BLOCK_SIZE,
+        "blocks": blocks,
+    }
+
+
+def _iter_source(source: Union[bytes, Path]):
+    if isinstance(source, bytes):
+        yield source
+        return
+    with open(source, "rb") as f:
+        yield from iter(lambda: f.read(_COPY_BUFFER_SIZE), b"")
+
+
+def _write_all(dst: BinaryIO, data: bytes):
+    # 无缓冲的文件对象可能只写入部分数据
+    view = memoryview(data)
+    while view:
+        view = view[dst.write(view) :]
+
+
+def _copy_range(src: BinaryIO, dst: BinaryIO, offset: int, length: int):
+    """
+    将 src 中 [offset, offset + length) 的数据写入 dst 的当前位置
+
+    优先使用 copy_file_range / sendfile 在内核中复制, 不支持时回退为分块读写;
+    两个文件对象均须以无缓冲模式打开, 以便与底层文件描述符共享读写位置
+    """
+    src_fd, dst_fd = src.fileno(), dst.fileno()
+    if hasattr(os, "copy_file_range"):
+        try:
+            while length:
+                copied = os.copy_file_range(src_fd, dst_fd, length, offset)
+                if not copied:
+                    break
+                offset += copied
+                length -= copied
+        except OSError:
+            pass
+    if length and hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        try:
+            while length:
+                copied = os.sendfile(dst_fd, src_fd, offset, length)
+                if not copied:
+                    break
+                offset += copied
+                length -= copied
+        except OSError:
+            pass
+    if length:
+        src.seek(offset)
+        while length:
+            chunk = src.read(min(length, _COPY_BUFFER_SIZE))
+            if not chunk:
+                raise AsarFormatError("ASAR 文件数据不完整")
+            _write_all(dst, chunk)
+            length -= len(chunk)
+
+
+def repack_asar(
+    input_path: Path, output_path: Path, files: Dict[str, Union[bytes, Path]]
+) -> Path:
+    """
+    以原 ASAR 为基础生成新的 ASAR, 新增或替换 files 中的文件
+
+    未修改文件的数据按原顺序紧凑排列, 源文件中相邻的数据合并为一次复制;
+    新增与替换的文件追加在末尾, 并重新计算其完整性信息
+
+    Args:
+        input_path: 原 ASAR 文件路径
+        output_path: 输出 ASAR 文件路径
+        files: ASAR 内路径 (以 "/" 分隔) 到新内容的映射, 内容为字节或本地文件路径
+
+    Returns:
+        输出文件路径
+    """
+    header, data_offset = read_asar_header(input_path)
+
+    new_nodes: List[Tuple[Dict, Union[bytes, Path]]] = []
+    for path, source in files.items():
+        node = _find_node(header, path, create=True)
+        if "files" in node:
+            raise AsarFormatError(f"{path} 在 ASAR 中是目录, 无法替换为文件")
+        # 清空后不再带有 offset, 不会被当作未修改的文件复制
+        node.clear()
+        new_nodes.append((node, source))
+
+    kept = sorted(
+        (node for _, node in _walk_packed_files(header)),
+        key=lambda node: int(node["offset"]),
+    )
+    copy_runs: List[List[int]] = []
+    position = 0
+    for node in kept:
+        source_offset = int(node["offset"])
+        if copy_runs and copy_runs[-1][0] + copy_runs[-1][1] == source_offset:
+            copy_runs[-1][1] += node["size"]
+        else:
+            copy_runs.append([source_offset, node["size"]])
+        node["offset"] = str(position)
+        position += node["size"]
+
+    for node, source in new_nodes:
+        integrity = _integrity(_iter_source(source))
+        node["size"] = (
+            len(source) if isinstance(source, bytes) else source.stat().st_size
+        )
+        node["offset"] = str(position)
+        node["integrity"] = integrity
+        position += node["size"]
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(input_path, "rb", buffering=0) as src, open(
+        output_path, "wb", buffering=0
+    ) as dst:
+        _write_all(dst, encode_asar_header(header))
+        for source_offset, length in copy_runs:
+            _copy_range(src, dst, data_offset + source_offset, length)
+        for _, source in new_nodes:
+            for chunk in _iter_source(source):
+                _write_all(dst, chunk)
+    return output_path
@@ -1,8 +1,15 @@
 import requests
+import hashlib
 import time
 import zipfile
 import shutil
 import os
+import json
+import itertools
+import collections
+import threading
+import socket
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
 from pathlib import Path
 from loguru import logger as log
 from config.config import (
@@ -10,182 +17,1791 @@ from config.config import (
     AURA_FILENAME,
     CORE_FILENAME,
     TEMP_INSTALL_DIR,
+    DOWNLOAD_CHUNK_SIZE,
+    DOWNLOAD_SEGMENT_COUNT,
+    DOWNLOAD_SEGMENT_MIN_SIZE,
+    DOWNLOAD_TIMEOUT_SECONDS,
+    DOWNLOAD_PART_SUFFIX,
+    MIRROR_RANKING_MODE,
+    MIRROR_PROBE_BYTES,
+    MIRROR_PROBE_TIMEOUT_SECONDS,
+    DOWNLOAD_RACE_MIRRORS,
+    DOWNLOAD_RACE_BYTES,
+    DOWNLOAD_RACE_TIMEOUT_SECONDS,
+    DOWNLOAD_STALL_MIN_RATE,
+    DOWNLOAD_STALL_WINDOW_SECONDS,
+    DOWNLOAD_AGGREGATE_MIRRORS,
+    DOWNLOAD_AGGREGATE_CONNECTIONS_PER_MIRROR,
+    DOWNLOAD_AGGREGATE_MIN_STEAL_SIZE,
+    MUTABLE_RELEASE_TAGS,
+    UNZIP_MAX_WORKERS,
+    DELTA_DOWNLOAD_MERGE_GAP,
+    DELTA_DOWNLOAD_MAX_RATIO,
 )
+from utils.artifactCache import release_cache
+from utils.mirrorStats import mirror_stats, mirror_score
+from utils.remoteZip import RemoteZip, RemoteZipError, coalesce_ranges
+from utils.upgradePlanner import plan_upgrade
+from utils.httpClient import http_session, release
+from utils.tracer import tracer, traced
+from utils.version_manager import version_manager, AssetDigest
+from utils.zipExtractor import PipelinedExtractor, extract_parallel
 import typeDefs.lifecycle
 import lifecycle as lifecycleMgr
-import asyncio
-import aiohttp
-import time
-from typing import List, Tuple
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
 
 desiredTag = None
+# 当前版本各资源文件的预期大小与 SHA-256, 由 download_release_files 设置
+expectedDigests: dict[str, AssetDigest] = {}
+# 已在下载过程中解压完成的 ZIP 文件: 文件路径 -> 解压目录
+_pipelined_extractions: dict[Path, Path] = {}
+# 仅下载了有变化条目的 ZIP 文件, 只能按升级计划解压
+_delta_downloads: set[Path] = set()
+# download_release_files 测速排序后的下载源, 重新下载同一版本的文件时复用, 无需再次测速
+rankedDownloadUrls: List[str] | None = None
 
+DOWNLOAD_HEADERS = {
+    "Accept-Encoding": "",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36",
+}
 
-def download_file(url: str, dest_folder: str, filename: str) -> Path | str | None:
-    dest_path = Path(dest_folder) / filename
-    log.info(f"正在从 {url} 下载 {filename}, 目标目录: {dest_path}")
 
-    try:
-        dest_path.parent.mkdir(parents=True, exist_ok=True)
+class RemoteFileInfo(NamedTuple):
+    total_size: int
+    range_supported: bool
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+class ResumeRejectedError(requests.exceptions.RequestException):
+    """下载源拒绝续传 (文件已变化或不再支持 Range)"""
+
+
+class DownloadStalledError(requests.exceptions.RequestException):
+    """下载速率持续低于下限, 判定下载源已停滞"""
+
+
+class AssetIntegrityError(Exception):
+    """下载结果的大小或 SHA-256 与预期不符"""
+
+
+class _ThroughputWatchdog:
+    """吞吐量看门狗: 最近 window 秒内的平均速率低于 min_rate 时判定为停滞"""
+
+    def __init__(self, min_rate: float, window: float):
+        self.min_rate = min_rate
+        self.window = window
+        self._samples: collections.deque[Tuple[float, int]] = collections.deque()
+
+    def check(self, downloaded_size: int):
+        now = time.monotonic()
+        self._samples.append((now, downloaded_size))
+        # 保留最近一个距今不少于 window 秒的采样点作为基准
+        while len(self._samples) > 1 and now - self._samples[1][0] >= self.window:
+            self._samples.popleft()
+
+        base_time, base_size = self._samples[0]
+        elapsed = now - base_time
+        if elapsed >= self.window:
+            rate = (downloaded_size - base_size) / elapsed
+            if rate < self.min_rate:
+                raise DownloadStalledError(
+                    f"最近 {elapsed:.0f} 秒平均速率 {rate / 1024:.1f} KB/s, 低于下限 {self.min_rate / 1024:.0f} KB/s"
+                )
+
+
+class _RaceWinner(NamedTuple):
+    """竞速胜出的下载源, 其连接与已收到的数据会被后续下载直接复用"""
+
+    base_url: str
+    url: str
+    response: requests.Response
+    chunks: Iterator[bytes]
+    buffered: bytes
+    start: int
+    info: RemoteFileInfo
+
+
+class _Segment:
+    """下载分段, end 为闭区间, done 为该分段已写入的字节数"""
+
+    __slots__ = ("start", "end", "done")
+
+    def __init__(self, start: int, end: int, done: int = 0):
+        self.start = start
+        self.end = end
+        self.done = done
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start + 1
 
-        downloadHeaders = {
-            "Accept-Encoding": "",
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36",
+    @property
+    def remaining(self) -> int:
+        return self.size - self.done
+
+
+class _PartState:
+    """
+    .part 文件的续传状态, 持久化于同名 .json 旁路文件
+
+    asset 为 "<tag>/<文件名>", 各镜像源提供的同一资源文件字节一致,
+    因此可在不同镜像源之间续传同一个 .part 文件
+    """
+
+    def __init__(
+        self,
+        asset: str,
+        url: str,
+        total_size: int,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        segments: List[_Segment],
+    ):
+        self.asset = asset
+        self.url = url
+        self.total_size = total_size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.segments = segments
+
+    @property
+    def downloaded(self) -> int:
+        return sum(seg.done for seg in self.segments)
+
+    @classmethod
+    def load(cls, sidecar_path: Path) -> Optional["_PartState"]:
+        try:
+            with open(sidecar_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(
+                data["asset"],
+                data["url"],
+                int(data["total_size"]),
+                data.get("etag"),
+                data.get("last_modified"),
+                [_Segment(*seg) for seg in data["segments"]],
+            )
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            log.warning(f"续传记录 {sidecar_path.name} 已损坏, 将重新下载: {e}")
+            return None
+
+    def save(self, sidecar_path: Path):
+        data = {
+            "asset": self.asset,
+            "url": self.url,
+            "total_size": self.total_size,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "segments": [[seg.start, seg.end, seg.done] for seg in self.segments],
         }
-        with requests.get(url, stream=True, timeout=60, headers=downloadHeaders) as r:
-            r.raise_for_status()
-            total_size = int(r.headers.get("content-length", 0))
-            log.info(
-                f"文件大小: {total_size / 1024 / 1024:.2f} MB"
-                if total_size
-                else "文件大小: 未知"
+        tmp_path = sidecar_path.with_name(sidecar_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, sidecar_path)
+
+
+class _StreamingVerifier:
+    """
+    边下载边计算 SHA-256
+
+    按顺序写入的数据在写入时直接计入摘要; 乱序写入的分段数据在其之前的字节全部落盘后,
+    由 catch_up 从 .part 文件中补读, 下载结束时无需再完整读取一遍文件
+    """
+
+    def __init__(self, expected: AssetDigest, part_path: Path):
+        self.expected = expected
+        self.part_path = part_path
+        self.offset = 0
+        self._sha256 = hashlib.sha256()
+        self._lock = threading.Lock()
+
+    def feed(self, offset: int, data: bytes):
+        # 正在补读时不等待, 这部分数据会在之后的 catch_up 中从文件读取
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if offset == self.offset:
+                self._sha256.update(data)
+                self.offset += len(data)
+        finally:
+            self._lock.release()
+
+    def catch_up(self, contiguous_end: int):
+        """将 .part 文件中 [offset, contiguous_end) 范围内已落盘的数据计入摘要"""
+        with self._lock:
+            if self.offset >= contiguous_end:
+                return
+            with open(self.part_path, "rb") as f:
+                f.seek(self.offset)
+                while self.offset < contiguous_end:
+                    chunk = f.read(min(DOWNLOAD_CHUNK_SIZE, contiguous_end - self.offset))
+                    if not chunk:
+                        break
+                    self._sha256.update(chunk)
+                    self.offset += len(chunk)
+
+    def verify(self, total_size: int):
+        self.catch_up(total_size)
+        if self.offset != self.expected.size:
+            raise AssetIntegrityError(
+                f"文件大小不符: 预期 {self.expected.size} 字节, 实际 {self.offset} 字节"
             )
+        sha256 = self._sha256.hexdigest()
+        if sha256 != self.expected.sha256:
+            raise AssetIntegrityError(
+                f"SHA-256 不符: 预期 {self.expected.sha256}, 实际 {sha256}"
+            )
+
+
+def _contiguous_prefix(segments: List[_Segment]) -> int:
+    """返回从文件开头起连续已写入的字节数"""
+    end = 0
+    for seg in sorted(segments, key=lambda seg: seg.start):
+        if seg.start != end:
+            break
+        end += seg.done
+        if seg.remaining:
+            break
+    return end
+
+
+class _CombinedProgress:
+    """将多个并行下载的进度合并为一个字节计数后上报"""
+
+    def __init__(self, label: str):
+        self.label = label
+        self._lock = threading.Lock()
+        self._files: dict[str, Tuple[int, int]] = {}
+
+    def update(self, downloaded_size: int, total_size: int, filename: str):
+        with self._lock:
+            self._files[filename] = (downloaded_size, total_size)
+            combined_total = sum(total for _, total in self._files.values())
+            if combined_total:
+                _invoke_progress_callback(
+                    sum(done for done, _ in self._files.values()),
+                    combined_total,
+                    self.label,
+                )
+
+
+_combined_progress: Optional[_CombinedProgress] = None
+
+
+def _invoke_progress_callback(downloaded_size: int, total_size: int, filename: str):
+    callbackFuncName = typeDefs.lifecycle.GLOBAL_CALLBACKS.REPORT_DOWNLOAD_PROGRESS.value
+    if lifecycleMgr.callbacks.get(callbackFuncName):
+        lifecycleMgr.callbacks[callbackFuncName](
+            downloaded_size, total_size, filename
+        )  # type: ignore
+
+
+def _report_extract_progress(extracted_count: int, total_count: int, name: str):
+    callbackFuncName = typeDefs.lifecycle.GLOBAL_CALLBACKS.REPORT_EXTRACT_PROGRESS.value
+    if lifecycleMgr.callbacks.get(callbackFuncName):
+        lifecycleMgr.callbacks[callbackFuncName](
+            extracted_count, total_count, name
+        )  # type: ignore
+
+
+def _report_download_progress(downloaded_size: int, total_size: int, filename: str):
+    if _combined_progress:
+        _combined_progress.update(downloaded_size, total_size, filename)
+    else:
+        _invoke_progress_callback(downloaded_size, total_size, filename)
+
+
+def _part_paths(dest_path: Path) -> Tuple[Path, Path]:
+    part_path = dest_path.with_name(dest_path.name + DOWNLOAD_PART_SUFFIX)
+    return part_path, part_path.with_name(part_path.name + ".json")
+
+
+def _asset_id(url: str) -> str:
+    # 所有下载源均以 /<tag>/<文件名> 结尾
+    return "/".join(url.rstrip("/").split("/")[-2:])
+
+
+def _discard_partial(dest_path: Path):
+    for path in _part_paths(dest_path):
+        if path.exists():
+            os.remove(path)
+
+
+def _remote_file_info(r: requests.Response) -> RemoteFileInfo:
+    etag = r.headers.get("ETag")
+    last_modified = r.headers.get("Last-Modified")
+    if r.status_code == 206:
+        # Content-Range: bytes 0-0/12345
+        content_range = r.headers.get("Content-Range", "")
+        total_size = content_range.rsplit("/", 1)[-1]
+        if total_size.isdigit():
+            return RemoteFileInfo(int(total_size), True, etag, last_modified)
+        return RemoteFileInfo(0, False, etag, last_modified)
+
+    accept_ranges = r.headers.get("Accept-Ranges", "").lower() == "bytes"
+    if accept_ranges:
+        log.debug(f"下载源声明了 Accept-Ranges, 但未按 Range 返回分段数据: {r.url}")
+    return RemoteFileInfo(
+        int(r.headers.get("content-length", 0)), False, etag, last_modified
+    )
+
+
+def probe_range_support(url: str) -> RemoteFileInfo:
+    """
+    探测下载源是否支持 Range 分段请求
+
+    Args:
+        url: 文件下载地址
+
+    Returns:
+        RemoteFileInfo, 文件大小未知时 total_size 为 0
+    """
+    headers = {**DOWNLOAD_HEADERS, "Range": "bytes=0-0"}
+    r = http_session.get(
+        url, stream=True, timeout=DOWNLOAD_TIMEOUT_SECONDS, headers=headers
+    )
+    try:
+        r.raise_for_status()
+        info = _remote_file_info(r)
+    except BaseException:
+        r.close()
+        raise
+    if info.range_supported:
+        # 仅 1 字节的响应体, 读完后连接可留给随后的分段下载复用
+        release(r)
+    else:
+        r.close()
+    return info
+
+
+def _split_ranges(total_size: int, segment_count: int) -> List[_Segment]:
+    segment_size = -(-total_size // segment_count)
+    return [
+        _Segment(start, min(start + segment_size, total_size) - 1)
+        for start in range(0, total_size, segment_size)
+    ]
+
+
+def _if_range_validator(info: RemoteFileInfo) -> Optional[str]:
+    # If-Range 只接受强 ETag, 弱 ETag 时退回 Last-Modified
+    if info.etag and not info.etag.startswith("W/"):
+        return info.etag
+    return info.last_modified
+
+
+def _load_resume_state(
+    dest_path: Path, url: str, info: RemoteFileInfo
+) -> Optional[_PartState]:
+    part_path, sidecar_path = _part_paths(dest_path)
+    state = _PartState.load(sidecar_path)
+    if state is None or not part_path.exists():
+        return None
+
+    if state.asset != _asset_id(url) or state.total_size != info.total_size:
+        log.info(f"续传记录与当前资源不一致, 将重新下载 {dest_path.name}")
+        return None
+    if part_path.stat().st_size != state.total_size:
+        log.info(f"{part_path.name} 大小异常, 将重新下载")
+        return None
+
+    if state.url == url:
+        if (state.etag and info.etag and state.etag != info.etag) or (
+            state.last_modified
+            and info.last_modified
+            and state.last_modified != info.last_modified
+        ):
+            log.info(f"下载源上的 {dest_path.name} 已变化, 将重新下载")
+            return None
+    else:
+        log.info(f"在新的下载源上继续续传 {dest_path.name}")
+        state.url = url
+        state.etag = info.etag
+        state.last_modified = info.last_modified
+
+    return state
+
+
+def _resume_offset(dest_path: Path, asset: str) -> int:
+    """返回续传记录中第一个未完成分段的当前位置, 无可用记录时返回 0"""
+    part_path, sidecar_path = _part_paths(dest_path)
+    state = _PartState.load(sidecar_path)
+    if state is None or state.asset != asset or not part_path.exists():
+        return 0
+    for seg in state.segments:
+        if seg.remaining > 0:
+            return seg.start + seg.done
+    return 0
+
 
-            with open(dest_path, "wb") as f:
-                downloaded_size = 0
-                chunk_size = 8192
-                for chunk in r.iter_content(chunk_size=chunk_size):
-                    if chunk:
+def _open_segment_stream(
+    url: str, start: int, end: int, if_range: Optional[str]
+) -> requests.Response:
+    headers = {**DOWNLOAD_HEADERS, "Range": f"bytes={start}-{end}"}
+    if if_range:
+        headers["If-Range"] = if_range
+    r = http_session.get(
+        url,
+        stream=True,
+        timeout=(DOWNLOAD_TIMEOUT_SECONDS, DOWNLOAD_STALL_WINDOW_SECONDS),
+        headers=headers,
+    )
+    try:
+        r.raise_for_status()
+        if r.status_code != 206:
+            raise ResumeRejectedError(
+                f"下载源未按 Range 返回分段数据 (HTTP {r.status_code})"
+            )
+    except BaseException:
+        r.close()
+        raise
+    return r
+
+
+def _prepare_part_state(
+    dest_path: Path, url: str, info: RemoteFileInfo, segment_count: int
+) -> _PartState:
+    """加载可用的续传记录, 不存在时预分配 .part 文件并按 segment_count 切分"""
+    part_path, sidecar_path = _part_paths(dest_path)
+    state = _load_resume_state(dest_path, url, info)
+    if state:
+        log.info(
+            f"从 {state.downloaded / 1024 / 1024:.2f} MB 处继续下载 {dest_path.name}"
+        )
+        return state
+
+    _discard_partial(dest_path)
+    if info.total_size < DOWNLOAD_SEGMENT_MIN_SIZE:
+        segment_count = 1
+    state = _PartState(
+        _asset_id(url),
+        url,
+        info.total_size,
+        info.etag,
+        info.last_modified,
+        _split_ranges(info.total_size, segment_count),
+    )
+    with open(part_path, "wb") as f:
+        f.truncate(info.total_size)
+    state.save(sidecar_path)
+    return state
+
+
+def _complete_partial(dest_path: Path):
+    part_path, sidecar_path = _part_paths(dest_path)
+    os.replace(part_path, dest_path)
+    if sidecar_path.exists():
+        os.remove(sidecar_path)
+
+
+def _download_segment(
+    url: str,
+    part_path: Path,
+    segment: _Segment,
+    if_range: Optional[str],
+    stop_event: threading.Event,
+    write_lock: threading.Lock,
+    primed: Optional[_RaceWinner] = None,
+    verifier: Optional[_StreamingVerifier] = None,
+    in_flight: Optional[set] = None,
+):
+    """
+    下载一个分段并写入 .part 文件
+
+    .part 文件仅在写入每个数据块时打开, 阻塞在网络读取中的线程不持有文件句柄;
+    stop_event 在 write_lock 内设置, 因此设置后不会再有线程打开 .part 文件,
+    下一个下载源可以立即接手, 完成后也可以立即重命名 (Windows 上打开的文件无法重命名)。
+    提供 in_flight 时, 进行中的响应会登记在其中, 以便中止传输时由调用方关闭
+    """
+    start = segment.start + segment.done
+    requested_end = None
+    if primed:
+        r = primed.response
+        chunks = itertools.chain([primed.buffered], primed.chunks)
+    else:
+        requested_end = segment.end
+        r = _open_segment_stream(url, start, segment.end, if_range)
+        chunks = r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)
+
+    if in_flight is not None:
+        with write_lock:
+            if stop_event.is_set():
+                r.close()
+                return
+            in_flight.add(r)
+
+    try:
+        with r:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                # 传输被中止后 (例如切换下载源), 不再写入数据或修改分段进度
+                with write_lock:
+                    if stop_event.is_set():
+                        return
+                    chunk = chunk[: segment.remaining]
+                    # 不使用缓冲, 保证续传记录中的 done 不超过实际落盘的字节数
+                    with open(part_path, "r+b", buffering=0) as f:
+                        f.seek(segment.start + segment.done)
                         f.write(chunk)
-                        downloaded_size += len(chunk)
+                    if verifier:
+                        verifier.feed(segment.start + segment.done, chunk)
+                    segment.done += len(chunk)
+                if segment.remaining <= 0:
+                    break
+
+            # 分段未被拆分时响应体已全部读完, 结束迭代后连接可回到连接池复用
+            if not segment.remaining and segment.end == requested_end:
+                for _ in chunks:
+                    pass
+    finally:
+        if in_flight is not None:
+            with write_lock:
+                in_flight.discard(r)
+
+    if segment.remaining:
+        raise requests.exceptions.ChunkedEncodingError(
+            f"分段 {segment.start}-{segment.end} 数据不完整: {segment.done} / {segment.size} 字节"
+        )
+
+
+def _stop_segments(
+    stop_event: threading.Event, write_lock: threading.Lock, in_flight: set
+):
+    """
+    中止全部分段: 设置 stop_event 后中断进行中的响应, 不等待分段线程退出
+
+    .part 文件此时已不会再被任何分段线程打开
+    """
+    with write_lock:
+        stop_event.set()
+        responses = list(in_flight)
+        in_flight.clear()
+    for r in responses:
+        _interrupt_response(r)
+
+
+def _interrupt_response(r: requests.Response):
+    """
+    中断阻塞在网络读取中的响应
+
+    r.close() 需等待分段线程在 iter_content 中持有的读取锁, 而持续缓慢发送数据的下载源
+    每次发送都会重置读超时, 会使调用方一直阻塞; 因此直接关闭底层套接字的收发,
+    使阻塞中的读取立即返回, 响应由分段线程自行关闭。无法获取套接字时在后台线程中关闭响应
+    """
+    sock = getattr(getattr(r.raw, "_connection", None), "sock", None)
+    if sock is None:
+        threading.Thread(target=r.close, name="AuraDlClose", daemon=True).start()
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError as e:
+        log.debug(f"中断分段连接时发生错误: {e}")
+
+
+def _download_segmented(
+    url: str,
+    dest_path: Path,
+    state: _PartState,
+    if_range: Optional[str],
+    primed: Optional[_RaceWinner] = None,
+    watchdog: Optional[_ThroughputWatchdog] = None,
+    verifier: Optional[_StreamingVerifier] = None,
+    pipeline: Optional[PipelinedExtractor] = None,
+):
+    """
+    多连接分段下载, 各分段直接写入预分配的 .part 文件, 并定期保存续传记录
+
+    提供 primed 时, 从其起始位置开始的分段直接复用竞速胜出的连接;
+    提供 watchdog 时, 速率持续过低会中止全部分段并抛出 DownloadStalledError,
+    已写入的数据保留在 .part 文件中, 可由下一个下载源从当前位置继续;
+    提供 verifier 时, 随连续前缀的增长逐步计算 SHA-256;
+    提供 pipeline 时, 随连续前缀的增长边下载边解压
+    """
+    part_path, sidecar_path = _part_paths(dest_path)
+    segments = [seg for seg in state.segments if seg.remaining > 0]
+    primed_segment = None
+    if primed:
+        primed_segment = next(
+            (seg for seg in segments if seg.start + seg.done == primed.start), None
+        )
+        if primed_segment is None:
+            primed.response.close()
+    log.info(f"使用 {len(segments)} 个连接分段下载 {dest_path.name}")
+
+    stop_event = threading.Event()
+    write_lock = threading.Lock()
+    in_flight: set = set()
+    last_saved = time.monotonic()
+    pool = ThreadPoolExecutor(
+        max_workers=max(len(segments), 1), thread_name_prefix="AuraDlSegment"
+    )
+    futures = {
+        pool.submit(
+            _download_segment,
+            url,
+            part_path,
+            seg,
+            if_range,
+            stop_event,
+            write_lock,
+            primed if seg is primed_segment else None,
+            verifier,
+            in_flight,
+        )
+        for seg in segments
+    }
+    try:
+        pending = futures
+        while pending:
+            done, pending = wait(pending, timeout=0.2, return_when=FIRST_EXCEPTION)
+            for future in done:
+                future.result()
+            _report_download_progress(
+                state.downloaded, state.total_size, dest_path.name
+            )
+            if watchdog and pending:
+                watchdog.check(state.downloaded)
+            if verifier or pipeline:
+                with write_lock:
+                    contiguous_end = _contiguous_prefix(state.segments)
+                if verifier:
+                    verifier.catch_up(contiguous_end)
+                if pipeline:
+                    pipeline.advance(contiguous_end)
+            if time.monotonic() - last_saved >= 1.0:
+                state.save(sidecar_path)
+                last_saved = time.monotonic()
+    finally:
+        _stop_segments(stop_event, write_lock, in_flight)
+        with write_lock:
+            state.save(sidecar_path)
+        # 分段线程已不再写入 .part 文件, 无需等待其从网络读取中退出
+        pool.shutdown(wait=False, cancel_futures=True)
 
-                        callbackFuncName = (
-                            typeDefs.lifecycle.GLOBAL_CALLBACKS.REPORT_DOWNLOAD_PROGRESS.value
+
+class _SegmentScheduler:
+    """
+    跨下载源分配分段
+
+    空闲的连接优先领取待下载的分段; 没有待下载分段时, 从仍在进行中、剩余字节最多的分段
+    窃取后半部分, 使较快的下载源分担较慢下载源的工作。分段边界的修改与分段写入共用同一把锁
+    """
+
+    def __init__(
+        self, state: _PartState, write_lock: threading.Lock, stop_event: threading.Event
+    ):
+        self.state = state
+        self.stop_event = stop_event
+        self._cond = threading.Condition(write_lock)
+        self._pending = collections.deque(
+            seg for seg in state.segments if seg.remaining > 0
+        )
+        self._active: set[_Segment] = set()
+
+    def acquire(self) -> Optional[_Segment]:
+        """领取一个分段, 全部分段均已完成或传输已中止时返回 None"""
+        with self._cond:
+            while not self.stop_event.is_set():
+                if self._pending:
+                    segment = self._pending.popleft()
+                    self._active.add(segment)
+                    return segment
+
+                victim = max(self._active, key=lambda seg: seg.remaining, default=None)
+                if victim is None:
+                    return None
+                if victim.remaining >= 2 * DOWNLOAD_AGGREGATE_MIN_STEAL_SIZE:
+                    position = victim.start + victim.done
+                    middle = position + victim.remaining // 2
+                    segment = _Segment(middle, victim.end)
+                    victim.end = middle - 1
+                    self.state.segments.append(segment)
+                    self._active.add(segment)
+                    return segment
+
+                # 剩余分段都很小, 等待其完成或因下载源失败被退回
+                self._cond.wait(0.5)
+            return None
+
+    def release(self, segment: _Segment):
+        """归还分段, 未完成的分段会重新进入待下载队列"""
+        with self._cond:
+            self._active.discard(segment)
+            if segment.remaining > 0:
+                self._pending.append(segment)
+            self._cond.notify_all()
+
+    def stop(self):
+        with self._cond:
+            self.stop_event.set()
+            self._cond.notify_all()
+
+
+def _download_aggregated(
+    urls: List[str],
+    dest_path: Path,
+    state: _PartState,
+    verifier: Optional[_StreamingVerifier] = None,
+    pipeline: Optional[PipelinedExtractor] = None,
+):
+    """
+    由多个下载源的多个连接共同下载同一 .part 文件, 失败的下载源会退出, 其分段交由其余下载源完成
+    """
+    part_path, sidecar_path = _part_paths(dest_path)
+    stop_event = threading.Event()
+    write_lock = threading.Lock()
+    in_flight: set = set()
+    scheduler = _SegmentScheduler(state, write_lock, stop_event)
+
+    def worker(url: str):
+        while True:
+            segment = scheduler.acquire()
+            if segment is None:
+                return
+            try:
+                _download_segment(
+                    url,
+                    part_path,
+                    segment,
+                    None,
+                    stop_event,
+                    write_lock,
+                    verifier=verifier,
+                    in_flight=in_flight,
+                )
+            except requests.exceptions.RequestException as e:
+                if stop_event.is_set():
+                    # 传输已中止, 连接被主动中断
+                    return
+                log.warning(
+                    f"下载源 {_host_of(url)} 分段下载失败, 其分段将交由其他下载源: {e}"
+                )
+                return
+            finally:
+                scheduler.release(segment)
+
+    workers = [
+        url for url in urls for _ in range(DOWNLOAD_AGGREGATE_CONNECTIONS_PER_MIRROR)
+    ]
+    log.info(
+        f"使用 {len(urls)} 个下载源的 {len(workers)} 个连接聚合下载 {dest_path.name}"
+    )
+
+    last_saved = time.monotonic()
+    pool = ThreadPoolExecutor(
+        max_workers=len(workers), thread_name_prefix="AuraDlAggregate"
+    )
+    futures = {pool.submit(worker, url) for url in workers}
+    try:
+        pending = futures
+        while pending:
+            done, pending = wait(pending, timeout=0.2, return_when=FIRST_EXCEPTION)
+            for future in done:
+                future.result()
+            _report_download_progress(
+                state.downloaded, state.total_size, dest_path.name
+            )
+            if verifier or pipeline:
+                with write_lock:
+                    contiguous_end = _contiguous_prefix(state.segments)
+                if verifier:
+                    verifier.catch_up(contiguous_end)
+                if pipeline:
+                    pipeline.advance(contiguous_end)
+            if time.monotonic() - last_saved >= 1.0:
+                with write_lock:
+                    state.save(sidecar_path)
+                last_saved = time.monotonic()
+    finally:
+        scheduler.stop()
+        _stop_segments(stop_event, write_lock, in_flight)
+        with write_lock:
+            state.save(sidecar_path)
+        # 分段线程已不再写入 .part 文件, 无需等待其从网络读取中退出
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    remaining = state.total_size - state.downloaded
+    if remaining:
+        raise requests.exceptions.ChunkedEncodingError(
+            f"所有参与聚合下载的下载源均已失败, 仍有 {remaining} 字节未下载"
+        )
+
+
+def _download_single_stream(
+    url: str,
+    part_path: Path,
+    filename: str,
+    primed: Optional[_RaceWinner] = None,
+    watchdog: Optional[_ThroughputWatchdog] = None,
+    verifier: Optional[_StreamingVerifier] = None,
+    pipeline: Optional[PipelinedExtractor] = None,
+):
+    if primed:
+        r = primed.response
+        chunks = itertools.chain([primed.buffered], primed.chunks)
+    else:
+        r = http_session.get(
+            url,
+            stream=True,
+            timeout=(DOWNLOAD_TIMEOUT_SECONDS, DOWNLOAD_STALL_WINDOW_SECONDS),
+            headers=DOWNLOAD_HEADERS,
+        )
+        chunks = r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)
+
+    with r:
+        r.raise_for_status()
+        total_size = int(r.headers.get("content-length", 0))
+        if verifier and total_size and total_size != verifier.expected.size:
+            raise AssetIntegrityError(
+                f"下载源提供的文件大小为 {total_size} 字节, 预期 {verifier.expected.size} 字节"
+            )
+        log.info(
+            f"文件大小: {total_size / 1024 / 1024:.2f} MB"
+            if total_size
+            else "文件大小: 未知"
+        )
+
+        # 不使用缓冲, 流式解压线程可以立即读到已写入的数据
+        with open(part_path, "wb", buffering=0) as f:
+            downloaded_size = 0
+            for chunk in chunks:
+                if chunk:
+                    f.write(chunk)
+                    if verifier:
+                        verifier.feed(downloaded_size, chunk)
+                    downloaded_size += len(chunk)
+                    if pipeline:
+                        pipeline.advance(downloaded_size)
+                    _report_download_progress(downloaded_size, total_size, filename)
+                    if watchdog:
+                        watchdog.check(downloaded_size)
+                    if verifier and downloaded_size > verifier.expected.size:
+                        raise AssetIntegrityError(
+                            f"已接收 {downloaded_size} 字节, 超出预期的 {verifier.expected.size} 字节"
                         )
-                        if callbackFuncName in lifecycleMgr.callbacks.keys():
-                            if lifecycleMgr.callbacks[callbackFuncName]:
-                                lifecycleMgr.callbacks[callbackFuncName](
-                                    downloaded_size, total_size, f.name.split("\\")[-1]
-                                )  # type: ignore
 
+    if verifier:
+        verifier.verify(downloaded_size)
+
+
+def _start_pipeline(
+    part_path: Path, extract_to: Path
+) -> Optional[PipelinedExtractor]:
+    pipeline = PipelinedExtractor(part_path, extract_to)
+    try:
+        pipeline.start()
+    except OSError as e:
+        log.warning(f"无法边下载边解压, 将在下载完成后再解压: {e}")
+        return None
+    return pipeline
+
+
+def _complete_pipeline(pipeline: PipelinedExtractor, part_path: Path, dest_path: Path):
+    """在 .part 文件重命名前结束流式解压, 重命名后依据中央目录补齐条目"""
+    pipeline.finish(part_path.stat().st_size)
+    _complete_partial(dest_path)
+    try:
+        fixed = pipeline.complete(dest_path)
+    except (zipfile.BadZipFile, OSError) as e:
+        log.warning(f"边下载边解压 {dest_path.name} 失败, 将在下载完成后重新解压: {e}")
+        return
+    if fixed:
+        log.info(f"已依据中央目录补齐 {fixed} 个未能流式解压的条目")
+    log.info(f"{dest_path.name} 已在下载过程中解压至 {pipeline.extract_to}")
+    _pipelined_extractions[dest_path] = pipeline.extract_to
+
+
+@traced("download_file")
+def download_file(
+    url: str,
+    dest_folder: str,
+    filename: str,
+    segment_count: int | None = None,
+    primed: Optional[_RaceWinner] = None,
+    stall_watchdog: bool = True,
+    expected: Optional[AssetDigest] = None,
+    extract_to: Optional[Path] = None,
+) -> Path | str | None:
+    """
+    下载单个文件, 支持多连接分段下载与断点续传
+
+    下载过程中数据写入 <文件名>.part, 续传记录写入 <文件名>.part.json,
+    网络错误或取消时保留二者, 下次调用 (同一或其他下载源) 时从已完成的位置继续
+
+    Args:
+        url: 文件下载地址
+        dest_folder: 目标目录
+        filename: 目标文件名
+        segment_count: 分段连接数, 默认使用 DOWNLOAD_SEGMENT_COUNT
+        primed: 竞速胜出的连接, 提供时跳过探测并复用其已收到的数据
+        stall_watchdog: 是否在速率持续低于 DOWNLOAD_STALL_MIN_RATE 时中止下载,
+            中止后已下载的数据会保留, 以便切换到下一个下载源后继续
+        expected: 预期的文件大小与 SHA-256, 提供时在下载过程中校验,
+            大小不符时立即放弃该下载源, 摘要不符时丢弃已下载的数据
+        extract_to: 提供时边下载边将 ZIP 文件解压至该目录, 成功后 unzip_file 会跳过解压
+
+    Returns:
+        下载成功时返回文件路径, 取消时返回 "DL_CANCEL", 失败时返回 None
+    """
+    dest_path = Path(dest_folder) / filename
+    part_path, sidecar_path = _part_paths(dest_path)
+    segment_count = segment_count or DOWNLOAD_SEGMENT_COUNT
+    log.info(f"正在从 {url} 下载 {filename}, 目标目录: {dest_path}")
+    tracer.annotate(file=filename, mirror=_host_of(url))
+
+    watchdog = (
+        _ThroughputWatchdog(DOWNLOAD_STALL_MIN_RATE, DOWNLOAD_STALL_WINDOW_SECONDS)
+        if stall_watchdog
+        else None
+    )
+    verifier = _StreamingVerifier(expected, part_path) if expected else None
+    pipeline = None
+
+    try:
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        _pipelined_extractions.pop(dest_path, None)
+        if extract_to:
+            pipeline = _start_pipeline(part_path, extract_to)
+
+        info = primed.info if primed else probe_range_support(url)
+        tracer.annotate(bytes=info.total_size, range_supported=info.range_supported)
+        if info.range_supported:
+            log.info(f"文件大小: {info.total_size / 1024 / 1024:.2f} MB")
+            if expected and info.total_size != expected.size:
+                # 仅说明该下载源有误, 保留其他下载源已下载的部分
+                log.error(
+                    f"下载源提供的 {filename} 大小为 {info.total_size} 字节, 预期 {expected.size} 字节, 跳过该下载源"
+                )
+                return None
+            state = _prepare_part_state(dest_path, url, info, segment_count)
+            _download_segmented(
+                url,
+                dest_path,
+                state,
+                _if_range_validator(info),
+                primed,
+                watchdog,
+                verifier,
+                pipeline,
+            )
+            if verifier:
+                verifier.verify(state.total_size)
+        else:
+            log.info("下载源不支持 Range 分段请求, 回退为单连接下载")
+            _discard_partial(dest_path)
+            if primed and primed.start:
+                primed.response.close()
+                primed = None
+            _download_single_stream(
+                url, part_path, filename, primed, watchdog, verifier, pipeline
+            )
+
+        if pipeline:
+            _complete_pipeline(pipeline, part_path, dest_path)
+        else:
+            _complete_partial(dest_path)
         log.success(f"文件 {filename} 下载成功。")
         return dest_path
+    except ResumeRejectedError as e:
+        log.error(f"下载源拒绝续传 {filename}: {e}")
+        _discard_partial(dest_path)
+        return None
+    except AssetIntegrityError as e:
+        log.error(f"{filename} 校验失败, 已丢弃下载的数据: {e}")
+        _discard_partial(dest_path)
+        return None
+    except DownloadStalledError as e:
+        log.warning(f"下载源在传输 {filename} 时停滞: {e}")
+        if sidecar_path.exists():
+            log.info(f"已保留 {part_path.name}, 将由下一个下载源从当前位置继续")
+        else:
+            _discard_partial(dest_path)
+        return None
     except requests.exceptions.RequestException as e:
         log.error(f"下载文件 {filename} 时发生网络错误: {e}")
-        if dest_path.exists():
-            os.remove(dest_path)
+        if sidecar_path.exists():
+            log.info(f"已保留未完成的 {part_path.name}, 可在下次下载时继续")
+        else:
+            _discard_partial(dest_path)
+        return None
+    except Exception as e:
+        if "INSTALLATION_CANCELLED" in str(e):
+            return "DL_CANCEL"
+        log.error(f"写入文件 {filename} 时发生意外错误: {e}")
+        _discard_partial(dest_path)
+        return None
+    finally:
+        if primed:
+            primed.response.close()
+        if pipeline:
+            pipeline.abort()
+
+
+@traced("download_file_aggregated")
+def download_file_aggregated(
+    urls: List[str],
+    dest_folder: str,
+    filename: str,
+    expected: Optional[AssetDigest] = None,
+    extract_to: Optional[Path] = None,
+) -> Path | str | None:
+    """
+    从多个下载源同时下载同一文件的不同字节区间, 并合并为一个文件
+
+    各下载源提供的资源文件字节一致, 因此可以将文件切分给多个下载源并行下载,
+    总带宽随下载源数量增长。仅使用支持 Range 且文件大小一致的下载源,
+    可用下载源不足两个或文件过小时不进行聚合下载
+
+    Args:
+        urls: 各下载源上该文件的完整地址
+        dest_folder: 目标目录
+        filename: 目标文件名
+        expected: 预期的文件大小与 SHA-256, 提供时排除文件大小不符的下载源, 并在下载过程中校验
+        extract_to: 提供时边下载边将 ZIP 文件解压至该目录
+
+    Returns:
+        下载成功时返回文件路径, 取消时返回 "DL_CANCEL", 失败或不适用时返回 None
+    """
+    dest_path = Path(dest_folder) / filename
+    part_path, sidecar_path = _part_paths(dest_path)
+    pipeline = None
+
+    try:
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+
+        def probe(url: str) -> Optional[RemoteFileInfo]:
+            try:
+                return probe_range_support(url)
+            except requests.exceptions.RequestException as e:
+                log.debug(f"探测下载源 {_host_of(url)} 失败: {e}")
+                return None
+
+        with ThreadPoolExecutor(
+            max_workers=len(urls), thread_name_prefix="AuraDlProbe"
+        ) as pool:
+            infos = list(pool.map(probe, urls))
+
+        usable = [
+            (url, info)
+            for url, info in zip(urls, infos)
+            if info and info.range_supported
+        ]
+        if usable:
+            # 以预期大小或多数下载源报告的文件大小为准, 排除文件大小不一致的下载源
+            total_size = (
+                expected.size
+                if expected
+                else collections.Counter(
+                    info.total_size for _, info in usable
+                ).most_common(1)[0][0]
+            )
+            usable = [(url, info) for url, info in usable if info.total_size == total_size]
+
+        if len(usable) < 2 or usable[0][1].total_size < DOWNLOAD_SEGMENT_MIN_SIZE:
+            log.info(f"可用于聚合下载 {filename} 的下载源不足, 跳过聚合下载")
+            return None
+
+        first_url, first_info = usable[0]
+        log.info(f"文件大小: {first_info.total_size / 1024 / 1024:.2f} MB")
+        tracer.annotate(
+            file=filename,
+            bytes=first_info.total_size,
+            mirror=", ".join(_host_of(url) for url, _ in usable),
+        )
+        state = _prepare_part_state(
+            dest_path,
+            first_url,
+            first_info,
+            len(usable) * DOWNLOAD_AGGREGATE_CONNECTIONS_PER_MIRROR,
+        )
+        verifier = _StreamingVerifier(expected, part_path) if expected else None
+        _pipelined_extractions.pop(dest_path, None)
+        if extract_to:
+            pipeline = _start_pipeline(part_path, extract_to)
+        _download_aggregated(
+            [url for url, _ in usable], dest_path, state, verifier, pipeline
+        )
+        if verifier:
+            verifier.verify(state.total_size)
+
+        if pipeline:
+            _complete_pipeline(pipeline, part_path, dest_path)
+        else:
+            _complete_partial(dest_path)
+        log.success(f"文件 {filename} 聚合下载成功。")
+        return dest_path
+    except AssetIntegrityError as e:
+        log.error(f"{filename} 校验失败, 已丢弃下载的数据: {e}")
+        _discard_partial(dest_path)
+        return None
+    except requests.exceptions.RequestException as e:
+        log.error(f"聚合下载 {filename} 时发生网络错误: {e}")
+        if not sidecar_path.exists():
+            _discard_partial(dest_path)
         return None
     except Exception as e:
         if "INSTALLATION_CANCELLED" in str(e):
             return "DL_CANCEL"
         log.error(f"写入文件 {filename} 时发生意外错误: {e}")
-        if dest_path.exists():
-            os.remove(dest_path)
+        _discard_partial(dest_path)
         return None
+    finally:
+        if pipeline:
+            pipeline.abort()
+
+
+def clean_temp_dir(
+    temp_dir: Path, keep_partial: bool = True, keep: Iterable[Path] = ()
+):
+    """
+    清理临时文件夹, 默认保留未完成下载的 .part 文件及其续传记录
+
+    Args:
+        temp_dir: 临时文件夹
+        keep_partial: 是否保留 .part 文件
+        keep: 需要保留的其他文件
+    """
+    if not temp_dir.exists():
+        return
+    keep = {Path(path) for path in keep}
+    if not keep_partial and not keep:
+        shutil.rmtree(temp_dir)
+        return
+
+    for item in temp_dir.iterdir():
+        if item in keep:
+            continue
+        if keep_partial and item.is_file() and (
+            item.name.endswith(DOWNLOAD_PART_SUFFIX)
+            or item.name.endswith(DOWNLOAD_PART_SUFFIX + ".json")
+        ):
+            continue
+        if item.is_dir() and not item.is_symlink():
+            shutil.rmtree(item)
+        else:
+            os.remove(item)
+
+
+class MirrorBenchmark(NamedTuple):
+    base_url: str
+    latency: float
+    throughput: float
+    score: float
+    available: bool
+
+
+def _host_of(url: str) -> str:
+    return url.split("//")[1].split("/")[0]
 
 
-async def test_download_source_speed(
-    base_url: str, test_filename: str = None
-) -> Tuple[str, float, bool]:
-    test_url = f"{base_url}/{desiredTag}/{AURA_FILENAME}" if test_filename else base_url
+@traced("mirror_latency_probe")
+def test_download_source_speed(
+    base_url: str, test_filename: str = None, tag_name: str | None = None
+) -> MirrorBenchmark:
+    """
+    使用 HEAD 请求测量下载源的响应时间
+    """
+    tag_name = tag_name or desiredTag
+    test_url = f"{base_url}/{tag_name}/{test_filename}" if test_filename else base_url
+    tracer.annotate(mirror=_host_of(base_url))
 
     try:
         start_time = time.time()
 
-        async with aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=10)
-        ) as session:
-            async with session.head(test_url) as response:
-                if response.status == 200:
-                    response_time = time.time() - start_time
-                    return (base_url, response_time, True)
-                else:
-                    return (base_url, float("inf"), False)
+        with http_session.head(
+            test_url,
+            timeout=MIRROR_PROBE_TIMEOUT_SECONDS,
+            headers=DOWNLOAD_HEADERS,
+            allow_redirects=True,
+        ) as response:
+            if response.status_code == 200:
+                response_time = time.time() - start_time
+                return MirrorBenchmark(
+                    base_url, response_time, 0.0, response_time, True
+                )
+            else:
+                return MirrorBenchmark(
+                    base_url, float("inf"), 0.0, float("inf"), False
+                )
 
     except Exception as e:
         log.warning(f"测速失败 {base_url}: {e}")
-        return (base_url, float("inf"), False)
+        return MirrorBenchmark(base_url, float("inf"), 0.0, float("inf"), False)
+
 
+@traced("mirror_throughput_probe")
+def test_download_source_throughput(
+    base_url: str, test_filename: str, tag_name: str | None = None
+) -> MirrorBenchmark:
+    """
+    使用 Range 请求下载资源文件开头的 MIRROR_PROBE_BYTES 字节,
+    测量首字节延迟以及首字节之后的持续吞吐量
 
-async def benchmark_download_sources(tag_name: str) -> List[str]:
-    log.info("正在测试下载源速度...")
+    Args:
+        base_url: 下载源地址
+        test_filename: 用于测速的资源文件名
+        tag_name: 版本 Tag
+
+    Returns:
+        MirrorBenchmark, 吞吐量单位为字节 / 秒
+    """
+    tag_name = tag_name or desiredTag
+    test_url = f"{base_url}/{tag_name}/{test_filename}"
+    tracer.annotate(mirror=_host_of(base_url))
+    headers = {**DOWNLOAD_HEADERS, "Range": f"bytes=0-{MIRROR_PROBE_BYTES - 1}"}
+
+    try:
+        start_time = time.perf_counter()
+
+        with http_session.get(
+            test_url,
+            stream=True,
+            timeout=MIRROR_PROBE_TIMEOUT_SECONDS,
+            headers=headers,
+        ) as response:
+            if response.status_code not in (200, 206):
+                return MirrorBenchmark(
+                    base_url, float("inf"), 0.0, float("inf"), False
+                )
+
+            first_byte_time = None
+            first_chunk_size = 0
+            received_size = 0
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                if first_byte_time is None:
+                    first_byte_time = time.perf_counter()
+                    first_chunk_size = len(chunk)
+                received_size += len(chunk)
+                # 206 响应体本身只有 MIRROR_PROBE_BYTES 字节, 读完后连接可被随后的下载复用;
+                # 不支持 Range 的下载源会返回完整文件, 读够即可中止
+                if response.status_code == 200 and received_size >= MIRROR_PROBE_BYTES:
+                    break
+            end_time = time.perf_counter()
+
+        if first_byte_time is None:
+            return MirrorBenchmark(base_url, float("inf"), 0.0, float("inf"), False)
+
+        latency = first_byte_time - start_time
+        # 首个数据块通常已在缓冲区中, 不计入持续吞吐量
+        streamed_size = received_size - first_chunk_size
+        elapsed = end_time - first_byte_time
+        if streamed_size > 0 and elapsed > 0:
+            throughput = streamed_size / elapsed
+        else:
+            throughput = received_size / max(end_time - start_time, 1e-6)
+        return MirrorBenchmark(
+            base_url, latency, throughput, mirror_score(latency, throughput), True
+        )
+
+    except Exception as e:
+        log.warning(f"测速失败 {base_url}: {e}")
+        return MirrorBenchmark(base_url, float("inf"), 0.0, float("inf"), False)
 
-    tasks = [
-        test_download_source_speed(url, AURA_FILENAME) for url in BASE_DOWNLOAD_URLS
-    ]
-    results = await asyncio.gather(*tasks)
 
-    # 筛选可用源并按响应时间排序
-    available_sources = [(url, time) for url, time, available in results if available]
-    available_sources.sort(key=lambda x: x[1])
+def benchmark_download_sources(
+    tag_name: str, mode: str = MIRROR_RANKING_MODE, urls: List[str] | None = None
+) -> List[str]:
+    """
+    并行对下载源测速, 并将结果写入下载源评分缓存
+
+    Args:
+        tag_name: 版本 Tag
+        mode: "throughput" 按延迟与吞吐量综合评分排序, "latency" 仅按 HEAD 响应时间排序
+        urls: 需要测速的下载源, 默认为全部下载源
+
+    Returns:
+        按评分从优到劣排序的可用下载源, 全部不可用时返回默认顺序
+    """
+    urls = urls or BASE_DOWNLOAD_URLS
+    log.info(f"正在测试 {len(urls)} 个下载源的速度 (模式: {mode})...")
+
+    test_func = (
+        test_download_source_throughput
+        if mode == "throughput"
+        else test_download_source_speed
+    )
+    with ThreadPoolExecutor(
+        max_workers=len(urls), thread_name_prefix="AuraMirrorBench"
+    ) as pool:
+        results: List[MirrorBenchmark] = list(
+            pool.map(lambda url: test_func(url, AURA_FILENAME, tag_name), urls)
+        )
 
-    sorted_urls = [url for url, _ in available_sources]
+    for result in results:
+        if result.available:
+            mirror_stats.record_success(
+                result.base_url, result.latency, result.throughput
+            )
+        else:
+            mirror_stats.record_failure(result.base_url)
+
+    # 筛选可用源并按评分排序
+    available_sources = [result for result in results if result.available]
+    available_sources.sort(key=lambda result: result.score)
+
+    sorted_urls = [result.base_url for result in available_sources]
 
     # 输出测速结果
-    for url, response_time in available_sources[:3]:  # 只输出前 3 个最快的
+    for result in available_sources[:3]:  # 只输出前 3 个最快的
+        if mode == "throughput":
+            log.info(
+                f"下载源 {_host_of(result.base_url)} 首字节延迟: {result.latency:.2f}s | "
+                f"吞吐量: {result.throughput / 1024:.0f} KB/s | 评分: {result.score:.2f}"
+            )
+        else:
+            log.info(
+                f"下载源 {_host_of(result.base_url)} 响应时间: {result.latency:.2f}s"
+            )
+
+    return sorted_urls if sorted_urls else BASE_DOWNLOAD_URLS
+
+
+def _benchmark_in_background(tag_name: str, mode: str, urls: List[str]):
+    def worker():
+        try:
+            benchmark_download_sources(tag_name, mode, urls)
+        except Exception as e:
+            log.warning(f"后台测速失败: {e}")
+
+    threading.Thread(target=worker, name="AuraMirrorProbe", daemon=True).start()
+
+
+@traced("rank_download_sources")
+def rank_download_sources(
+    tag_name: str, mode: str = MIRROR_RANKING_MODE, blocking: bool = True
+) -> List[str]:
+    """
+    对所有下载源排序
+
+    下载源评分缓存中有未过期的可用数据时直接按缓存排序, 并在后台对过期或未知的下载源重新测速;
+    否则同步测速所有下载源。测速失败时返回默认顺序
+
+    Args:
+        tag_name: 版本 Tag
+        mode: 测速模式, 参见 benchmark_download_sources
+        blocking: 无可用缓存时是否同步测速, 为 False 时改为后台测速并直接按缓存 / 默认顺序返回
+
+    Returns:
+        排序后的下载源列表
+    """
+    if mirror_stats.has_fresh_ranking(BASE_DOWNLOAD_URLS):
+        stale_urls = mirror_stats.stale_urls(BASE_DOWNLOAD_URLS)
+        if stale_urls:
+            log.info(f"{len(stale_urls)} 个下载源的评分已过期或未知, 将在后台重新测速")
+            _benchmark_in_background(tag_name, mode, stale_urls)
+        log.info("使用缓存的下载源评分进行排序")
+        return mirror_stats.rank(BASE_DOWNLOAD_URLS)
+
+    if not blocking:
+        _benchmark_in_background(tag_name, mode, BASE_DOWNLOAD_URLS)
+        return mirror_stats.rank(BASE_DOWNLOAD_URLS)
+
+    try:
+        benchmark_download_sources(tag_name, mode)
+        log.info("测速完成, 将按测速顺序进行下载")
+        return mirror_stats.rank(BASE_DOWNLOAD_URLS)
+    except Exception as e:
+        log.warning(f"测速失败, 使用默认顺序: {e}")
+    return BASE_DOWNLOAD_URLS
+
+
+def _race_mirrors(
+    candidates: List[Tuple[str, str]], dest_path: Path
+) -> Optional[_RaceWinner]:
+    """
+    同时向多个下载源发起真实的下载请求, 最先收到 DOWNLOAD_RACE_BYTES 字节的下载源胜出,
+    其余连接随即关闭
+
+    Args:
+        candidates: (下载源地址, 文件完整地址) 列表
+        dest_path: 目标文件路径, 存在续传记录时从第一个未完成分段的位置开始竞速
+
+    Returns:
+        胜出的下载源及其连接, 全部失败或超时时返回 None
+    """
+    start = _resume_offset(dest_path, _asset_id(candidates[0][1]))
+    headers = {**DOWNLOAD_HEADERS, "Range": f"bytes={start}-"}
+    finished = threading.Event()
+    winner_lock = threading.Lock()
+    winners: List[_RaceWinner] = []
+
+    def racer(base_url: str, url: str):
+        start_time = time.perf_counter()
+        try:
+            r = http_session.get(
+                url, stream=True, timeout=DOWNLOAD_TIMEOUT_SECONDS, headers=headers
+            )
+        except requests.exceptions.RequestException as e:
+            log.debug(f"竞速请求失败 {_host_of(base_url)}: {e}")
+            mirror_stats.record_failure(base_url)
+            return
+
+        try:
+            # 续传时必须从指定位置开始, 不支持 Range 的下载源无法参与
+            if r.status_code not in (200, 206) or (r.status_code == 200 and start):
+                r.close()
+                return
+
+            chunks = r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)
+            buffered = bytearray()
+            first_byte_time = None
+            for chunk in chunks:
+                if finished.is_set():
+                    r.close()
+                    return
+                if first_byte_time is None:
+                    first_byte_time = time.perf_counter()
+                buffered += chunk
+                if len(buffered) >= DOWNLOAD_RACE_BYTES:
+                    break
+
+            with winner_lock:
+                if finished.is_set():
+                    r.close()
+                    return
+                finished.set()
+                winners.append(
+                    _RaceWinner(
+                        base_url,
+                        url,
+                        r,
+                        chunks,
+                        bytes(buffered),
+                        start,
+                        _remote_file_info(r),
+                    )
+                )
+
+            end_time = time.perf_counter()
+            latency = (first_byte_time or end_time) - start_time
+            mirror_stats.record_success(
+                base_url, latency, len(buffered) / max(end_time - start_time, 1e-6)
+            )
+        except Exception as e:
+            log.debug(f"竞速下载失败 {_host_of(base_url)}: {e}")
+            r.close()
+
+    threads = [
+        threading.Thread(
+            target=racer, args=candidate, name="AuraDlRace", daemon=True
+        )
+        for candidate in candidates
+    ]
+    for thread in threads:
+        thread.start()
+
+    deadline = time.monotonic() + DOWNLOAD_RACE_TIMEOUT_SECONDS
+    while (
+        not finished.is_set()
+        and time.monotonic() < deadline
+        and any(thread.is_alive() for thread in threads)
+    ):
+        finished.wait(0.1)
+
+    with winner_lock:
+        # 超时或全部失败时通知仍在进行的竞速连接退出
+        finished.set()
+        return winners[0] if winners else None
+
+
+def _store_in_release_cache(
+    cache_key: Optional[str], path: Path, expected: Optional[AssetDigest] = None
+):
+    # 已通过流式校验的文件无需再次计算 SHA-256
+    sha256 = expected.sha256 if expected else None
+    if cache_key and release_cache.put(cache_key, path, sha256):
+        log.info(f"{path.name} 已存入本地缓存")
+
+
+def _release_cache_key(
+    tag_name: str | None, filename: str, expected: Optional[AssetDigest] = None
+) -> Optional[str]:
+    # 内容可变的 Tag 仅在有预期 SHA-256 可供比对时使用缓存
+    if not tag_name or (tag_name in MUTABLE_RELEASE_TAGS and not expected):
+        return None
+    return f"{tag_name}/{filename}"
+
+
+def is_delta_download(path: Path) -> bool:
+    """文件是否为增量下载的 ZIP 文件 (仅包含有变化的条目)"""
+    return path in _delta_downloads
+
+
+@traced("download_delta")
+def _download_delta(
+    url: str,
+    dest_path: Path,
+    installed_dir: Path,
+    recorded_files: Optional[dict] = None,
+    expected: Optional[AssetDigest] = None,
+) -> Path | str | None:
+    """
+    读取远程 ZIP 的中央目录, 与已安装的文件比对后仅下载有变化的条目
+
+    生成的文件大小与远程文件一致, 未下载的条目所在位置为空,
+    只能配合 upgradePlanner.apply_upgrade_plan 解压, 也不会存入本地缓存
+
+    Returns:
+        下载成功时返回文件路径, 取消时返回 "DL_CANCEL",
+        下载源不支持 Range 或增量下载不划算时返回 None
+    """
+    filename = dest_path.name
+    delta_path = dest_path.with_name(dest_path.name + ".delta")
+    try:
+        info = probe_range_support(url)
+        if not info.range_supported or not info.total_size:
+            log.info(f"下载源不支持 Range 分段请求, 无法增量下载 {filename}")
+            return None
+        if expected and info.total_size != expected.size:
+            log.error(
+                f"下载源提供的 {filename} 大小为 {info.total_size} 字节, 预期 {expected.size} 字节, 跳过该下载源"
+            )
+            return None
+
+        remote = RemoteZip(
+            url, info.total_size, delta_path, DOWNLOAD_HEADERS, _if_range_validator(info)
+        )
+        remote.load_central_directory()
+        plan = plan_upgrade(delta_path, installed_dir, recorded_files)
+        changed = [plan.entries[relpath].filename for relpath in plan.add + plan.replace]
+        ranges = coalesce_ranges(remote.entry_ranges(changed), DELTA_DOWNLOAD_MERGE_GAP)
+        delta_size = sum(end - start + 1 for start, end in ranges)
         log.info(
-            f"下载源 {url.split('//')[1].split('/')[0]} 响应时间: {response_time:.2f}s"
+            f"{filename} 中有 {len(changed)} 个条目需要更新, 合并为 {len(ranges)} 个区间, "
+            f"共 {delta_size / 1024 / 1024:.2f} / {info.total_size / 1024 / 1024:.2f} MB"
         )
+        if delta_size > info.total_size * DELTA_DOWNLOAD_MAX_RATIO:
+            log.info("需要更新的数据较多, 改为完整下载")
+            os.remove(delta_path)
+            return None
 
-    return sorted_urls if sorted_urls else BASE_DOWNLOAD_URLS
+        tracer.annotate(
+            file=filename, mirror=_host_of(url), bytes=delta_size, entries=len(changed)
+        )
+        if ranges:
+            remote.fetch_ranges(
+                ranges,
+                DOWNLOAD_SEGMENT_COUNT,
+                lambda done, total: _report_download_progress(done, total, filename),
+            )
+        os.replace(delta_path, dest_path)
+        _delta_downloads.add(dest_path)
+        log.success(f"{filename} 增量下载完成")
+        return dest_path
+    except (RemoteZipError, zipfile.BadZipFile) as e:
+        log.warning(f"无法增量下载 {filename}: {e}")
+    except requests.exceptions.RequestException as e:
+        log.warning(f"增量下载 {filename} 时发生网络错误: {e}")
+    except Exception as e:
+        if "INSTALLATION_CANCELLED" in str(e):
+            return "DL_CANCEL"
+        log.error(f"增量下载 {filename} 时发生意外错误: {e}")
+    if delta_path.exists():
+        os.remove(delta_path)
+    return None
 
 
+@traced("download_file_multi_sources")
 def download_file_multi_sources(
-    filename: str, dest_folder: str, use_speed_optimization: bool = True
+    filename: str,
+    dest_folder: str,
+    use_speed_optimization: bool = True,
+    download_urls: List[str] | None = None,
+    extract_to: Path | None = None,
+    delta_from: Path | None = None,
+    recorded_files: dict | None = None,
 ) -> Path | None:
     """
     尝试从多个下载源下载文件
+
+    Args:
+        filename: 文件名
+        dest_folder: 目标目录
+        use_speed_optimization: 未提供 download_urls 时是否先测速排序
+        download_urls: 已排序的下载源列表, 提供时跳过测速
+        extract_to: 提供时边下载边将 ZIP 文件解压至该目录
+        delta_from: 已安装的目录, 提供且本地缓存未命中时,
+            先尝试仅下载与该目录相比有变化的条目 (见 is_delta_download)
+        recorded_files: 安装清单中记录的文件信息, 用于跳过未修改文件的哈希计算
     """
     global desiredTag
 
-    download_urls = BASE_DOWNLOAD_URLS
+    _delta_downloads.discard(Path(dest_folder) / filename)
+    tracer.annotate(file=filename)
+    expected = expectedDigests.get(filename)
+    cache_key = _release_cache_key(desiredTag, filename, expected)
+    if cache_key:
+        cached_path = release_cache.materialize(
+            cache_key,
+            Path(dest_folder) / filename,
+            expected.sha256 if expected else None,
+        )
+        if cached_path:
+            log.success(f"已从本地缓存获取 {filename}, 跳过下载")
+            cached_size = cached_path.stat().st_size
+            tracer.annotate(cache_hit=True, bytes=cached_size)
+            _report_download_progress(cached_size, cached_size, filename)
+            return cached_path
 
-    if use_speed_optimization and desiredTag:
-        try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            optimized_urls = loop.run_until_complete(
-                benchmark_download_sources(desiredTag)
+    if download_urls is None:
+        download_urls = BASE_DOWNLOAD_URLS
+        if use_speed_optimization and desiredTag:
+            download_urls = rank_download_sources(
+                desiredTag, blocking=DOWNLOAD_RACE_MIRRORS <= 1
             )
-            loop.close()
 
-            if optimized_urls:
-                download_urls = optimized_urls
-                log.info("测速完成, 将按测速顺序进行下载")
-        except Exception as e:
-            log.warning(f"测速失败, 使用默认顺序: {e}")
+    if delta_from:
+        result = _download_delta(
+            f"{download_urls[0]}/{desiredTag}/{filename}",
+            Path(dest_folder) / filename,
+            delta_from,
+            recorded_files,
+            expected,
+        )
+        if result == "DL_CANCEL":
+            log.warning("下载已取消")
+            return None
+        elif result:
+            return result  # type: ignore
 
-    for base_url in download_urls:
+    if DOWNLOAD_AGGREGATE_MIRRORS > 1 and len(download_urls) > 1:
+        result = download_file_aggregated(
+            [
+                f"{base_url}/{desiredTag}/{filename}"
+                for base_url in download_urls[:DOWNLOAD_AGGREGATE_MIRRORS]
+            ],
+            dest_folder,
+            filename,
+            expected,
+            extract_to,
+        )
+        if result == "DL_CANCEL":
+            log.warning("下载已取消")
+            return None
+        elif result:
+            _store_in_release_cache(cache_key, Path(result), expected)
+            return result  # type: ignore
+        log.info("聚合下载未完成, 改为逐个下载源下载 (已下载的部分会被保留)")
+
+    race_winner = None
+    if DOWNLOAD_RACE_MIRRORS > 1 and len(download_urls) > 1:
+        log.info(f"正在让前 {DOWNLOAD_RACE_MIRRORS} 个下载源竞速下载 {filename}...")
+        race_winner = _race_mirrors(
+            [
+                (base_url, f"{base_url}/{desiredTag}/{filename}")
+                for base_url in download_urls[:DOWNLOAD_RACE_MIRRORS]
+            ],
+            Path(dest_folder) / filename,
+        )
+        if race_winner:
+            log.info(f"下载源 {_host_of(race_winner.base_url)} 竞速胜出")
+            download_urls = [race_winner.base_url] + [
+                base_url
+                for base_url in download_urls
+                if base_url != race_winner.base_url
+            ]
+        else:
+            log.warning("竞速未产生胜出的下载源, 按排序依次尝试")
+
+    for index, base_url in enumerate(download_urls):
         url = f"{base_url}/{desiredTag}/{filename}"
-        result = download_file(url, dest_folder, filename)
+        # 续传时的耗时不能反映下载源的真实吞吐量, 仅在完整下载时记录
+        is_resuming = _part_paths(Path(dest_folder) / filename)[1].exists()
+        start_time = time.perf_counter()
+        primed = (
+            race_winner
+            if race_winner and race_winner.base_url == base_url
+            else None
+        )
+        # 最后一个下载源即使较慢也应坚持下载完成
+        result = download_file(
+            url,
+            dest_folder,
+            filename,
+            primed=primed,
+            stall_watchdog=index < len(download_urls) - 1,
+            expected=expected,
+            extract_to=extract_to,
+        )
         if result == "DL_CANCEL":
             log.warning("下载已取消")
             return None
         elif result:
+            if not is_resuming:
+                mirror_stats.record_success(
+                    base_url,
+                    None,
+                    Path(result).stat().st_size / (time.perf_counter() - start_time),
+                )
+            _store_in_release_cache(cache_key, Path(result), expected)
             return result  # type: ignore
         else:
+            mirror_stats.record_failure(base_url)
             log.warning(f"从 {url} 下载失败, 尝试下一个源...")
     log.critical(f"所有下载源均失败, 无法下载 {filename}")
     return None
 
 
+@traced("unzip_file")
 def unzip_file(zip_path: Path, extract_to: Path) -> bool:
+    if _pipelined_extractions.get(zip_path) == extract_to:
+        log.success(f"{zip_path.name} 已在下载过程中解压完成, 跳过解压")
+        return True
     log.info(f"正在解压 {zip_path.name}, 目标目录: {extract_to}")
     try:
         extract_to.mkdir(parents=True, exist_ok=True)
-        with zipfile.ZipFile(zip_path, "r") as zf:
-            zf.extractall(extract_to)
-        log.success(f"解压 {zip_path.name} 成功。")
+        extracted_count = extract_parallel(
+            zip_path,
+            extract_to,
+            max_workers=UNZIP_MAX_WORKERS,
+            progress_callback=_report_extract_progress,
+        )
+        log.success(f"解压 {zip_path.name} 成功, 共 {extracted_count} 个文件。")
+        tracer.annotate(file=zip_path.name, files=extracted_count)
         return True
     except zipfile.BadZipFile:
         log.error(f"解压时发生错误: {zip_path.name} 不是一个有效的 ZIP 文件。")
         return False
     except Exception as e:
+        if "INSTALLATION_CANCELLED" in str(e):
+            raise
         log.error(f"解压时发生错误: 文件名称: {zip_path.name} | 错误: {e}")
         return False
 
 
-def download_release_files(tagName) -> tuple[Path | None, Path | None]:
+@traced("download_release_files")
+def download_release_files(
+    tagName,
+    extract_dirs: dict[str, Path] | None = None,
+    installed_aura_dir: Path | None = None,
+    recorded_files: dict | None = None,
+) -> tuple[Path | None, Path | None]:
+    """
+    下载 core.zip 与 aura.zip
+
+    Args:
+        tagName: 版本标签
+        extract_dirs: 文件名到解压目录的映射, 提供时边下载边解压,
+            之后对同一文件与目录调用 unzip_file 会直接返回
+        installed_aura_dir: 已安装的 aura 文件夹, 提供时尝试仅下载 aura.zip 中有变化的条目
+        recorded_files: 安装清单中记录的文件信息
+
+    Returns:
+        (core.zip 路径, aura.zip 路径), 下载失败的文件为 None
+    """
     log.info(f"准备下载 HugoAura 资源文件...")
 
     global desiredTag
     desiredTag = tagName
     temp_dir = Path(TEMP_INSTALL_DIR)
     if temp_dir.exists():
-        log.info(f"正在清理旧的临时文件夹: {temp_dir}")
+        log.info(f"正在清理旧的临时文件夹 (保留未完成的下载): {temp_dir}")
         try:
-            shutil.rmtree(temp_dir)
+            clean_temp_dir(temp_dir)
         except OSError as e:
             log.error(f"清理失败 {temp_dir}, 请确保当前用户有 %TEMP% 的写入权限: {e}")
             return None, None
@@ -198,12 +1814,62 @@ def download_release_files(tagName) -> tuple[Path | None, Path | None]:
         )
         return None, None
 
-    downloaded_core_path = download_file_multi_sources(CORE_FILENAME, str(temp_dir))
+    global expectedDigests
+    expectedDigests = version_manager.get_asset_digests(tagName)
+    if expectedDigests:
+        log.info("已获取资源文件的 SHA-256, 将在下载过程中校验")
+    else:
+        log.warning(f"未能获取 {tagName} 的资源文件校验信息, 将跳过 SHA-256 校验")
+
+    # 两个文件均已缓存时无需测速; 缓存校验失败时由各下载任务自行测速
+    cached = []
+    for filename in (CORE_FILENAME, AURA_FILENAME):
+        expected = expectedDigests.get(filename)
+        cache_key = _release_cache_key(tagName, filename, expected)
+        cached.append(
+            bool(cache_key)
+            and release_cache.contains(cache_key, expected.sha256 if expected else None)
+        )
+    # 两个资源文件共用一次测速结果, 并行下载, 进度合并上报
+    global _combined_progress, rankedDownloadUrls
+    if all(cached):
+        log.info("资源文件均已在本地缓存中, 跳过下载源测速")
+        download_urls = None
+    else:
+        download_urls = rank_download_sources(
+            tagName, blocking=DOWNLOAD_RACE_MIRRORS <= 1
+        )
+    rankedDownloadUrls = download_urls
+    _combined_progress = _CombinedProgress(f"{CORE_FILENAME} + {AURA_FILENAME}")
+    try:
+        with ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="AuraDlRelease"
+        ) as pool:
+            core_future = pool.submit(
+                download_file_multi_sources,
+                CORE_FILENAME,
+                str(temp_dir),
+                download_urls=download_urls,
+                extract_to=(extract_dirs or {}).get(CORE_FILENAME),
+            )
+            aura_future = pool.submit(
+                download_file_multi_sources,
+                AURA_FILENAME,
+                str(temp_dir),
+                download_urls=download_urls,
+                extract_to=(extract_dirs or {}).get(AURA_FILENAME),
+                delta_from=installed_aura_dir,
+                recorded_files=recorded_files,
+            )
+            downloaded_core_path = core_future.result()
+            downloaded_zip_path = aura_future.result()
+    finally:
+        _combined_progress = None
+
     if not downloaded_core_path:
         log.critical("下载 core.zip 时发生错误, 安装进程终止。")
         return None, None
 
-    downloaded_zip_path = download_file_multi_sources(AURA_FILENAME, str(temp_dir))
     if not downloaded_zip_path:
         log.critical("下载 aura.zip 时发生错误, 安装进程终止。")
         return downloaded_core_path, None
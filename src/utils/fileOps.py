@@ -0,0 +1,252 @@
+"""
+文件系统操作工具
+"""
+
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+from loguru import logger as log
+from config.config import (
+    FILE_UNLOCK_TIMEOUT_SECONDS,
+    FILE_UNLOCK_INITIAL_DELAY_SECONDS,
+    FILE_UNLOCK_MAX_DELAY_SECONDS,
+)
+
+if os.name == "nt":
+    import ctypes
+    from ctypes import wintypes
+
+    _kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    _kernel32.CreateFileW.restype = wintypes.HANDLE
+    _kernel32.CreateFileW.argtypes = [
+        wintypes.LPCWSTR,
+        wintypes.DWORD,
+        wintypes.DWORD,
+        wintypes.LPVOID,
+        wintypes.DWORD,
+        wintypes.DWORD,
+        wintypes.HANDLE,
+    ]
+    _kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+
+    _GENERIC_READ = 0x80000000
+    _DELETE = 0x00010000
+    _OPEN_EXISTING = 3
+    _FILE_ATTRIBUTE_NORMAL = 0x80
+    _INVALID_HANDLE_VALUE = wintypes.HANDLE(-1).value
+    _ERROR_FILE_NOT_FOUND = 2
+    _ERROR_PATH_NOT_FOUND = 3
+    _ERROR_SHARING_VIOLATION = 32
+    _ERROR_LOCK_VIOLATION = 33
+
+
+class FileLockTimeout(TimeoutError):
+    """等待文件解除占用超时"""
+
+
+def remove_tree_in_background(path: Path) -> threading.Thread:
+    """
+    在后台线程中删除目录, 删除失败时仅记录日志
+
+    线程不是守护线程, 进程退出前会等待删除完成
+
+    Args:
+        path: 要删除的目录
+
+    Returns:
+        执行删除的线程
+    """
+
+    def remove():
+        try:
+            shutil.rmtree(path)
+            log.info(f"已删除 {path}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log.warning(f"删除 {path} 失败, 请手动删除: {e}")
+
+    thread = threading.Thread(target=remove, name="AuraRemoveTree")
+    thread.start()
+    return thread
+
+
+def swap_directory(staged_path: Path, target_path: Path, backup_path: Path) -> bool:
+    """
+    仅通过重命名将 staged_path 替换为 target_path, 三者须位于同一卷上
+
+    原有的 target_path 会被重命名为 backup_path; 若 backup_path 已存在 (上次安装残留),
+    先将其改名后在后台删除。将 staged_path 重命名失败时恢复原有的 target_path
+
+    Args:
+        staged_path: 已准备好的新目录
+        target_path: 目标目录
+        backup_path: 原目录的备份位置
+
+    Returns:
+        target_path 原本存在 (已移至 backup_path) 时返回 True
+
+    Raises:
+        OSError: 重命名失败
+    """
+    if backup_path.exists():
+        stale_path = backup_path.with_name(f"{backup_path.name}-{time.time_ns()}")
+        os.rename(backup_path, stale_path)
+        remove_tree_in_background(stale_path)
+
+    replaced = target_path.exists()
+    if replaced:
+        os.rename(target_path, backup_path)
+    try:
+        os.rename(staged_path, target_path)
+    except OSError:
+        if replaced:
+            os.rename(backup_path, target_path)
+        raise
+    return replaced
+
+
+def _retry_with_backoff(
+    attempt: Callable[[], Optional[OSError]], path: Path, timeout: float, action: str
+) -> float:
+    """
+    反复调用 attempt 直到其返回 None, 重试间隔按指数增长
+
+    Args:
+        attempt: 成功时返回 None, 文件被占用时返回对应的错误
+        path: 操作的文件, 用于日志
+        timeout: 最长等待秒数
+        action: 操作名称, 用于日志
+
+    Returns:
+        等待的秒数
+
+    Raises:
+        FileLockTimeout: 超过 timeout 后文件仍被占用
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    delay = FILE_UNLOCK_INITIAL_DELAY_SECONDS
+    while True:
+        error = attempt()
+        if error is None:
+            return time.monotonic() - start
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise FileLockTimeout(
+                f"{timeout:g} 秒内未能{action} {path}, 文件可能仍被占用: {error}"
+            )
+        log.debug(f"{path} 仍被占用, {min(delay, remaining):.2f} 秒后重试{action}: {error}")
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, FILE_UNLOCK_MAX_DELAY_SECONDS)
+
+
+def _open_exclusive(path: Path) -> Optional[OSError]:
+    """尝试以独占方式打开文件, 成功 (或文件不存在) 时返回 None, 被占用时返回对应的错误"""
+    if os.name == "nt":
+        # 共享模式为 0 且请求 DELETE 权限, 其他进程持有任何句柄时都会失败
+        handle = _kernel32.CreateFileW(
+            str(path),
+            _GENERIC_READ | _DELETE,
+            0,
+            None,
+            _OPEN_EXISTING,
+            _FILE_ATTRIBUTE_NORMAL,
+            None,
+        )
+        if handle == _INVALID_HANDLE_VALUE:
+            code = ctypes.get_last_error()
+            if code in (_ERROR_FILE_NOT_FOUND, _ERROR_PATH_NOT_FOUND):
+                return None
+            if code in (_ERROR_SHARING_VIOLATION, _ERROR_LOCK_VIOLATION):
+                return ctypes.WinError(code)
+            raise ctypes.WinError(code)
+        _kernel32.CloseHandle(handle)
+        return None
+
+    # 其他平台没有强制文件锁, 能打开即视为未被占用
+    try:
+        with open(path, "rb"):
+            return None
+    except FileNotFoundError:
+        return None
+    except PermissionError as e:
+        return e
+
+
+def wait_until_unlocked(path: Path, timeout: float = FILE_UNLOCK_TIMEOUT_SECONDS) -> float:
+    """
+    等待文件可被独占打开 (不再被其他进程占用), 文件不存在时立即返回
+
+    Args:
+        path: 要等待的文件
+        timeout: 最长等待秒数
+
+    Returns:
+        等待的秒数
+
+    Raises:
+        FileLockTimeout: 超过 timeout 后文件仍被占用
+    """
+    return _retry_with_backoff(lambda: _open_exclusive(path), path, timeout, "独占打开")
+
+
+def remove_file_when_unlocked(
+    path: Path, timeout: float = FILE_UNLOCK_TIMEOUT_SECONDS
+) -> float:
+    """
+    删除文件, 文件被占用时等待其解除占用后重试, 文件不存在时立即返回
+
+    Args:
+        path: 要删除的文件
+        timeout: 最长等待秒数
+
+    Returns:
+        等待的秒数
+
+    Raises:
+        FileLockTimeout: 超过 timeout 后文件仍被占用
+    """
+
+    def attempt() -> Optional[OSError]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except PermissionError as e:
+            return e
+        return None
+
+    return _retry_with_backoff(attempt, path, timeout, "删除")
+
+
+def replace_file_when_unlocked(
+    src: Path, dst: Path, timeout: float = FILE_UNLOCK_TIMEOUT_SECONDS
+) -> float:
+    """
+    将 src 重命名为 dst (覆盖已有的 dst), 任一文件被占用时等待其解除占用后重试, 二者须位于同一卷上
+
+    Args:
+        src: 源文件
+        dst: 目标文件
+        timeout: 最长等待秒数
+
+    Returns:
+        等待的秒数
+
+    Raises:
+        FileLockTimeout: 超过 timeout 后文件仍被占用
+        FileNotFoundError: src 不存在
+    """
+
+    def attempt() -> Optional[OSError]:
+        try:
+            os.replace(src, dst)
+        except PermissionError as e:
+            return e
+        return None
+
+    return _retry_with_backoff(attempt, src, timeout, "重命名")
@@ -0,0 +1,40 @@
+"""
+共享 HTTP 客户端
+版本查询、下载源测速与文件下载共用同一个连接池, 复用 keep-alive 连接,
+测速时建立到下载源的连接可以直接被随后的下载请求使用
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from config.config import HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE
+
+
+def _create_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=0,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def release(response: requests.Response):
+    """
+    读取并丢弃响应中剩余的数据后关闭, 使连接回到连接池
+
+    仅适用于剩余数据量很小的响应 (例如 Range 请求), 否则应直接调用 close()
+    """
+    try:
+        for _ in response.iter_content(chunk_size=64 * 1024):
+            pass
+    except requests.exceptions.RequestException:
+        pass
+    finally:
+        response.close()
+
+
+# 全局共享会话
+http_session = _create_session()
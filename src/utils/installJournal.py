@@ -0,0 +1,148 @@
+"""
+安装日志 (预写式)
+每完成一个步骤即将其结果与产物的 SHA-256 写入日志并落盘; 安装中断后再次运行时从最后完成的步骤继续,
+复用已下载的资源文件与已 Patch 的 ASAR, 也可据此撤销未完成的安装
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from loguru import logger as log
+from utils.artifactCache import sha256_of_file
+
+# 日志格式版本, 格式变化后旧日志不再使用
+JOURNAL_FORMAT = 1
+
+
+class InstallJournal:
+    """
+    一次安装的步骤记录
+
+    每个步骤的记录包含任意 JSON 数据与产物 (文件路径、大小与 SHA-256),
+    每次写入都先写临时文件并 fsync, 再替换原日志, 中断时日志始终完整
+    """
+
+    def __init__(
+        self, path: Path, version: str, steps: Optional[Dict[str, Dict[str, Any]]] = None
+    ):
+        """
+        Args:
+            path: 日志文件路径
+            version: 本次安装的版本 Tag 或本地文件路径
+            steps: 已完成的步骤记录
+        """
+        self.path = path
+        self.version = version
+        self.steps: Dict[str, Dict[str, Any]] = steps or {}
+        # 并发执行的步骤可能同时写入
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["InstallJournal"]:
+        """读取日志, 不存在或无法解析时返回 None"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") != JOURNAL_FORMAT:
+                log.warning(f"安装日志格式不受支持, 忽略: {path}")
+                return None
+            return cls(path, data["version"], data["steps"])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            log.warning(f"安装日志读取失败, 忽略: {e}")
+            return None
+
+    @classmethod
+    def create(cls, path: Path, version: str) -> "InstallJournal":
+        """新建日志并写入磁盘, 覆盖已有的日志"""
+        journal = cls(path, version)
+        journal._flush()
+        return journal
+
+    def _flush(self):
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"format": JOURNAL_FORMAT, "version": self.version, "steps": self.steps},
+                f,
+                indent=2,
+                ensure_ascii=False,
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def record(
+        self, step: str, artifacts: Optional[Dict[str, Path]] = None, **data: Any
+    ):
+        """
+        记录步骤已完成并立即落盘
+
+        Args:
+            step: 步骤名称
+            artifacts: 步骤的产物文件, 记录其路径、大小与 SHA-256 以便继续安装时校验
+            **data: 步骤的其他结果, 须可序列化为 JSON
+        """
+        entry = dict(data)
+        entry["artifacts"] = {
+            name: {
+                "path": str(path),
+                "size": path.stat().st_size,
+                "sha256": sha256_of_file(path),
+            }
+            for name, path in (artifacts or {}).items()
+        }
+        entry["time"] = time.time()
+        with self._lock:
+            self.steps[step] = entry
+            self._flush()
+        log.debug(f"安装日志已记录步骤 {step}")
+
+    def get(self, step: str) -> Optional[Dict[str, Any]]:
+        """返回步骤的记录, 未完成时返回 None"""
+        return self.steps.get(step)
+
+    @property
+    def last_step(self) -> Optional[str]:
+        """最后完成的步骤"""
+        return next(reversed(self.steps), None)
+
+    def artifact(self, step: str, name: str) -> Optional[Path]:
+        """
+        返回步骤记录的产物路径, 文件已不存在或内容与记录不符时返回 None
+
+        Args:
+            step: 步骤名称
+            name: 产物名称
+        """
+        entry = (self.steps.get(step) or {}).get("artifacts", {}).get(name)
+        if not entry:
+            return None
+        path = Path(entry["path"])
+        try:
+            if path.stat().st_size == entry["size"] and sha256_of_file(path) == entry["sha256"]:
+                return path
+        except OSError:
+            pass
+        log.warning(f"安装日志中记录的 {path} 已不存在或已变化, 无法复用")
+        return None
+
+    def artifact_paths(self) -> List[Path]:
+        """全部步骤记录的产物路径"""
+        return [
+            Path(entry["path"])
+            for record in self.steps.values()
+            for entry in record.get("artifacts", {}).values()
+        ]
+
+    def discard(self):
+        """安装完成或回滚后删除日志"""
+        for path in (self.path, self.path.with_name(self.path.name + ".tmp")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,156 @@
+"""
+下载源评分缓存
+持久化记录各下载源的 EWMA 吞吐量 / 延迟、连续失败次数与最近成功时间,
+使安装器启动时可直接按历史数据排序, 仅对过期或未知的下载源重新测速
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from loguru import logger as log
+from config.config import (
+    CACHE_DIR,
+    MIRROR_STATS_FILENAME,
+    MIRROR_STATS_TTL_SECONDS,
+    MIRROR_STATS_EWMA_ALPHA,
+    MIRROR_SCORE_REFERENCE_SIZE,
+)
+
+
+def mirror_score(latency: float, throughput: float) -> float:
+    """
+    下载源评分: 首字节延迟 + 按吞吐量下载 MIRROR_SCORE_REFERENCE_SIZE 所需的时间 (秒), 越低越好
+    """
+    if throughput <= 0:
+        return latency
+    return latency + MIRROR_SCORE_REFERENCE_SIZE / throughput
+
+
+def _ewma(previous: Optional[float], sample: float) -> float:
+    if previous is None:
+        return sample
+    return MIRROR_STATS_EWMA_ALPHA * sample + (1 - MIRROR_STATS_EWMA_ALPHA) * previous
+
+
+class MirrorStatsStore:
+    """下载源评分缓存"""
+
+    def __init__(self, stats_file: Path):
+        """
+        Args:
+            stats_file: 持久化 JSON 文件路径
+        """
+        self.stats_file = stats_file
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.stats_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            log.warning(f"下载源评分缓存读取失败, 将重新测速: {e}")
+            return {}
+
+    def _save(self):
+        try:
+            self.stats_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.stats_file.with_name(self.stats_file.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._stats, f, indent=2)
+            os.replace(tmp_path, self.stats_file)
+        except OSError as e:
+            log.warning(f"下载源评分缓存写入失败: {e}")
+
+    def record_success(
+        self, base_url: str, latency: Optional[float], throughput: float
+    ):
+        """
+        记录一次成功的测速或下载
+
+        Args:
+            base_url: 下载源地址
+            latency: 首字节延迟 (秒), 未知时为 None
+            throughput: 吞吐量 (字节 / 秒)
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._stats.setdefault(base_url, {})
+            if latency is not None:
+                entry["latency"] = _ewma(entry.get("latency"), latency)
+            if throughput > 0:
+                entry["throughput"] = _ewma(entry.get("throughput"), throughput)
+            entry["failures"] = 0
+            entry["last_success"] = now
+            entry["last_probe"] = now
+            self._save()
+
+    def record_failure(self, base_url: str):
+        """记录一次失败的测速或下载"""
+        with self._lock:
+            entry = self._stats.setdefault(base_url, {})
+            entry["failures"] = entry.get("failures", 0) + 1
+            entry["last_probe"] = time.time()
+            self._save()
+
+    def score(self, base_url: str) -> Optional[float]:
+        """返回下载源的缓存评分, 无有效数据时返回 None"""
+        entry = self._stats.get(base_url)
+        if not entry or entry.get("failures", 0) or "latency" not in entry:
+            return None
+        return mirror_score(entry["latency"], entry.get("throughput", 0.0))
+
+    def is_stale(self, base_url: str) -> bool:
+        entry = self._stats.get(base_url)
+        if not entry:
+            return True
+        return time.time() - entry.get("last_probe", 0) > MIRROR_STATS_TTL_SECONDS
+
+    def stale_urls(self, urls: List[str]) -> List[str]:
+        """返回需要重新测速的下载源 (未知或数据已过期)"""
+        with self._lock:
+            return [url for url in urls if self.is_stale(url)]
+
+    def has_fresh_ranking(self, urls: List[str]) -> bool:
+        """是否至少有一个下载源拥有未过期的可用评分"""
+        with self._lock:
+            return any(
+                self.score(url) is not None and not self.is_stale(url) for url in urls
+            )
+
+    def rank(self, urls: List[str]) -> List[str]:
+        """
+        按缓存数据排序下载源
+
+        顺序: 有可用评分的下载源 (按评分) > 未知下载源 (保持原顺序) > 失败过的下载源 (按失败次数)
+        """
+        with self._lock:
+            scored = []
+            unknown = []
+            failed = []
+            for index, url in enumerate(urls):
+                entry = self._stats.get(url)
+                url_score = self.score(url)
+                if url_score is not None:
+                    scored.append((url_score, index, url))
+                elif entry and entry.get("failures", 0):
+                    failed.append((entry["failures"], index, url))
+                else:
+                    unknown.append(url)
+            scored.sort()
+            failed.sort()
+            return (
+                [url for _, _, url in scored]
+                + unknown
+                + [url for _, _, url in failed]
+            )
+
+
+# 全局下载源评分缓存实例
+mirror_stats = MirrorStatsStore(Path(CACHE_DIR) / MIRROR_STATS_FILENAME)
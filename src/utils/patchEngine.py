@@ -0,0 +1,172 @@
+"""
+文本补丁引擎
+补丁规则以数据声明 (锚点、插入内容与预期命中次数), 所有锚点合并为一个正则一次扫描完成匹配,
+输出由切片拼接一次生成; 校验结果按输入内容的哈希缓存, 已验证过的版本无需再次校验
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+from loguru import logger as log
+from config.config import CACHE_DIR, PATCH_VERDICTS_FILENAME
+
+
+class PatchRule(NamedTuple):
+    """
+    一条补丁规则: 在每处 anchor 前插入 before, 后插入 after
+
+    expected_hits 为预期命中次数, 为 None 时不限制
+    """
+
+    name: str
+    anchor: str
+    before: str = ""
+    after: str = ""
+    expected_hits: Optional[int] = 1
+
+
+class PatchRuleError(Exception):
+    """补丁规则的命中次数与预期不符"""
+
+
+class PatchResult(NamedTuple):
+    content: str
+    hits: Dict[str, int]
+
+
+class PatchEngine:
+    """按一组规则修改文本, 规则的锚点之间不应互相包含"""
+
+    def __init__(self, rules: List[PatchRule], prefix: str = ""):
+        """
+        Args:
+            rules: 补丁规则
+            prefix: 插入到文本开头的内容
+        """
+        self.rules = rules
+        self.prefix = prefix
+        self._pattern = re.compile(
+            "|".join(f"({re.escape(rule.anchor)})" for rule in rules)
+        )
+        # 规则变化后, 之前缓存的校验结果不再适用
+        self.fingerprint = hashlib.sha256(
+            json.dumps([prefix, rules], ensure_ascii=False).encode("utf-8")
+        ).hexdigest()[:16]
+
+    def apply(self, content: str) -> PatchResult:
+        """一次扫描应用全部规则, 返回修改后的文本与各规则的命中次数"""
+        pieces = [self.prefix]
+        hits = [0] * len(self.rules)
+        last = 0
+        for match in self._pattern.finditer(content):
+            index = match.lastindex - 1
+            rule = self.rules[index]
+            pieces += [content[last : match.start()], rule.before, match.group(), rule.after]
+            last = match.end()
+            hits[index] += 1
+        pieces.append(content[last:])
+        return PatchResult(
+            "".join(pieces), {rule.name: count for rule, count in zip(self.rules, hits)}
+        )
+
+    def validate(self, hits: Dict[str, int]):
+        """
+        检查各规则的命中次数
+
+        Raises:
+            PatchRuleError: 存在命中次数与预期不符的规则
+        """
+        mismatches = [
+            f"{rule.name} (锚点 {rule.anchor!r} 命中 {hits[rule.name]} 次, 预期 {rule.expected_hits} 次)"
+            for rule in self.rules
+            if rule.expected_hits is not None and hits[rule.name] != rule.expected_hits
+        ]
+        if mismatches:
+            raise PatchRuleError("补丁规则命中次数异常: " + "; ".join(mismatches))
+
+
+class PatchVerdictStore:
+    """补丁校验结果缓存, 以 "<输入内容 SHA-256>/<规则指纹>" 为键"""
+
+    def __init__(self, verdicts_file: Path):
+        self.verdicts_file = verdicts_file
+        self._lock = threading.Lock()
+        self._verdicts: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.verdicts_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            log.warning(f"补丁校验缓存读取失败: {e}")
+            return {}
+
+    def _save(self):
+        try:
+            self.verdicts_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.verdicts_file.with_name(self.verdicts_file.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._verdicts, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.verdicts_file)
+        except OSError as e:
+            log.warning(f"补丁校验缓存写入失败: {e}")
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            return self._verdicts.get(key)
+
+    def put(self, key: str, verdict: Dict):
+        with self._lock:
+            self._verdicts[key] = verdict
+            self._save()
+
+
+def patch_with_verdict(engine: PatchEngine, content: str, label: str) -> str:
+    """
+    应用补丁并校验命中次数, 同一内容与规则的校验结果会被缓存
+
+    已知通过校验的内容跳过校验, 已知未通过的内容直接报错
+
+    Args:
+        engine: 补丁引擎
+        content: 原始文本
+        label: 日志中显示的文件名
+
+    Returns:
+        修改后的文本
+
+    Raises:
+        PatchRuleError: 命中次数与预期不符
+    """
+    key = f"{hashlib.sha256(content.encode('utf-8')).hexdigest()}/{engine.fingerprint}"
+    verdict = patch_verdicts.get(key)
+    if verdict is not None and not verdict.get("ok"):
+        raise PatchRuleError(verdict.get("detail", f"{label} 已知无法应用补丁"))
+
+    result = engine.apply(content)
+    log.info(
+        f"{label} 补丁命中次数: "
+        + ", ".join(f"{name} {count}" for name, count in result.hits.items())
+    )
+    if verdict is not None:
+        log.info(f"该版本的 {label} 已通过校验, 跳过校验")
+        return result.content
+
+    try:
+        engine.validate(result.hits)
+    except PatchRuleError as e:
+        patch_verdicts.put(key, {"ok": False, "detail": str(e), "hits": result.hits})
+        raise
+    patch_verdicts.put(key, {"ok": True, "hits": result.hits})
+    return result.content
+
+
+# 全局补丁校验缓存
+patch_verdicts = PatchVerdictStore(Path(CACHE_DIR) / PATCH_VERDICTS_FILENAME)
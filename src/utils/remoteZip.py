@@ -0,0 +1,244 @@
+"""
+远程 ZIP 读取
+通过 HTTP Range 请求读取远程 ZIP 文件的中央目录, 并仅下载指定条目的数据
+"""
+
+import struct
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import requests
+from config.config import (
+    DOWNLOAD_CHUNK_SIZE,
+    DOWNLOAD_TIMEOUT_SECONDS,
+    DOWNLOAD_STALL_WINDOW_SECONDS,
+)
+from utils.httpClient import http_session
+
+_EOCD_SIGNATURE = b"PK\x05\x06"
+_EOCD_SIZE = 22
+_ZIP64_LOCATOR_SIGNATURE = b"PK\x06\x07"
+_ZIP64_LOCATOR_SIZE = 20
+_ZIP64_EOCD_SIGNATURE = b"PK\x06\x06"
+_ZIP64_EOCD_SIZE = 56
+_MAX_COMMENT_SIZE = 0xFFFF
+
+
+class RemoteZipError(Exception):
+    """远程 ZIP 文件结构异常, 或下载源未按 Range 返回数据"""
+
+
+def coalesce_ranges(
+    ranges: Iterable[Tuple[int, int]], max_gap: int
+) -> List[Tuple[int, int]]:
+    """
+    合并重叠或间隔不超过 max_gap 字节的区间 (闭区间)
+
+    Args:
+        ranges: (起始位置, 结束位置) 列表
+        max_gap: 允许合并的最大间隔, 间隔内的数据会被一并下载
+
+    Returns:
+        按起始位置排序的合并后区间
+    """
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start - merged[-1][1] - 1 <= max_gap:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class RemoteZip:
+    """
+    在本地重建远程 ZIP 文件
+
+    本地文件与远程文件大小一致, 仅写入中央目录与通过 fetch_ranges 下载的区间, 其余部分为空,
+    因此 zipfile 与 extract_parallel 可以直接读取中央目录与已下载的条目
+    """
+
+    def __init__(
+        self,
+        url: str,
+        total_size: int,
+        local_path: Path,
+        headers: Optional[Dict[str, str]] = None,
+        if_range: Optional[str] = None,
+    ):
+        self.url = url
+        self.total_size = total_size
+        self.local_path = local_path
+        self.headers = headers or {}
+        self.if_range = if_range
+        self.central_directory_offset = 0
+        self.infos: List[zipfile.ZipInfo] = []
+
+    def _open_range(self, start: int, end: int) -> requests.Response:
+        headers = {**self.headers, "Range": f"bytes={start}-{end}"}
+        if self.if_range:
+            headers["If-Range"] = self.if_range
+        r = http_session.get(
+            self.url,
+            stream=True,
+            timeout=(DOWNLOAD_TIMEOUT_SECONDS, DOWNLOAD_STALL_WINDOW_SECONDS),
+            headers=headers,
+        )
+        try:
+            r.raise_for_status()
+            content_range = r.headers.get("Content-Range", "")
+            if r.status_code != 206 or not content_range.startswith(
+                f"bytes {start}-"
+            ):
+                raise RemoteZipError(
+                    f"下载源未按 Range 返回数据 (HTTP {r.status_code} {content_range})"
+                )
+        except BaseException:
+            r.close()
+            raise
+        return r
+
+    def _fetch(self, start: int, end: int) -> bytes:
+        with self._open_range(start, end) as r:
+            data = r.content
+        if len(data) != end - start + 1:
+            raise RemoteZipError(
+                f"区间 {start}-{end} 应为 {end - start + 1} 字节, 实际收到 {len(data)} 字节"
+            )
+        return data
+
+    def _write(self, offset: int, data: bytes):
+        with open(self.local_path, "r+b") as f:
+            f.seek(offset)
+            f.write(data)
+
+    def load_central_directory(self) -> List[zipfile.ZipInfo]:
+        """
+        下载文件末尾的 EOCD 与中央目录, 写入本地文件后解析
+
+        Returns:
+            所有条目的 ZipInfo
+
+        Raises:
+            RemoteZipError: 未找到 EOCD 或中央目录位置异常
+            requests.exceptions.RequestException: 网络错误
+        """
+        tail_size = min(
+            self.total_size, _EOCD_SIZE + _MAX_COMMENT_SIZE + _ZIP64_LOCATOR_SIZE
+        )
+        tail_start = self.total_size - tail_size
+        tail = self._fetch(tail_start, self.total_size - 1)
+        eocd_pos = tail.rfind(_EOCD_SIGNATURE, 0, len(tail) - _EOCD_SIZE + 4)
+        if eocd_pos < 0:
+            raise RemoteZipError("未找到 ZIP 中央目录结束标记")
+        _, _, _, _, entry_count, cd_size, cd_offset, _ = struct.unpack(
+            "<4s4H2LH", tail[eocd_pos : eocd_pos + _EOCD_SIZE]
+        )
+
+        with open(self.local_path, "wb") as f:
+            f.truncate(self.total_size)
+
+        if 0xFFFFFFFF in (cd_size, cd_offset) or entry_count == 0xFFFF:
+            locator_pos = eocd_pos - _ZIP64_LOCATOR_SIZE
+            if (
+                locator_pos < 0
+                or tail[locator_pos : locator_pos + 4] != _ZIP64_LOCATOR_SIGNATURE
+            ):
+                raise RemoteZipError("未找到 ZIP64 中央目录结束记录定位符")
+            _, _, zip64_offset, _ = struct.unpack(
+                "<4sLQL", tail[locator_pos : locator_pos + _ZIP64_LOCATOR_SIZE]
+            )
+            record = self._fetch(zip64_offset, zip64_offset + _ZIP64_EOCD_SIZE - 1)
+            if record[:4] != _ZIP64_EOCD_SIGNATURE:
+                raise RemoteZipError("ZIP64 中央目录结束记录无效")
+            cd_size, cd_offset = struct.unpack("<2Q", record[40:56])
+            self._write(zip64_offset, record)
+
+        cd_end = cd_offset + cd_size
+        if cd_end > self.total_size:
+            raise RemoteZipError("中央目录超出文件范围")
+        # 中央目录通常紧邻文件末尾, 已包含在 tail 中的部分无需再次请求
+        if cd_offset < tail_start:
+            self._write(cd_offset, self._fetch(cd_offset, min(cd_end, tail_start) - 1))
+        self._write(tail_start, tail)
+
+        with zipfile.ZipFile(self.local_path, "r") as zf:
+            self.infos = zf.infolist()
+        self.central_directory_offset = cd_offset
+        return self.infos
+
+    def entry_ranges(self, names: Iterable[str]) -> List[Tuple[int, int]]:
+        """
+        返回指定条目在远程文件中的字节区间 (闭区间)
+
+        区间从本地文件头开始, 到下一个条目的本地文件头 (或中央目录) 之前结束,
+        包含文件名、扩展字段、压缩数据与数据描述符
+        """
+        offsets = sorted(
+            {info.header_offset for info in self.infos}
+            | {self.central_directory_offset}
+        )
+        next_offset = dict(zip(offsets, offsets[1:]))
+        by_name = {info.filename: info for info in self.infos}
+        return [
+            (
+                by_name[name].header_offset,
+                next_offset[by_name[name].header_offset] - 1,
+            )
+            for name in names
+        ]
+
+    def fetch_ranges(
+        self,
+        ranges: List[Tuple[int, int]],
+        max_workers: int = 1,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> int:
+        """
+        下载指定区间并写入本地文件的对应位置
+
+        Args:
+            ranges: 已合并的区间列表
+            max_workers: 同时进行的 Range 请求数
+            progress_callback: 进度回调 (已下载字节数, 总字节数)
+
+        Returns:
+            下载的总字节数
+        """
+        total = sum(end - start + 1 for start, end in ranges)
+        downloaded = 0
+        lock = threading.Lock()
+
+        def fetch(start: int, end: int):
+            nonlocal downloaded
+            position = start
+            with self._open_range(start, end) as r, open(
+                self.local_path, "r+b"
+            ) as f:
+                f.seek(start)
+                for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if not chunk:
+                        continue
+                    if position + len(chunk) > end + 1:
+                        raise RemoteZipError(f"区间 {start}-{end} 返回的数据过多")
+                    f.write(chunk)
+                    position += len(chunk)
+                    with lock:
+                        downloaded += len(chunk)
+                        if progress_callback:
+                            progress_callback(downloaded, total)
+            if position != end + 1:
+                raise RemoteZipError(
+                    f"区间 {start}-{end} 仅收到 {position - start} 字节"
+                )
+
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(ranges))),
+            thread_name_prefix="AuraRemoteZip",
+        ) as pool:
+            futures = [pool.submit(fetch, start, end) for start, end in ranges]
+            for future in futures:
+                future.result()
+        return total
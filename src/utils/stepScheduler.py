@@ -0,0 +1,171 @@
+"""
+安装步骤调度
+安装流程由声明了输入与输出的步骤组成, 调度器按依赖关系并发执行已就绪的步骤,
+并按各步骤的权重将完成情况换算为 0 - 100 的总进度
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from utils.tracer import tracer
+
+# 可能等待用户输入的步骤持有该锁, 避免多个步骤的提示交错显示
+console_lock = threading.Lock()
+
+
+class Step(NamedTuple):
+    """
+    安装步骤
+
+    func 接收包含全部已产出结果的字典, 返回包含 outputs 中各键的字典 (无输出时可返回 None)
+    """
+
+    name: str
+    title: str
+    func: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    weight: float = 10
+    interactive: bool = False
+
+
+class StepScheduler:
+    """按依赖关系并发执行安装步骤"""
+
+    def __init__(
+        self,
+        steps: List[Step],
+        progress_callback: Optional[Callable[[float, str], None]] = None,
+        max_workers: int = 4,
+    ):
+        """
+        Args:
+            steps: 全部步骤, 每个输入必须由唯一的步骤产出 (或在 run 的 initial 中提供)
+            progress_callback: 步骤开始时在调度线程中调用, 参数为 (总进度, 步骤标题),
+                回调抛出的异常会中止调度; 步骤通过 report_progress 报告的进度在步骤所在线程中调用
+            max_workers: 同时执行的步骤数上限
+        """
+        self.steps = steps
+        self.progress_callback = progress_callback
+        self.max_workers = max_workers
+        self._total_weight = sum(step.weight for step in steps) or 1
+        self._done_weight = 0.0
+        # 正在执行的步骤已完成的比例
+        self._fractions: Dict[str, float] = {}
+        self._progress_lock = threading.Lock()
+        self._producers: Dict[str, str] = {}
+        for step in steps:
+            for key in step.outputs:
+                if key in self._producers:
+                    raise ValueError(
+                        f"{key} 同时由 {self._producers[key]} 与 {step.name} 产出"
+                    )
+                self._producers[key] = step.name
+
+    def _overall_progress(self) -> float:
+        weights = {step.name: step.weight for step in self.steps}
+        with self._progress_lock:
+            done = self._done_weight + sum(
+                weights[name] * fraction for name, fraction in self._fractions.items()
+            )
+        return round(done / self._total_weight * 100, 2)
+
+    def report_progress(self, name: str, fraction: float, title: str):
+        """
+        报告正在执行的步骤的完成比例, 按该步骤的权重换算为总进度后调用 progress_callback;
+        步骤未在执行时 (例如在其他步骤中提前完成的工作) 仅更新进度说明
+
+        Args:
+            name: 步骤名称
+            fraction: 步骤的完成比例, 0 - 1
+            title: 进度说明
+        """
+        with self._progress_lock:
+            if name in self._fractions:
+                self._fractions[name] = min(max(fraction, 0.0), 1.0)
+        if self.progress_callback:
+            self.progress_callback(self._overall_progress(), title)
+
+    def _run_step(self, step: Step, context: Dict[str, Any]) -> Dict[str, Any]:
+        with tracer.span(step.name, title=step.title):
+            if step.interactive:
+                with console_lock:
+                    result = step.func(context)
+            else:
+                result = step.func(context)
+        result = result or {}
+        missing = [key for key in step.outputs if key not in result]
+        if missing:
+            raise RuntimeError(f"步骤 {step.name} 未产出 {', '.join(missing)}")
+        return result
+
+    def run(self, initial: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        执行全部步骤
+
+        任一步骤失败后不再启动新的步骤, 等待正在执行的步骤结束后抛出最先发生的异常
+
+        Args:
+            initial: 初始结果, 可作为步骤的输入
+
+        Returns:
+            包含全部步骤输出的字典
+        """
+        context: Dict[str, Any] = dict(initial or {})
+        for step in self.steps:
+            for key in step.inputs:
+                if key not in context and key not in self._producers:
+                    raise ValueError(f"步骤 {step.name} 的输入 {key} 没有产出者")
+
+        self._done_weight = 0.0
+        self._fractions.clear()
+        pending = list(self.steps)
+        running = {}
+        error: Optional[BaseException] = None
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="AuraStep"
+        ) as pool:
+            try:
+                while pending or running:
+                    if error is None:
+                        for step in [
+                            step
+                            for step in pending
+                            if all(key in context for key in step.inputs)
+                        ]:
+                            pending.remove(step)
+                            if self.progress_callback:
+                                self.progress_callback(self._overall_progress(), step.title)
+                            with self._progress_lock:
+                                self._fractions[step.name] = 0.0
+                            # 上下文的副本, 避免与其他步骤的输出合并时互相影响
+                            running[pool.submit(self._run_step, step, dict(context))] = step
+                    if not running:
+                        if pending and error is None:
+                            raise RuntimeError(
+                                f"步骤之间存在循环依赖: {', '.join(step.name for step in pending)}"
+                            )
+                        break
+
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        step = running.pop(future)
+                        with self._progress_lock:
+                            self._fractions.pop(step.name, None)
+                        try:
+                            context.update(future.result())
+                            with self._progress_lock:
+                                self._done_weight += step.weight
+                        except BaseException as e:
+                            if error is None:
+                                error = e
+            except BaseException as e:
+                # 进度回调中止 (例如用户取消) 时, 等待已启动的步骤结束
+                if error is None:
+                    error = e
+                wait(running)
+
+        if error is not None:
+            raise error
+        return context
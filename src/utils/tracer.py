@@ -0,0 +1,162 @@
+"""
+耗时追踪
+以 span 记录各步骤的开始与结束时间、所在线程与属性 (字节数、下载源、文件数等),
+可导出为 Chrome trace_event 格式, 在 Perfetto 或 chrome://tracing 中查看各步骤的重叠与空隙;
+未启用时 span 不做任何记录
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from loguru import logger as log
+
+
+class Span:
+    """一段耗时记录, 时间单位为纳秒 (相对于 Tracer 创建的时刻)"""
+
+    __slots__ = ("name", "start", "end", "thread_id", "thread_name", "attrs")
+
+    def __init__(self, name: str, start: int, attrs: Dict[str, Any]):
+        thread = threading.current_thread()
+        self.name = name
+        self.start = start
+        self.end: Optional[int] = None
+        self.thread_id = thread.native_id or thread.ident
+        self.thread_name = thread.name
+        self.attrs = attrs
+
+    def set(self, **attrs: Any):
+        """设置属性"""
+        self.attrs.update(attrs)
+
+
+class _NullSpan:
+    """追踪未启用时使用的空 span"""
+
+    __slots__ = ()
+
+    def set(self, **attrs: Any):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """收集 span 并导出为 Chrome trace_event 格式"""
+
+    def __init__(self):
+        self.enabled = False
+        self._origin = time.perf_counter_ns()
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+        # 每个线程当前打开的 span, 供 annotate 使用
+        self._local = threading.local()
+
+    def enable(self):
+        """开始记录 span"""
+        self.enabled = True
+
+    def _now(self) -> int:
+        return time.perf_counter_ns() - self._origin
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Span | _NullSpan]:
+        """
+        记录代码块的耗时, 代码块抛出异常时在属性中记录异常
+
+        Args:
+            name: span 名称
+            **attrs: 初始属性
+        """
+        if not self.enabled:
+            yield _NULL_SPAN
+            return
+        span = Span(name, self._now(), attrs)
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attrs["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end = self._now()
+            stack.pop()
+            with self._lock:
+                self._spans.append(span)
+
+    def annotate(self, **attrs: Any):
+        """为当前线程最内层的 span 设置属性, 没有打开的 span 时忽略"""
+        if not self.enabled:
+            return
+        stack = self._local.__dict__.get("stack")
+        if stack:
+            stack[-1].set(**attrs)
+
+    def export_chrome_trace(self, path: Path):
+        """
+        将已记录的 span 写入 Chrome trace_event 格式的 JSON 文件
+
+        Args:
+            path: 输出文件路径
+        """
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self._spans)
+        events: List[Dict[str, Any]] = []
+        thread_names: Dict[int, str] = {}
+        for span in sorted(spans, key=lambda span: span.start):
+            thread_names.setdefault(span.thread_id, span.thread_name)
+            events.append(
+                {
+                    "name": span.name,
+                    "ph": "X",
+                    "ts": span.start / 1000,
+                    "dur": (span.end - span.start) / 1000,
+                    "pid": pid,
+                    "tid": span.thread_id,
+                    "args": {key: _json_safe(value) for key, value in span.attrs.items()},
+                }
+            )
+        events += [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in thread_names.items()
+        ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False
+            )
+        log.info(f"已写入 {len(spans)} 个 span 到 {path}")
+
+
+def _json_safe(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def traced(name: str) -> Callable:
+    """装饰器: 以 span 记录函数的每次调用, 函数内可通过 tracer.annotate 设置属性"""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# 全局追踪器
+tracer = Tracer()
@@ -0,0 +1,219 @@
+"""
+增量升级规划
+对比已安装的 aura 文件夹与目标 aura.zip 的中央目录, 仅解压有变化的文件,
+并依据安装清单判断 ASAR 是否需要重新 Patch
+"""
+
+import json
+import os
+import shutil
+import zipfile
+import zlib
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+from loguru import logger as log
+from config.config import (
+    AURA_MANIFEST_FILENAME,
+    TARGET_ASAR_NAME,
+    UNZIP_MAX_WORKERS,
+)
+from utils.zipExtractor import extract_parallel, member_relpath
+
+
+class UpgradePlan(NamedTuple):
+    """
+    增量升级计划, 各列表中为相对于 aura 文件夹的路径 (以 "/" 分隔)
+
+    add / replace 为需要从 ZIP 中解压的文件, delete 为需要删除的文件,
+    untouched 为内容一致、可直接沿用的文件; entries 为路径到 ZIP 条目的映射
+    """
+
+    add: List[str]
+    replace: List[str]
+    delete: List[str]
+    untouched: List[str]
+    entries: Dict[str, zipfile.ZipInfo]
+
+    @property
+    def changed_bytes(self) -> int:
+        return sum(self.entries[path].file_size for path in self.add + self.replace)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(info.file_size for info in self.entries.values())
+
+
+def file_stamp(path: Path) -> List[int]:
+    """返回文件的 [大小, 修改时间 (纳秒)]"""
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _crc32_of_file(path: Path, chunk_size: int = 1024 * 1024) -> int:
+    crc = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def _scan_tree(root: Path) -> Dict[str, os.stat_result]:
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = Path(dirpath) / filename
+            files[path.relative_to(root).as_posix()] = path.stat()
+    return files
+
+
+def load_install_manifest(install_dir: Path) -> Optional[Dict]:
+    """读取上次安装记录的清单, 不存在或已损坏时返回 None"""
+    manifest_path = install_dir / AURA_MANIFEST_FILENAME
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        log.warning(f"安装清单 {manifest_path} 读取失败, 将完整比对文件: {e}")
+        return None
+
+
+def save_install_manifest(install_dir: Path, manifest: Dict):
+    manifest_path = install_dir / AURA_MANIFEST_FILENAME
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+
+
+def snapshot_aura_files(aura_dir: Path, zip_path: Path) -> Dict[str, List[int]]:
+    """
+    记录已安装文件的 [大小, 修改时间, CRC32], CRC32 取自 ZIP 中央目录, 无需读取文件内容
+
+    Args:
+        aura_dir: 已安装的 aura 文件夹
+        zip_path: 安装所用的 aura.zip
+
+    Returns:
+        相对路径到 [大小, 修改时间 (纳秒), CRC32] 的映射
+    """
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        crcs = {
+            relpath: info.CRC
+            for info in zf.infolist()
+            if not info.is_dir() and (relpath := member_relpath(info.filename))
+        }
+    files = {}
+    for relpath, stat in _scan_tree(aura_dir).items():
+        if relpath in crcs:
+            files[relpath] = [stat.st_size, stat.st_mtime_ns, crcs[relpath]]
+    return files
+
+
+def plan_upgrade(
+    zip_path: Path, installed_dir: Path, recorded_files: Optional[Dict] = None
+) -> UpgradePlan:
+    """
+    对比已安装的文件与 ZIP 中央目录, 生成增量升级计划
+
+    大小不同的文件直接判定为需要替换; 大小相同时, 若大小与修改时间与安装清单中的记录一致,
+    沿用记录的 CRC32, 否则读取文件计算 CRC32
+
+    Args:
+        zip_path: 目标版本的 aura.zip
+        installed_dir: 已安装的 aura 文件夹
+        recorded_files: 安装清单中记录的文件信息
+
+    Returns:
+        UpgradePlan
+    """
+    recorded_files = recorded_files or {}
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        entries = {
+            relpath: info
+            for info in zf.infolist()
+            if not info.is_dir() and (relpath := member_relpath(info.filename))
+        }
+    installed = _scan_tree(installed_dir)
+
+    add, replace, untouched = [], [], []
+    hashed = 0
+    for relpath, info in entries.items():
+        stat = installed.get(relpath)
+        if stat is None:
+            add.append(relpath)
+            continue
+        if stat.st_size != info.file_size:
+            replace.append(relpath)
+            continue
+        record = recorded_files.get(relpath)
+        if record and record[:2] == [stat.st_size, stat.st_mtime_ns]:
+            crc = record[2]
+        else:
+            crc = _crc32_of_file(installed_dir / relpath)
+            hashed += 1
+        (untouched if crc == info.CRC else replace).append(relpath)
+
+    delete = sorted(set(installed) - set(entries))
+    if hashed:
+        log.info(f"有 {hashed} 个文件缺少可用的安装记录, 已读取文件内容比对")
+    return UpgradePlan(add, replace, delete, untouched, entries)
+
+
+def apply_upgrade_plan(
+    plan: UpgradePlan, zip_path: Path, installed_dir: Path, staging_dir: Path
+) -> int:
+    """
+    按计划构建新的 aura 文件夹: 沿用的文件从已安装目录硬链接 (不支持时复制) 到暂存目录,
+    新增与替换的文件从 ZIP 中解压, 需删除的文件不会出现在暂存目录中
+
+    Returns:
+        从 ZIP 中解压的文件数量
+    """
+    if staging_dir.exists():
+        shutil.rmtree(staging_dir)
+    staging_dir.mkdir(parents=True)
+
+    for relpath in plan.untouched:
+        source = installed_dir / relpath
+        target = staging_dir / relpath
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+
+    members = {plan.entries[relpath].filename for relpath in plan.add + plan.replace}
+    return extract_parallel(
+        zip_path, staging_dir, max_workers=UNZIP_MAX_WORKERS, members=members
+    )
+
+
+def asar_patch_required(
+    manifest: Optional[Dict], install_dir: Path, core_sha256: str, patch_fingerprint: str
+) -> bool:
+    """
+    判断 ASAR 是否需要重新 Patch
+
+    上次安装使用的 core.zip、补丁规则均未变化, 且原始 ASAR 备份与已 Patch 的 ASAR
+    的大小与修改时间均与安装清单中的记录一致时, 无需重新 Patch
+    """
+    if (
+        not manifest
+        or manifest.get("patch_fingerprint") != patch_fingerprint
+        or manifest.get("core_sha256") != core_sha256
+    ):
+        return True
+    for filename, key in (
+        (TARGET_ASAR_NAME, "patched_asar"),
+        (f"{TARGET_ASAR_NAME}.bak", "source_asar"),
+    ):
+        path = install_dir / filename
+        if (
+            not manifest.get(key)
+            or not path.exists()
+            or file_stamp(path) != manifest[key]
+        ):
+            return True
+    return False
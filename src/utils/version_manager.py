@@ -7,8 +7,17 @@ import json
 import os
 import requests
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
 from loguru import logger as log
+from config.config import MUTABLE_RELEASE_TAGS
+from utils.httpClient import http_session
+
+
+class AssetDigest(NamedTuple):
+    """资源文件的预期大小与 SHA-256"""
+
+    size: int
+    sha256: str
 
 
 class VersionManager:
@@ -89,7 +98,7 @@ class VersionManager:
         try:
             # 获取所有releases
             releases_url = f"{self.api_base}/releases"
-            response = requests.get(releases_url, timeout=self.timeout)
+            response = http_session.get(releases_url, timeout=self.timeout)
             response.raise_for_status()
             
             releases_data = response.json()
@@ -167,6 +176,66 @@ class VersionManager:
             
         return None
     
+    def _parse_asset_digests(self, assets: List[Dict]) -> Dict[str, AssetDigest]:
+        """
+        从资源文件列表中提取各文件的大小与 SHA-256
+
+        Args:
+            assets: GitHub API 返回的 assets (digest 字段形如 "sha256:<hex>"),
+                或 versions.json 中的 assets (sha256 字段)
+
+        Returns:
+            文件名到 AssetDigest 的映射, 缺少校验信息的文件不包含在内
+        """
+        digests = {}
+        for asset in assets:
+            sha256 = asset.get("sha256")
+            digest = asset.get("digest") or ""
+            if not sha256 and digest.startswith("sha256:"):
+                sha256 = digest.split(":", 1)[1]
+            if sha256 and asset.get("size"):
+                digests[asset["name"]] = AssetDigest(int(asset["size"]), sha256.lower())
+        return digests
+
+    def get_asset_digests(self, tag: str) -> Dict[str, AssetDigest]:
+        """
+        获取指定版本各资源文件的预期大小与 SHA-256
+        优先从GitHub API获取, 失败时使用本地JSON;
+        会被重新发布的版本 (MUTABLE_RELEASE_TAGS) 不使用本地JSON, 其中的记录可能已过期
+
+        Args:
+            tag: 版本标签
+
+        Returns:
+            文件名到 AssetDigest 的映射, 无法获取时返回空字典
+        """
+        try:
+            response = http_session.get(
+                f"{self.api_base}/releases/tags/{tag}", timeout=self.timeout
+            )
+            response.raise_for_status()
+            digests = self._parse_asset_digests(response.json().get("assets", []))
+            if digests:
+                return digests
+        except requests.exceptions.RequestException as e:
+            log.warning(f"从GitHub API获取 {tag} 的资源文件校验信息失败: {e}")
+        except ValueError as e:
+            log.warning(f"解析 {tag} 的资源文件校验信息失败: {e}")
+
+        if tag in MUTABLE_RELEASE_TAGS:
+            return {}
+        try:
+            local_versions = self._load_local_versions()
+        except Exception as e:
+            log.warning(f"加载本地版本信息失败: {e}")
+            return {}
+        for version_list in [local_versions.get("releases", []),
+                           local_versions.get("prereleases", [])]:
+            for version in version_list:
+                if version["tag"] == tag:
+                    return self._parse_asset_digests(version.get("assets", []))
+        return {}
+
     def _load_local_versions(self) -> Dict:
         """
         加载本地版本信息文件
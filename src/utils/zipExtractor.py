@@ -0,0 +1,483 @@
+"""
+ZIP 解压工具
+支持多线程并行解压, 以及在下载过程中按顺序接收字节流并边下载边解压
+(本地文件头不可靠时以中央目录为准补齐)
+"""
+
+import heapq
+import os
+import shutil
+import struct
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from loguru import logger as log
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_LOCAL_HEADER_SIGNATURE = 0x04034B50
+_DATA_DESCRIPTOR_SIGNATURE = 0x08074B50
+_ZIP64_EXTRA_ID = 0x0001
+# 本地文件头之后可能出现的中央目录 / ZIP64 结束记录签名
+_END_OF_ENTRIES_SIGNATURES = {b"PK\x01\x02", b"PK\x05\x06", b"PK\x06\x06"}
+
+_FLAG_ENCRYPTED = 0x1
+_FLAG_DATA_DESCRIPTOR = 0x8
+_FLAG_UTF8 = 0x800
+
+_WINDOWS_ILLEGAL_CHARS = str.maketrans(':<>|"?*', "_______")
+
+
+def member_relpath(name: str) -> Optional[str]:
+    """
+    计算 ZIP 条目解压后相对于解压目录的路径 (以 "/" 分隔), 规则与 ZipFile.extract 一致:
+    去除盘符、绝对路径与 ".." 等路径成分, Windows 下替换非法字符
+
+    Returns:
+        相对路径, 条目名称不包含有效路径成分时返回 None
+    """
+    name = os.path.splitdrive(name.replace("\\", "/"))[1]
+    parts = [part for part in name.split("/") if part not in ("", ".", "..")]
+    if os.sep == "\\":
+        parts = [part.translate(_WINDOWS_ILLEGAL_CHARS).rstrip(".") for part in parts]
+        parts = [part for part in parts if part]
+    return "/".join(parts) or None
+
+
+def member_path(extract_to: Path, name: str) -> Optional[Path]:
+    """计算 ZIP 条目解压后的路径, 条目名称不包含有效路径成分时返回 None"""
+    relpath = member_relpath(name)
+    return extract_to.joinpath(*relpath.split("/")) if relpath else None
+
+
+class _Entry:
+    """正在流式解压的 ZIP 条目"""
+
+    def __init__(
+        self,
+        name: str,
+        flag: int,
+        method: int,
+        crc: int,
+        compressed_size: int,
+        file_size: int,
+        zip64: bool,
+    ):
+        self.name = name
+        self.flag = flag
+        self.method = method
+        self.expected_crc = crc
+        self.expected_size = file_size
+        self.zip64 = zip64
+        # 使用数据描述符时本地文件头中没有大小信息, 以 deflate 流结束为准
+        self.remaining: Optional[int] = (
+            None if flag & _FLAG_DATA_DESCRIPTOR else compressed_size
+        )
+        self.decompressor = (
+            zlib.decompressobj(-15) if method == zipfile.ZIP_DEFLATED else None
+        )
+        self.crc = 0
+        self.size = 0
+        self.path: Optional[Path] = None
+        self.file = None
+        self.data_done = False
+
+
+class StreamingZipExtractor:
+    """
+    按顺序接收 ZIP 文件的字节并解压
+
+    逐个解析本地文件头, 条目数据到达后立即解压写入磁盘, 并校验 CRC32。
+    遇到无法流式处理的条目 (加密、不支持的压缩方式、仅存储且使用数据描述符) 时停止解析,
+    由 finish 依据中央目录补齐未解压或校验失败的条目
+    """
+
+    def __init__(self, extract_to: Path):
+        self.extract_to = extract_to
+        # 已成功解压的条目: 名称 -> (CRC32, 解压后大小)
+        self.extracted: Dict[str, Tuple[int, int]] = {}
+        self.stopped = False
+        self._buffer = bytearray()
+        self._entry: Optional[_Entry] = None
+
+    def feed(self, data: bytes):
+        if self.stopped:
+            return
+        self._buffer += data
+        try:
+            while not self.stopped and self._step():
+                pass
+        except (OSError, zlib.error, UnicodeDecodeError) as e:
+            log.warning(f"流式解压中止, 将在下载完成后按中央目录解压剩余条目: {e}")
+            self._stop()
+
+    def _stop(self):
+        self.stopped = True
+        self._buffer = bytearray()
+        entry = self._entry
+        self._entry = None
+        if entry and entry.file:
+            entry.file.close()
+            os.remove(entry.path)  # type: ignore
+
+    def _step(self) -> bool:
+        if self._entry is None:
+            return self._read_local_header()
+        if not self._entry.data_done:
+            return self._read_entry_data()
+        return self._read_data_descriptor()
+
+    def _read_local_header(self) -> bool:
+        if len(self._buffer) < 4:
+            return False
+        if bytes(self._buffer[:4]) in _END_OF_ENTRIES_SIGNATURES:
+            # 本地条目已全部读完
+            self._stop()
+            return False
+        if len(self._buffer) < _LOCAL_HEADER.size:
+            return False
+
+        (
+            signature,
+            _,
+            flag,
+            method,
+            _,
+            _,
+            crc,
+            compressed_size,
+            file_size,
+            name_length,
+            extra_length,
+        ) = _LOCAL_HEADER.unpack_from(self._buffer)
+        if signature != _LOCAL_HEADER_SIGNATURE:
+            log.warning("ZIP 本地文件头异常, 将在下载完成后按中央目录解压剩余条目")
+            self._stop()
+            return False
+
+        header_size = _LOCAL_HEADER.size + name_length + extra_length
+        if len(self._buffer) < header_size:
+            return False
+        name_end = _LOCAL_HEADER.size + name_length
+        raw_name = bytes(self._buffer[_LOCAL_HEADER.size : name_end])
+        extra = bytes(self._buffer[name_end:header_size])
+        del self._buffer[:header_size]
+
+        zip64 = False
+        offset = 0
+        while offset + 4 <= len(extra):
+            extra_id, extra_size = struct.unpack_from("<HH", extra, offset)
+            if extra_id == _ZIP64_EXTRA_ID:
+                zip64 = True
+                values = iter(
+                    struct.unpack_from(f"<{extra_size // 8}Q", extra, offset + 4)
+                )
+                if file_size == 0xFFFFFFFF:
+                    file_size = next(values, file_size)
+                if compressed_size == 0xFFFFFFFF:
+                    compressed_size = next(values, compressed_size)
+            offset += 4 + extra_size
+
+        name = raw_name.decode("utf-8" if flag & _FLAG_UTF8 else "cp437")
+        entry = _Entry(name, flag, method, crc, compressed_size, file_size, zip64)
+        streamable = not flag & _FLAG_ENCRYPTED and method in (
+            zipfile.ZIP_STORED,
+            zipfile.ZIP_DEFLATED,
+        )
+        if entry.remaining is None and (
+            not streamable or method != zipfile.ZIP_DEFLATED
+        ):
+            # 无法确定条目数据的结束位置
+            self._stop()
+            return False
+
+        self._entry = entry
+        entry.path = member_path(self.extract_to, name)
+        if not streamable:
+            # 跳过该条目的数据, 交由中央目录补齐
+            entry.decompressor = None
+            entry.path = None
+        elif entry.path and name.endswith("/"):
+            entry.path.mkdir(parents=True, exist_ok=True)
+            entry.path = None
+        elif entry.path:
+            entry.path.parent.mkdir(parents=True, exist_ok=True)
+            entry.file = open(entry.path, "wb")
+        return True
+
+    def _read_entry_data(self) -> bool:
+        entry = self._entry
+        assert entry is not None
+        if not self._buffer and entry.remaining != 0:
+            return False
+
+        if entry.remaining is None:
+            data = bytes(self._buffer)
+            self._buffer = bytearray()
+        else:
+            data = bytes(self._buffer[: entry.remaining])
+            del self._buffer[: len(data)]
+            entry.remaining -= len(data)
+
+        if entry.decompressor:
+            output = entry.decompressor.decompress(data)
+            if entry.decompressor.eof and entry.decompressor.unused_data:
+                self._buffer[:0] = entry.decompressor.unused_data
+            finished = (
+                entry.decompressor.eof
+                if entry.remaining is None
+                else entry.remaining == 0
+            )
+            if finished and entry.file:
+                output += entry.decompressor.flush()
+        else:
+            output = data
+            finished = entry.remaining == 0
+
+        if entry.file and output:
+            entry.file.write(output)
+            entry.crc = zlib.crc32(output, entry.crc)
+            entry.size += len(output)
+
+        if finished:
+            entry.data_done = True
+        return True
+
+    def _read_data_descriptor(self) -> bool:
+        entry = self._entry
+        assert entry is not None
+        if entry.flag & _FLAG_DATA_DESCRIPTOR:
+            size_format = "<QQ" if entry.zip64 else "<II"
+            descriptor_size = 4 + struct.calcsize(size_format)
+            if len(self._buffer) < 4 + descriptor_size:
+                return False
+            has_signature = (
+                struct.unpack_from("<I", self._buffer)[0] == _DATA_DESCRIPTOR_SIGNATURE
+            )
+            offset = 4 if has_signature else 0
+            entry.expected_crc = struct.unpack_from("<I", self._buffer, offset)[0]
+            entry.expected_size = struct.unpack_from(
+                size_format, self._buffer, offset + 4
+            )[1]
+            del self._buffer[: offset + descriptor_size]
+
+        self._entry = None
+        if entry.file:
+            entry.file.close()
+            if entry.crc == entry.expected_crc and entry.size == entry.expected_size:
+                self.extracted[entry.name] = (entry.crc, entry.size)
+            else:
+                log.warning(
+                    f"流式解压 {entry.name} 时 CRC 校验失败, 将在下载完成后重新解压"
+                )
+                os.remove(entry.path)  # type: ignore
+        return True
+
+    def finish(self, zip_path: Path) -> int:
+        """
+        结束流式解压, 依据中央目录补齐未解压或校验失败的条目
+
+        Returns:
+            补齐的条目数量
+        """
+        self._stop()
+        fixed = 0
+        with zipfile.ZipFile(zip_path, "r") as zf:
+            for info in zf.infolist():
+                target = member_path(self.extract_to, info.filename)
+                if target is None:
+                    continue
+                if info.is_dir():
+                    target.mkdir(parents=True, exist_ok=True)
+                    continue
+                if self.extracted.get(info.filename) == (info.CRC, info.file_size):
+                    continue
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with zf.open(info) as source, open(target, "wb") as dest:
+                    shutil.copyfileobj(source, dest, 1024 * 1024)
+                fixed += 1
+        return fixed
+
+
+class PipelinedExtractor:
+    """
+    在下载过程中从 .part 文件读取已连续落盘的数据, 交由后台线程流式解压
+
+    下载方通过 advance 告知从文件开头起连续已写入的字节数; 下载完成后先调用 finish
+    等待读取结束并关闭文件 (Windows 下重命名 .part 前必须关闭), 再调用 complete 补齐条目
+    """
+
+    def __init__(self, part_path: Path, extract_to: Path, read_size: int = 1024 * 1024):
+        self.part_path = part_path
+        self.extract_to = extract_to
+        self.read_size = read_size
+        self.extractor = StreamingZipExtractor(extract_to)
+        self._available = 0
+        self._offset = 0
+        self._target: Optional[int] = None
+        self._aborted = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._run, name="AuraZipPipeline", daemon=True
+        )
+
+    def start(self):
+        # 重新开始下载 (例如切换下载源后) 时, 上次解压的内容可能来自已丢弃的数据
+        if self.extract_to.exists():
+            shutil.rmtree(self.extract_to)
+        self.extract_to.mkdir(parents=True, exist_ok=True)
+        self._thread.start()
+
+    def advance(self, contiguous_end: int):
+        with self._cond:
+            if contiguous_end > self._available:
+                self._available = contiguous_end
+                self._cond.notify_all()
+
+    def _run(self):
+        f = None
+        try:
+            while True:
+                with self._cond:
+                    while (
+                        not self._aborted
+                        and self._offset >= self._available
+                        and (self._target is None or self._offset < self._target)
+                    ):
+                        self._cond.wait()
+                    if self._aborted or (
+                        self._target is not None and self._offset >= self._target
+                    ):
+                        return
+                    end = self._available
+                # .part 文件可能在第一批数据落盘前才被创建
+                if f is None:
+                    f = open(self.part_path, "rb")
+                f.seek(self._offset)
+                while self._offset < end and not self.extractor.stopped:
+                    chunk = f.read(min(self.read_size, end - self._offset))
+                    if not chunk:
+                        break
+                    self.extractor.feed(chunk)
+                    self._offset += len(chunk)
+                if self.extractor.stopped:
+                    return
+        except OSError as e:
+            log.warning(f"读取 {self.part_path.name} 进行流式解压时出错: {e}")
+            self.extractor.stopped = True
+        finally:
+            if f:
+                f.close()
+
+    def finish(self, total_size: int):
+        """等待后台线程处理完 total_size 字节并关闭 .part 文件"""
+        with self._cond:
+            self._target = total_size
+            self._available = max(self._available, total_size)
+            self._cond.notify_all()
+        self._thread.join()
+
+    def abort(self):
+        with self._cond:
+            self._aborted = True
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def complete(self, zip_path: Path) -> int:
+        """依据下载完成的 ZIP 文件的中央目录补齐条目, 返回补齐的条目数量"""
+        return self.extractor.finish(zip_path)
+
+
+def _balance_by_compressed_size(
+    entries: List[Tuple[zipfile.ZipInfo, Path]], bucket_count: int
+) -> List[List[Tuple[zipfile.ZipInfo, Path]]]:
+    """按压缩后大小从大到小依次分配给当前负载最小的线程"""
+    buckets: List[List[Tuple[zipfile.ZipInfo, Path]]] = [[] for _ in range(bucket_count)]
+    loads = [(0, index) for index in range(bucket_count)]
+    for entry in sorted(entries, key=lambda entry: entry[0].compress_size, reverse=True):
+        load, index = heapq.heappop(loads)
+        buckets[index].append(entry)
+        # 条目本身的开销 (创建文件等) 按 1 KB 计入, 避免大量空文件集中到同一线程
+        heapq.heappush(loads, (load + entry[0].compress_size + 1024, index))
+    return [bucket for bucket in buckets if bucket]
+
+
+def extract_parallel(
+    zip_path: Path,
+    extract_to: Path,
+    max_workers: int = 1,
+    progress_callback: Optional[Callable[[int, int, str], None]] = None,
+    members: Optional[Set[str]] = None,
+) -> int:
+    """
+    多线程解压 ZIP 文件
+
+    只读取一次中央目录, 预先创建全部目录, 再将条目按压缩后大小均衡分配给各线程解压
+    (zlib 解压与文件写入均会释放 GIL)。任一条目解压失败时其余线程停止领取新条目,
+    并向调用方抛出该异常
+
+    Args:
+        zip_path: ZIP 文件路径
+        extract_to: 解压目录
+        max_workers: 最大线程数, 为 1 时在当前线程中顺序解压
+        progress_callback: 每解压完一个条目调用一次, 参数为 (已完成数, 总数, 条目名称)
+        members: 仅解压这些名称的文件条目, 为 None 时解压全部条目 (目录条目总会被创建)
+
+    Returns:
+        解压的文件数量
+    """
+    with open(zip_path, "rb") as fp, zipfile.ZipFile(fp, "r") as zf:
+        entries = []
+        directories = {extract_to}
+        for info in zf.infolist():
+            target = member_path(extract_to, info.filename)
+            if target is None:
+                continue
+            if info.is_dir():
+                directories.add(target)
+            elif members is None or info.filename in members:
+                directories.add(target.parent)
+                entries.append((info, target))
+        for directory in sorted(directories):
+            directory.mkdir(parents=True, exist_ok=True)
+
+        total = len(entries)
+        completed = 0
+        progress_lock = threading.Lock()
+        stop_event = threading.Event()
+
+        def extract_bucket(bucket: List[Tuple[zipfile.ZipInfo, Path]]):
+            nonlocal completed
+            for info, target in bucket:
+                if stop_event.is_set():
+                    return
+                with zf.open(info) as source, open(target, "wb") as dest:
+                    shutil.copyfileobj(source, dest, 1024 * 1024)
+                if progress_callback:
+                    with progress_lock:
+                        completed += 1
+                        progress_callback(completed, total, info.filename)
+
+        worker_count = max(1, min(max_workers, total))
+        if worker_count == 1:
+            extract_bucket(entries)
+            return total
+
+        pool = ThreadPoolExecutor(
+            max_workers=worker_count, thread_name_prefix="AuraUnzip"
+        )
+        futures = [
+            pool.submit(extract_bucket, bucket)
+            for bucket in _balance_by_compressed_size(entries, worker_count)
+        ]
+        try:
+            wait(futures, return_when=FIRST_EXCEPTION)
+        finally:
+            stop_event.set()
+            pool.shutdown(wait=True)
+        for future in futures:
+            future.result()
+        return total
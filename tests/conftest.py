@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 源码以 src 为根目录导入 (与 PyInstaller 打包时一致)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
@@ -0,0 +1,71 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils import fileDownloader
+
+FILE_SIZE = 4 * 1024 * 1024
+BURST_SIZE = 128 * 1024
+TRICKLE_SIZE = 1024
+TRICKLE_INTERVAL = 0.1
+
+
+class _TricklingHandler(BaseHTTPRequestHandler):
+    """支持 Range 的下载源: 每个分段先发送 BURST_SIZE 字节, 之后持续缓慢发送, 不触发读超时"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        start, end = self.headers["Range"].removeprefix("bytes=").split("-")
+        start, end = int(start), int(end or FILE_SIZE - 1)
+        size = end - start + 1
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{FILE_SIZE}")
+        self.send_header("Content-Length", str(size))
+        self.send_header("ETag", '"trickle"')
+        self.end_headers()
+        try:
+            sent = min(size, BURST_SIZE)
+            self.wfile.write(b"\0" * sent)
+            while sent < size and not self.server.stopping.is_set():
+                time.sleep(TRICKLE_INTERVAL)
+                chunk = min(size - sent, TRICKLE_SIZE)
+                self.wfile.write(b"\0" * chunk)
+                sent += chunk
+        except OSError:
+            pass
+
+
+@pytest.fixture
+def trickling_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _TricklingHandler)
+    server.daemon_threads = True
+    server.stopping = threading.Event()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/aura.zip"
+    server.stopping.set()
+    server.shutdown()
+    server.server_close()
+
+
+def test_stalled_segments_fail_over_promptly(trickling_url, tmp_path, monkeypatch):
+    # 分段线程阻塞在持续收到数据的读取中时, 停滞判定后也应立即返回, 以便切换下载源
+    window = 1
+    monkeypatch.setattr(fileDownloader, "DOWNLOAD_STALL_WINDOW_SECONDS", window)
+
+    started = time.monotonic()
+    result = fileDownloader.download_file(trickling_url, str(tmp_path), "aura.zip")
+    elapsed = time.monotonic() - started
+
+    assert result is None
+    assert elapsed < window + 3
+    part_path, sidecar_path = fileDownloader._part_paths(tmp_path / "aura.zip")
+    assert part_path.exists() and sidecar_path.exists()
+    # 已停止的分段线程不再持有 .part 文件, 可由下一个下载源接手或重命名
+    part_path.replace(tmp_path / "renamed.part")